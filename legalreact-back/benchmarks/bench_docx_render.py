@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import time
+import random
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from docx import Document
+from docx_template import compile_template
+
+
+def build_template(placeholders, pages, seed=7):
+    # Roughly 30 paragraphs per page, placeholders spread over body, tables,
+    # header and footer, a third of them split across two runs.
+    rng = random.Random(seed)
+    names = [f"FIELD_{i}" for i in range(placeholders)]
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].add_run(f"Agreement dated {{ {names[0]} }}")
+    section.footer.paragraphs[0].add_run(f"Between {{ {names[-1]} }} and the Company")
+
+    paragraphs = pages * 30
+    for i in range(paragraphs):
+        paragraph = doc.add_paragraph("The parties agree to the terms set out in this clause. ")
+        if i % max(1, paragraphs // placeholders) == 0:
+            name = rng.choice(names)
+            if i % 3 == 0:
+                paragraph.add_run(f"{{ {name[:4]}").bold = True
+                paragraph.add_run(f"{name[4:]} }}").bold = True
+            else:
+                paragraph.add_run(f"{{ {name} }}").italic = True
+            paragraph.add_run(" shall apply from the commencement date.")
+        if i % 200 == 199:
+            table = doc.add_table(rows=4, cols=2)
+            for row in table.rows:
+                row.cells[0].text = "Party"
+                row.cells[1].text = f"{{ {rng.choice(names)} }}"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue(), {name: f"value of {name}" for name in names}
+
+
+def fill_naive(template, values):
+    # The previous Formatter.fill_document_with_gpt loop, writing to memory.
+    doc = Document(io.BytesIO(template))
+    cleaned = {k: (", ".join(v) if isinstance(v, list) else str(v or "")) for k, v in values.items()}
+    for para in doc.paragraphs:
+        for placeholder, value in cleaned.items():
+            para.text = para.text.replace(f"{{ {placeholder} }}", value)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def remaining(data):
+    doc = Document(io.BytesIO(data))
+    texts = [p.text for p in doc.paragraphs]
+    texts += [cell.text for table in doc.tables for row in table.rows for cell in row.cells]
+    section = doc.sections[0]
+    texts += [p.text for p in section.header.paragraphs + section.footer.paragraphs]
+    return sum(text.count("{ FIELD_") for text in texts)
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled docx rendering against the paragraph replace loop")
+    parser.add_argument("--placeholders", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'fields':>6} {'pages':>5} {'naive ms':>9} {'compile ms':>10} {'render ms':>9} {'speedup':>8} {'left naive':>10} {'left ours':>9}")
+    for placeholders in args.placeholders:
+        for pages in args.pages:
+            template, values = build_template(placeholders, pages)
+            naive_ms, naive_out = timed(lambda: fill_naive(template, values), max(1, args.repeat // 2))
+            compile_ms, compiled = timed(lambda: compile_template(template), args.repeat)
+            render_ms, rendered = timed(lambda: compiled.render(values), args.repeat)
+            print(f"{placeholders:>6} {pages:>5} {naive_ms:>9.1f} {compile_ms:>10.1f} {render_ms:>9.1f} "
+                  f"{naive_ms / render_ms:>7.0f}x {remaining(naive_out):>10} {remaining(rendered):>9}")
+
+
+if __name__ == "__main__":
+    main()
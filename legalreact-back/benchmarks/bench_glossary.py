@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glossary import GlossaryMatcher
+
+SYLLABLES = ["ab", "ac", "al", "an", "ar", "be", "co", "de", "di", "en", "ex", "im", "in",
+             "ju", "le", "ma", "ne", "or", "pe", "re", "se", "ta", "ti", "un", "ve"]
+
+
+def make_terms(count, rng):
+    terms = {}
+    while len(terms) < count:
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))).capitalize()
+                 for _ in range(rng.randint(1, 3))]
+        terms[" ".join(words)] = f"<{len(terms)}>"
+    return terms
+
+
+def make_text(terms, size, rng):
+    vocabulary = list(terms)
+    filler = ["the", "court", "held", "that", "and", "of", "a", "party", "shall", "not"]
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(vocabulary) if rng.random() < 0.05 else rng.choice(filler)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def naive_replace(terms, text):
+    for term, replacement in terms.items():
+        text = text.replace(term, replacement)
+    return text
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glossary replacement scaling benchmark")
+    parser.add_argument("--sizes", default="15,100,1000,10000,50000")
+    parser.add_argument("--text-chars", type=int, default=200_000)
+    parser.add_argument("--naive-limit", type=int, default=10_000,
+                        help="skip the str.replace loop above this many terms")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'terms':>8} {'build_s':>9} {'compiled_s':>11} {'naive_s':>9} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        terms = make_terms(size, rng)
+        text = make_text(terms, args.text_chars, rng)
+
+        matcher, build = timed(GlossaryMatcher, terms)
+        _, compiled = timed(matcher.replace, text)
+
+        if size <= args.naive_limit:
+            _, naive = timed(naive_replace, terms, text)
+            print(f"{size:>8} {build:>9.3f} {compiled:>11.4f} {naive:>9.4f} {naive / compiled:>7.1f}x")
+        else:
+            print(f"{size:>8} {build:>9.3f} {compiled:>11.4f} {'-':>9} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
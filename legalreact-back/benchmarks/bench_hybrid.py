@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from vectorstore import LocalVectorIndex
+
+# Each topic is a group of interchangeable words; a paraphrased query uses
+# words the judgment itself never contains.
+TOPICS = {
+    "cheating": ["cheating", "fraud", "deceit", "swindle", "deception"],
+    "tenancy": ["tenant", "lessee", "rent", "lease", "eviction"],
+    "confidentiality": ["confidential", "secret", "disclosure", "nda", "proprietary"],
+    "advertising": ["advertisement", "misleading", "promotion", "marketing", "claims"],
+    "employment": ["employee", "termination", "wages", "dismissal", "workman"],
+    "property": ["land", "title", "possession", "boundary", "encroachment"],
+}
+FILLER = ("the court considered the evidence on record and the submissions of counsel for both sides "
+          "before arriving at its conclusion on the question of law raised in the petition").split()
+FIRST = ["Ramesh", "Sunita", "Arjun", "Priya", "Vikram", "Kavita", "Rahul", "Meena", "Anil", "Deepa"]
+LAST = ["Kumar", "Sharma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh", "Das", "Joshi"]
+COMPANIES = ["Acme Traders", "Sunrise Builders", "Bharat Foods", "Orion Softech", "Lotus Textiles"]
+
+
+def build_corpus(documents, chunks_per_document, rng):
+    corpus, facts = [], {}
+    for d in range(documents):
+        topic = rng.choice(list(TOPICS))
+        party = f"{rng.choice(FIRST)} {rng.choice(LAST)}" if rng.random() < 0.7 else rng.choice(COMPANIES)
+        section = str(rng.randint(100, 600))
+        name = f"judgment_{d:05d}.pdf"
+        facts[name] = (topic, party, section)
+        for c in range(chunks_per_document):
+            words = rng.sample(FILLER, 18) + [TOPICS[topic][0], rng.choice(TOPICS[topic][:2])]
+            if c == 0:
+                words += f"{party} versus State under Section {section}".split()
+            elif rng.random() < 0.3:
+                words += ["Section", section]
+            rng.shuffle(words)
+            corpus.append((f"{name}_chunk_{c}", " ".join(words), {"title": name}))
+    return corpus, facts
+
+
+def build_queries(facts, count, rng):
+    names = list(facts)
+    queries = []
+    for i in range(count):
+        name = rng.choice(names)
+        topic, party, section = facts[name]
+        kind = ("section", "party", "paraphrase")[i % 3]
+        if kind == "section":
+            text = f"judgments under Section {section} about {TOPICS[topic][0]}"
+            relevant = {n for n, f in facts.items() if f[2] == section and f[0] == topic}
+        elif kind == "party":
+            text = f"case involving {party} on {TOPICS[topic][1]}"
+            relevant = {n for n, f in facts.items() if f[1] == party and f[0] == topic}
+        else:
+            text = f"matters concerning {' and '.join(TOPICS[topic][2:4])}"
+            relevant = {n for n, f in facts.items() if f[0] == topic}
+        queries.append((kind, text, relevant))
+    return queries
+
+
+class HashedEmbedder:
+    # Offline stand-in for a dense model: synonyms share a direction, and rare
+    # tokens (names, numbers) only nudge the vector, as they do in real embeddings.
+
+    def __init__(self, dimension=256, seed=0):
+        rng = np.random.default_rng(seed)
+        self.dimension = dimension
+        self.topic_vectors = {word: rng.normal(size=dimension)
+                              for words in TOPICS.values() for word in [words[0]]}
+        self.synonyms = {word: words[0] for words in TOPICS.values() for word in words}
+        self.cache = {}
+
+    def token_vector(self, token):
+        if token in self.synonyms:
+            return self.topic_vectors[self.synonyms[token]]
+        if token not in self.cache:
+            seed = int.from_bytes(token.encode("utf-8")[:8].ljust(8, b"\0"), "little") ^ len(token)
+            self.cache[token] = 0.15 * np.random.default_rng(seed).normal(size=self.dimension)
+        return self.cache[token]
+
+    def embed(self, texts):
+        return [np.sum([self.token_vector(t) for t in tokenize(text)] or [np.zeros(self.dimension)], axis=0)
+                for text in texts]
+
+
+class AzureEmbedder:
+
+    def __init__(self):
+        from registry import registry
+        self.client = registry.get("emb_llm")
+        self.cache = registry.get("embedding_cache")
+
+    def embed(self, texts):
+        return [self.cache.get_or_create(self.client, "text-embedding-ada-002", text) for text in texts]
+
+
+def group_documents(matches, top_k):
+    documents = []
+    for match in matches[:top_k]:
+        name = match["id"].rsplit("_chunk_", 1)[0]
+        if name not in documents:
+            documents.append(name)
+    return documents
+
+
+def evaluate(documents, relevant):
+    hit_rank = next((rank for rank, name in enumerate(documents, 1) if name in relevant), None)
+    return (1.0 if hit_rank else 0.0), (1.0 / hit_rank if hit_rank else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relevance and latency of vector, lexical and hybrid case search")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5, help="chunks kept after fusion, as CASE_SEARCH_TOP_K")
+    parser.add_argument("--vector-depths", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--lexical-depths", type=int, nargs="+", default=[0, 10, 20, 50])
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--embeddings", choices=["hashed", "azure"], default="hashed")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus, facts = build_corpus(args.documents, args.chunks, rng)
+    queries = build_queries(facts, args.queries, rng)
+    embedder = HashedEmbedder() if args.embeddings == "hashed" else AzureEmbedder()
+
+    path = tempfile.mkdtemp()
+    try:
+        vectors = LocalVectorIndex(os.path.join(path, "vectors"))
+        lexical = LexicalIndex("bench", path=":memory:")
+        for start in range(0, len(corpus), 500):
+            batch = corpus[start:start + 500]
+            embeddings = embedder.embed([text for _, text, _ in batch])
+            vectors.upsert([(chunk_id, vector, metadata) for (chunk_id, _, metadata), vector in zip(batch, embeddings)])
+            lexical.upsert(batch)
+        started = time.perf_counter()
+        lexical.refresh(force=True)
+        print(f"{len(corpus)} chunks, {len(queries)} queries; lexical index built in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+        query_vectors = embedder.embed([text for _, text, _ in queries])
+        max_vector = max(args.vector_depths)
+        max_lexical = max(args.lexical_depths)
+        vector_runs, lexical_runs, lexical_ms = [], [], []
+        for (_, text, _), query_vector in zip(queries, query_vectors):
+            vector_runs.append(vectors.query(vector=query_vector, top_k=max_vector, include_metadata=True).matches)
+            started = time.perf_counter()
+            lexical_runs.append(lexical.search(text, max_lexical) if max_lexical else [])
+            lexical_ms.append((time.perf_counter() - started) * 1000)
+
+        kinds = sorted({kind for kind, _, _ in queries})
+        header = f"{'vector':>6} {'lexical':>7} " + " ".join(f"{kind + ' R@5':>15} {'MRR':>5}" for kind in kinds)
+        print(header + f" {'fuse ms':>8}")
+        for vector_depth in args.vector_depths:
+            for lexical_depth in args.lexical_depths:
+                totals = defaultdict(lambda: [0.0, 0.0, 0])
+                fuse_ms = []
+                for (kind, _, relevant), vector_matches, lexical_matches in zip(queries, vector_runs, lexical_runs):
+                    started = time.perf_counter()
+                    fused = reciprocal_rank_fusion(
+                        [vector_matches[:vector_depth], lexical_matches[:lexical_depth]], args.rrf_k)
+                    fuse_ms.append((time.perf_counter() - started) * 1000)
+                    recall, reciprocal = evaluate(group_documents(fused, args.top_k), relevant)
+                    totals[kind][0] += recall
+                    totals[kind][1] += reciprocal
+                    totals[kind][2] += 1
+                row = " ".join(f"{totals[k][0] / totals[k][2]:>15.2f} {totals[k][1] / totals[k][2]:>5.2f}" for k in kinds)
+                print(f"{vector_depth:>6} {lexical_depth:>7} {row} {np.mean(fuse_ms):>8.3f}")
+        print(f"\nlexical search p50 {np.percentile(lexical_ms, 50):.2f} ms, p99 {np.percentile(lexical_ms, 99):.2f} ms "
+              f"(depth {max_lexical}); lexical depth 0 is vector-only")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from language_id import LanguageIdentifier, PROFILED_SCRIPTS, SCRIPT_LANGUAGES
+
+# Everything detect() can answer with.
+DETECTABLE = {language for languages in PROFILED_SCRIPTS.values() for language in languages} | \
+    set(SCRIPT_LANGUAGES.values()) | {"zh-Hans", "ru"}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline language identification accuracy and latency")
+    parser.add_argument("--corpus", default=os.path.join(BACKEND_DIR, "benchmarks", "data", "language_id_corpus.jsonl"))
+    parser.add_argument("--profiles", default=os.path.join(BACKEND_DIR, "language_profiles.json"))
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("LANGID_CONFIDENCE_THRESHOLD", "0.15")))
+    parser.add_argument("--documents", action="store_true",
+                        help="join each language's samples into one document instead of scoring sentences")
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions per sample")
+    parser.add_argument("--min-local-rate", type=float, default=0.9,
+                        help="fail when fewer samples than this are answered locally")
+    parser.add_argument("--min-language-local-rate", type=float, default=0.5,
+                        help="fail when any one language is answered locally less often than this")
+    parser.add_argument("--min-local-accuracy", type=float, default=0.99,
+                        help="fail when local answers are less accurate than this")
+    args = parser.parse_args()
+
+    identifier = LanguageIdentifier(profiles_path=args.profiles)
+    with open(args.corpus, "r", encoding="utf-8") as file:
+        samples = [json.loads(line) for line in file if line.strip()]
+    if args.documents:
+        grouped = defaultdict(list)
+        for sample in samples:
+            grouped[sample["language"]].append(sample["text"])
+        samples = [{"language": language, "text": " ".join(texts)} for language, texts in grouped.items()]
+
+    per_language = defaultdict(Counter)
+    confusions = Counter()
+    latencies = []
+    for sample in samples:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            language, confidence = identifier.detect(sample["text"])
+        latencies.append((time.perf_counter() - started) / args.repeat * 1000)
+
+        stats = per_language[sample["language"]]
+        stats["total"] += 1
+        stats["correct"] += language == sample["language"]
+        if confidence >= args.threshold:
+            stats["local"] += 1
+            stats["local_correct"] += language == sample["language"]
+        if language != sample["language"]:
+            confusions[(sample["language"], language)] += 1
+
+    print(f"{'language':>9} {'n':>4} {'accuracy':>9} {'local':>6} {'local_acc':>10}")
+    totals = Counter()
+    for language, stats in sorted(per_language.items()):
+        totals.update(stats)
+        local_accuracy = stats["local_correct"] / stats["local"] if stats["local"] else float("nan")
+        print(f"{language:>9} {stats['total']:>4} {stats['correct'] / stats['total']:>9.2f} "
+              f"{stats['local']:>6} {local_accuracy:>10.2f}")
+    print(f"{'all':>9} {totals['total']:>4} {totals['correct'] / totals['total']:>9.2f} "
+          f"{totals['local']:>6} {totals['local_correct'] / max(1, totals['local']):>10.2f}")
+    print(f"\nthreshold {args.threshold}: {totals['local'] / totals['total']:.0%} answered locally, "
+          f"the rest would go to the remote detector")
+    print(f"latency per call: p50 {percentile(latencies, 50):.3f} ms, p99 {percentile(latencies, 99):.3f} ms")
+    if confusions:
+        print("\nconfusions (expected -> detected):")
+        for (expected, detected), count in confusions.most_common():
+            print(f"  {expected} -> {detected}: {count}")
+
+    failures = []
+    missing = DETECTABLE - set(per_language)
+    if missing:
+        failures.append(f"no samples for {', '.join(sorted(missing))}")
+    if totals["local"] / totals["total"] < args.min_local_rate:
+        failures.append(f"local rate {totals['local'] / totals['total']:.0%} is below {args.min_local_rate:.0%}")
+    if totals["local_correct"] / max(1, totals["local"]) < args.min_local_accuracy:
+        failures.append(f"local accuracy {totals['local_correct'] / max(1, totals['local']):.2f} "
+                        f"is below {args.min_local_accuracy:.2f}")
+    for language, stats in sorted(per_language.items()):
+        if stats["local"] / stats["total"] < args.min_language_local_rate:
+            failures.append(f"{language} local rate {stats['local'] / stats['total']:.0%} "
+                            f"is below {args.min_language_local_rate:.0%}")
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
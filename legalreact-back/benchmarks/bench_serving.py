@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name -> environment for gunicorn.conf.py
+MODES = {
+    "preload+warmup": {"GUNICORN_PRELOAD": "true"},
+    "preload": {"GUNICORN_PRELOAD": "true", "REGISTRY_WARMUP": "none"},
+    "no-preload+warmup": {"GUNICORN_PRELOAD": "false"},
+    "no-preload": {"GUNICORN_PRELOAD": "false", "REGISTRY_WARMUP": "none"},
+}
+
+PAYLOAD = {"user_input": "find similar cases about cheating involving a landlord"}
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return found
+
+
+def memory_mb(pid):
+    # Pss splits shared pages between the processes that map them; Private is
+    # what the process alone costs.
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[key] = int(rest.split()[0]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def wait_for(client, path, accept, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(path)
+            if accept(response):
+                return response
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{path} not ready after {timeout}s")
+
+
+def run_mode(name, env, args):
+    port = args.port
+    environ = dict(os.environ, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads), PYTHONPATH=BENCHMARK_DIR, **env)
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "fake_wsgi:app"],
+        cwd=BACKEND_DIR, env=environ, stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL)
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120)
+    try:
+        wait_for(client, "/healthz", lambda r: r.status_code == 200, args.timeout)
+        live = time.perf_counter() - started
+
+        # Probes land on any worker, so poll on fresh connections until every
+        # one has reported ready.
+        ready_pids, warm_seconds = set(), []
+        deadline = time.perf_counter() + args.timeout
+        while len(ready_pids) < args.workers and time.perf_counter() < deadline:
+            response = client.get("/readyz", headers={"Connection": "close"})
+            status = response.json()
+            if response.status_code == 200 and status["pid"] not in ready_pids:
+                ready_pids.add(status["pid"])
+                warm_seconds.append(status["warm_seconds"] or 0.0)
+            time.sleep(0.02)
+        if len(ready_pids) < args.workers:
+            raise TimeoutError(f"only {len(ready_pids)} of {args.workers} workers ready")
+        ready = time.perf_counter() - started
+
+        # One request per worker at once: with no warmup each pays its own setup.
+        def invoke(_):
+            request_started = time.perf_counter()
+            client.post("/invoke", json=PAYLOAD).raise_for_status()
+            return (time.perf_counter() - request_started) * 1000
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            first = list(pool.map(invoke, range(args.workers)))
+            steady = list(pool.map(invoke, range(args.requests)))
+
+        worker_memory = [memory_mb(pid) for pid in children(master.pid)]
+        master_memory = memory_mb(master.pid)
+        return {
+            "mode": name,
+            "live_s": round(live, 2),
+            "ready_s": round(ready, 2),
+            "worker_warm_s": round(float(np.max(warm_seconds)), 2),
+            "first_ms": round(float(np.max(first)), 1),
+            "steady_p50_ms": round(float(np.percentile(steady, 50)), 1),
+            "worker_rss_mb": round(float(np.mean([m["rss"] for m in worker_memory])), 1),
+            "worker_pss_mb": round(float(np.mean([m["pss"] for m in worker_memory])), 1),
+            "worker_private_mb": round(float(np.mean([m["private"] for m in worker_memory])), 1),
+            "total_pss_mb": round(master_memory["pss"] + sum(m["pss"] for m in worker_memory), 1),
+        }
+    finally:
+        client.close()
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and per-worker memory of the gunicorn serving mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="steady-state requests after the first wave")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show gunicorn logs")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("Needs Linux /proc for per-process memory")
+
+    columns = ["live_s", "ready_s", "worker_warm_s", "first_ms", "steady_p50_ms", "worker_rss_mb", "worker_pss_mb",
+               "worker_private_mb", "total_pss_mb"]
+    print(f"{'mode':<20}" + "".join(f"{column:>18}" for column in columns))
+    results = []
+    for name in args.modes:
+        result = run_mode(name, MODES[name], args)
+        results.append(result)
+        print(f"{name:<20}" + "".join(f"{result[column]:>18}" for column in columns))
+
+    print("\nlive_s/ready_s are from process start; first_ms is the slowest of one concurrent request per worker")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workers": args.workers, "threads": args.threads, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
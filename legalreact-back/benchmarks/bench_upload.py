@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from uploads import UploadStore
+
+# Azurite's well-known development account.
+AZURITE = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+def payloads(size, count):
+    # Distinct content per run so dedupe does not short-circuit the transfer.
+    block = os.urandom(1024 * 1024)
+    for i in range(count):
+        data = bytearray(block * (size // len(block) + 1))[:size]
+        data[:16] = i.to_bytes(16, "little")
+        yield bytes(data)
+
+
+def chunked(data, size=64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def old_path(blob_service, container, data, name):
+    # What /upload-pdf did before: spool to /tmp, then one upload_blob call.
+    from azure.storage.blob import ContentSettings
+    path = os.path.join(tempfile.gettempdir(), name)
+    with open(path, "wb") as f:
+        for chunk in chunked(data):
+            f.write(chunk)
+    with open(path, "rb") as f:
+        blob_service.get_blob_client(container=container, blob=name).upload_blob(
+            f, overwrite=True, content_settings=ContentSettings(content_type="application/pdf"))
+    os.remove(path)
+
+
+def measure(fn, payload_list):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for data in payload_list:
+        fn(data)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = sum(len(data) for data in payload_list)
+    return total / 2 ** 20 / elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of /upload-pdf blob upload paths")
+    parser.add_argument("--connection-string", default=os.getenv("AZURE_STORAGE_CONNECTION_STRING", AZURITE))
+    parser.add_argument("--container", default="bench-uploads")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--block-sizes-mb", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    from azure.storage.blob import BlobServiceClient
+    blob_service = BlobServiceClient.from_connection_string(args.connection_string)
+    container = blob_service.get_container_client(args.container)
+    if not container.exists():
+        container.create_container()
+
+    path = tempfile.mkdtemp()
+    executor = ThreadPoolExecutor(max_workers=max(args.in_flight))
+    try:
+        print(f"{'size MB':>7} {'path':>22} {'MB/s':>8} {'peak MB':>8}")
+        for size_mb in args.sizes_mb:
+            size = size_mb * 2 ** 20
+            counter = iter(range(10 ** 9))
+            rate, peak = measure(
+                lambda data: old_path(blob_service, args.container, data, f"old-{next(counter)}.pdf"),
+                list(payloads(size, args.runs)))
+            print(f"{size_mb:>7} {'tmp + upload_blob':>22} {rate:>8.1f} {peak:>8.1f}")
+
+            for block_mb in args.block_sizes_mb:
+                for in_flight in args.in_flight:
+                    os.environ["UPLOAD_BLOCK_SIZE"] = str(block_mb * 2 ** 20)
+                    os.environ["UPLOAD_MAX_IN_FLIGHT"] = str(in_flight)
+                    store = UploadStore(blob_service, args.container, executor,
+                                        path=os.path.join(path, f"uploads-{size_mb}-{block_mb}-{in_flight}.sqlite3"))
+                    rate, peak = measure(lambda data: store.upload("bench.pdf", chunked(data)),
+                                         list(payloads(size, args.runs)))
+                    store.close()
+                    label = f"blocks {block_mb}MB x{in_flight}"
+                    print(f"{size_mb:>7} {label:>22} {rate:>8.1f} {peak:>8.1f}")
+        print("\npeak MB is Python heap during uploads (tracemalloc), excluding the payloads themselves")
+    finally:
+        executor.shutdown()
+        shutil.rmtree(path)
+        for blob in container.list_blobs():
+            container.delete_blob(blob.name)
+
+
+if __name__ == "__main__":
+    main()
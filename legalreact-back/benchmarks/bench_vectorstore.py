@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from vectorstore import LocalVectorIndex
+
+
+def clustered_vectors(count, dimension, rng, clusters=200):
+    # Embeddings of legal text cluster by topic; uniform noise would flatter IVF less fairly.
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    labels = rng.integers(clusters, size=count)
+    return centers[labels] + rng.normal(scale=0.6, size=(count, dimension)).astype(np.float32)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def measure(index, queries, top_k):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        matches = index.query(vector=query, top_k=top_k).matches
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({match.id for match in matches})
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local vector index latency and IVF recall")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 5000, 100000])
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'vectors':>8} {'mode':>6} {'p50 ms':>8} {'p99 ms':>8} {'recall':>7} {'disk MB':>8}")
+    for size in args.sizes:
+        path = tempfile.mkdtemp()
+        try:
+            vectors = clustered_vectors(size, args.dimension, rng)
+            os.environ["LOCAL_INDEX_IVF_THRESHOLD"] = str(10 ** 12)
+            index = LocalVectorIndex(path, dtype=args.dtype)
+            for start in range(0, size, 1000):
+                index.upsert([(f"doc{i}_chunk_0", vectors[i], {"title": f"doc{i}"})
+                              for i in range(start, min(size, start + 1000))])
+            queries = vectors[rng.integers(size, size=args.queries)] + rng.normal(
+                scale=0.3, size=(args.queries, args.dimension)).astype(np.float32)
+            disk = os.path.getsize(index.vectors_path) / 2 ** 20
+
+            exact_latency, exact = measure(index, queries, args.top_k)
+            print(f"{size:>8} {'exact':>6} {percentile(exact_latency, 50):>8.3f} "
+                  f"{percentile(exact_latency, 99):>8.3f} {1.0:>7.2f} {disk:>8.1f}")
+
+            if size >= 1000:
+                os.environ["LOCAL_INDEX_IVF_THRESHOLD"] = "1"
+                index = LocalVectorIndex(path, dtype=args.dtype)
+                started = time.perf_counter()
+                index.query(vector=queries[0], top_k=args.top_k)
+                build = time.perf_counter() - started
+                ivf_latency, approximate = measure(index, queries, args.top_k)
+                recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+                print(f"{size:>8} {'ivf':>6} {percentile(ivf_latency, 50):>8.3f} "
+                      f"{percentile(ivf_latency, 99):>8.3f} {recall:>7.2f} {disk:>8.1f}  (build {build:.1f} s)")
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = {"full": "false", "budgeted": "true"}
+
+
+def make_cases(count, seed):
+    import fakes
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        party, other = rng.sample(fakes.PARTIES, 2)
+        cases.append(f"{party} is accused of {rng.choice(fakes.TOPICS)} by {other}. The incident happened on "
+                     f"day {i}; the complaint was filed under IPC and the accused denies the allegations.")
+    return cases
+
+
+def run_variant(name, cases):
+    from verdict import Verdict
+    from tokens import count_tokens
+    os.environ["VERDICT_CONTEXT_ENABLED"] = VARIANTS[name]
+    verdict = Verdict()
+    samples = []
+    get_verdict = verdict.get_verdict
+
+    def timed(case_description, laws_text, cases_text):
+        started = time.perf_counter()
+        output = get_verdict(case_description, laws_text, cases_text)
+        samples.append({
+            "verdict_ms": (time.perf_counter() - started) * 1000,
+            "context_tokens": count_tokens(laws_text) + count_tokens(cases_text),
+            "output_tokens": count_tokens(output or ""),
+        })
+        return output
+
+    verdict.get_verdict = timed
+    started = time.perf_counter()
+    errors = sum("error" in verdict.process_case(case) for case in cases)
+    elapsed = time.perf_counter() - started
+
+    def stat(key, q):
+        return round(float(np.percentile([s[key] for s in samples], q)), 1) if samples else None
+
+    return {
+        "variant": name,
+        "cases": len(cases),
+        "errors": errors,
+        "end_to_end_ms": round(elapsed * 1000 / len(cases), 1),
+        "context_tokens_p50": stat("context_tokens", 50),
+        "context_tokens_max": stat("context_tokens", 100),
+        "verdict_ms_p50": stat("verdict_ms", 50),
+        "verdict_ms_p95": stat("verdict_ms", 95),
+        "output_tokens_p50": stat("output_tokens", 50),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B the verdict prompt: full chunks against the token-budgeted context")
+    parser.add_argument("--cases", type=int, default=20)
+    parser.add_argument("--budget", type=int, help="VERDICT_CONTEXT_TOKENS for the budgeted variant")
+    parser.add_argument("--live", action="store_true", help="use the configured services instead of local fakes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if not args.live:
+        import fakes
+        fakes.install()
+    if args.budget:
+        os.environ["VERDICT_CONTEXT_TOKENS"] = str(args.budget)
+    # Every case has to reach the model for the comparison to mean anything.
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+
+    cases = make_cases(args.cases, args.seed)
+    columns = ["errors", "end_to_end_ms", "context_tokens_p50", "context_tokens_max", "verdict_ms_p50",
+               "verdict_ms_p95", "output_tokens_p50"]
+    print(f"{'variant':<10}" + "".join(f"{column:>20}" for column in columns))
+    results = []
+    for name in VARIANTS:
+        result = run_variant(name, cases)
+        results.append(result)
+        print(f"{name:<10}" + "".join(f"{str(result[column]):>20}" for column in columns))
+    if not args.live:
+        print("\nFake model: latency grows with prompt tokens, but answers are canned; use --live for output length")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
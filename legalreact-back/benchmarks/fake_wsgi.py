@@ -0,0 +1,12 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes
+
+# Registered before the app is imported, so with preload_app every worker
+# inherits the fake factories.
+fakes.install()
+
+from wsgi import app
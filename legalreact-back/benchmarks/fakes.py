@@ -0,0 +1,618 @@
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import random
+import hashlib
+import threading
+import datetime
+from collections import defaultdict, deque
+import numpy as np
+import httpx
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from registry import registry, _http_session, _noop
+from vectorstore import Record
+
+# Local stand-ins for the external services, registered in place of the real
+# clients. OpenAI and the Translator are faked at the HTTP layer so the real
+# SDKs, retries and metrics wrappers still run; Blob Storage, Document
+# Intelligence and Pinecone are faked at the client-object layer.
+
+EMBEDDING_DIMENSION = 1536
+TRANSLATOR_URL = "https://api.cognitive.microsofttranslator.com"
+
+TOPICS = ["cheating", "tenancy eviction", "breach of confidentiality", "misleading advertisement",
+          "wrongful termination", "land encroachment", "cheque dishonour", "defamation"]
+PARTIES = ["Ramesh Kumar", "Sunita Sharma", "Acme Traders", "Sunrise Builders", "Orion Softech",
+           "Priya Iyer", "Lotus Textiles", "Vikram Reddy"]
+WORDS = ("the court considered the evidence on record and the submissions of counsel for both sides before "
+         "arriving at its conclusion on the question of law raised in the petition and held that").split()
+
+
+class Profile:
+    # latency: base seconds per call; per_unit: extra seconds per unit of work
+    # (output tokens for the LLM, inputs for embeddings, pages for OCR);
+    # jitter: +/- fraction; error_rate: share of calls that fail with
+    # error_status; payload: multiplier on response sizes; rpm and
+    # max_concurrency: a quota past which calls get 429 with retry_after
+    # (0 is unlimited; rpm is enforced per 10 seconds, as Azure does).
+
+    def __init__(self, latency=0.0, per_unit=0.0, jitter=0.25, error_rate=0.0, error_status=429,
+                 retry_after=1.0, payload=1.0, rpm=0, max_concurrency=0):
+        self.latency = latency
+        self.per_unit = per_unit
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.payload = payload
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._window = deque()
+        self._in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def admit(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._window and self._window[0] < now - 10:
+                self._window.popleft()
+            if (self.rpm and len(self._window) >= self.rpm / 6) or \
+                    (self.max_concurrency and self._in_flight >= self.max_concurrency):
+                self.throttled += 1
+                return False
+            self._window.append(now)
+            self._in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def wait(self, units=0):
+        seconds = self.latency + self.per_unit * units
+        with self._lock:
+            seconds *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def fails(self):
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+            return failed
+
+    def scale(self, count):
+        return max(1, int(count * self.payload))
+
+    def stats(self):
+        return {"calls": self.calls, "errors": self.errors, "throttled": self.throttled}
+
+
+def default_profiles():
+    return {
+        "llm": Profile(latency=0.4, per_unit=0.004),
+        "embeddings": Profile(latency=0.04, per_unit=0.002),
+        "index": Profile(latency=0.03),
+        "blob": Profile(latency=0.01),
+        "document_intelligence": Profile(latency=0.8, per_unit=0.05),
+        "translator": Profile(latency=0.1, per_unit=0.00002),
+    }
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def fake_vector(text):
+    vector = np.random.default_rng(_seed(text)).normal(size=EMBEDDING_DIMENSION).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def filler(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def sentences(rng, words):
+    # Filler split into sentences, as judgment summaries are.
+    parts = []
+    while words > 0:
+        length = min(words, rng.randint(8, 24))
+        parts.append(filler(rng, length).capitalize() + ".")
+        words -= length
+    return " ".join(parts)
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAI(httpx.BaseTransport):
+    # Chat completions (plain and streamed) and embeddings.
+
+    def __init__(self, llm, embeddings):
+        self.llm = llm
+        self.embeddings = embeddings
+
+    def handle_request(self, request):
+        body = json.loads(request.read() or b"{}")
+        embeddings = request.url.path.endswith("/embeddings")
+        profile = self.embeddings if embeddings else self.llm
+        if not profile.admit():
+            return self.error(profile, 429)
+        try:
+            return self.embed(body) if embeddings else self.chat(body)
+        finally:
+            profile.leave()
+
+    def error(self, profile, status=None):
+        status = status or profile.error_status
+        return httpx.Response(status, headers={"Retry-After": str(profile.retry_after)},
+                              json={"error": {"code": str(status), "message": "Fake upstream error"}})
+
+    def embed(self, body):
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        if self.embeddings.fails():
+            self.embeddings.wait()
+            return self.error(self.embeddings)
+        self.embeddings.wait(len(inputs))
+        data = []
+        for index, text in enumerate(inputs):
+            vector = fake_vector(str(text))
+            embedding = base64.b64encode(vector.tobytes()).decode() if body.get("encoding_format") == "base64" else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(count_tokens(str(text)) for text in inputs)
+        return httpx.Response(200, json={"object": "list", "data": data, "model": body.get("model"),
+                                         "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def chat(self, body):
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        if self.llm.fails():
+            self.llm.wait()
+            return self.error(self.llm)
+        content = self.answer(prompt)
+        usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        # Prefill is roughly an order of magnitude cheaper per token than decoding.
+        self.llm.wait(usage["completion_tokens"] + usage["prompt_tokens"] / 20)
+        created = int(time.time())
+        if body.get("stream"):
+            words = content.split(" ")
+            events = []
+            for index, word in enumerate(words):
+                delta = {"content": word + (" " if index < len(words) - 1 else "")}
+                if index == 0:
+                    delta["role"] = "assistant"
+                events.append({"id": "fake", "object": "chat.completion.chunk", "created": created, "model": "fake",
+                               "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            events.append({"id": "fake", "object": "chat.completion.chunk", "created": created, "model": "fake",
+                           "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            stream = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=stream.encode())
+        return httpx.Response(200, json={
+            "id": "fake", "object": "chat.completion", "created": created, "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def answer(self, prompt):
+        rng = random.Random(_seed(prompt))
+        if "Classify the following user query" in prompt:
+            query = prompt.split("Query:", 1)[-1].lower()
+            for route, words in (("perform_action", ("summar", "translat")), ("verdict_prediction", ("verdict", "predict")),
+                                 ("document_generation", ("draft", "agreement", "nda"))):
+                if any(word in query for word in words):
+                    return route
+            return "case_search"
+        if "Extract key details from the following legal case text" in prompt:
+            return json.dumps({
+                "case_description": f"{rng.choice(PARTIES)} is accused of {rng.choice(TOPICS)}. " + filler(rng, self.llm.scale(40)),
+                "involved_parties": f"{rng.choice(PARTIES)}, {rng.choice(PARTIES)}",
+                "jurisdiction": "India",
+                "alleged_violations": rng.choice(TOPICS),
+            })
+        if "predict the most likely verdict" in prompt:
+            return "The accused is likely to be convicted. " + filler(rng, self.llm.scale(250))
+        if "extracts the target language" in prompt:
+            return "hi"
+        if "Extract key legal details from the following contract text" in prompt:
+            return json.dumps({"parties": [rng.choice(PARTIES), rng.choice(PARTIES)], "dates": ["2024-01-01"],
+                               "financial_terms": filler(rng, self.llm.scale(20)), "confidentiality": "Two years",
+                               "termination": "Thirty days notice", "governing_law": "India"})
+        if "Identify the most appropriate document type" in prompt:
+            return "NDA"
+        if "Extract and classify" in prompt:
+            return json.dumps({"AGREEMENT_DATE": "2024-01-01", "COMMENCEMENT_DATE": "2024-02-01", "TERM_YEARS": "2",
+                               "DISCLOSING_PARTIES": [rng.choice(PARTIES)], "RECEIVING_PARTIES": [rng.choice(PARTIES)]})
+        return "OK"
+
+
+class _FakeHTTPAdapter(requests.adapters.HTTPAdapter):
+
+    def __init__(self, profile):
+        super().__init__()
+        self.profile = profile
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        admitted = self.profile.admit()
+        if not admitted or self.profile.fails():
+            if admitted:
+                self.profile.wait()
+                self.profile.leave()
+            response.status_code = self.profile.error_status if admitted else 429
+            response.headers["Retry-After"] = str(self.profile.retry_after)
+            response._content = b'{"error": {"code": 429001, "message": "Fake upstream error"}}'
+            return response
+        try:
+            payload = json.loads(request.body or b"[]")
+            response.status_code = 200
+            response.headers["Content-Type"] = "application/json"
+            response._content = json.dumps(self.respond(request, payload), ensure_ascii=False).encode("utf-8")
+            response.headers["Content-Length"] = str(len(response._content))
+            return response
+        finally:
+            self.profile.leave()
+
+
+class FakeTranslator(_FakeHTTPAdapter):
+
+    def respond(self, request, payload):
+        self.profile.wait(sum(len(item.get("text", "")) for item in payload))
+        if "/detect" in request.url:
+            return [{"language": "en", "score": 1.0} for _ in payload]
+        target = requests.utils.urlparse(request.url).query.split("to=")[-1].split("&")[0] or "hi"
+        return [{"translations": [{"text": f"[{target}] {item.get('text', '')}", "to": target}]} for item in payload]
+
+
+def translator_adapter(profile):
+    # The Translator's requests also pass through the rate limiter and metrics adapter.
+    from ratelimit import GovernedAdapter
+
+    class Adapter(GovernedAdapter, FakeTranslator):
+        pass
+
+    return Adapter(registry.get("rate_limits"), profile=profile)
+
+
+class _BlobProperties:
+
+    def __init__(self, name, data, metadata=None, content_settings=None):
+        self.name = name
+        self.size = len(data)
+        self.etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self.last_modified = datetime.datetime.now(datetime.timezone.utc)
+        self.metadata = dict(metadata or {})
+        self.content_settings = content_settings
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+
+class _Downloader:
+
+    def __init__(self, data):
+        self._data = data
+
+    def readall(self):
+        return self._data
+
+
+class FakeBlobService:
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self.blobs = defaultdict(dict)
+        self.properties = defaultdict(dict)
+        self.staged = defaultdict(dict)
+
+    def get_container_client(self, container):
+        return FakeContainerClient(self, container)
+
+    def get_blob_client(self, container, blob):
+        return FakeBlobClient(self, container, blob)
+
+    def call(self, units=0):
+        if self.profile.fails():
+            from azure.core.exceptions import HttpResponseError
+            self.profile.wait()
+            raise HttpResponseError(message=f"Fake Blob Storage error {self.profile.error_status}")
+        self.profile.wait(units)
+
+    def put(self, container, name, data, metadata=None, content_settings=None):
+        with self._lock:
+            self.blobs[container][name] = bytes(data)
+            self.properties[container][name] = _BlobProperties(name, data, metadata, content_settings)
+
+
+class FakeContainerClient:
+
+    def __init__(self, service, container):
+        self.service = service
+        self.container = container
+
+    def exists(self):
+        return True
+
+    def create_container(self):
+        pass
+
+    def list_blobs(self, name_starts_with=None):
+        self.service.call()
+        with self.service._lock:
+            properties = list(self.service.properties[self.container].values())
+        return [p for p in properties if not name_starts_with or p.name.startswith(name_starts_with)]
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self.service, self.container, blob)
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        self.get_blob_client(name).upload_blob(data, overwrite=overwrite, **kwargs)
+
+    def delete_blob(self, name):
+        self.get_blob_client(name).delete_blob()
+
+
+class FakeBlobClient:
+
+    def __init__(self, service, container, blob):
+        self.service = service
+        self.container = container
+        self.blob_name = blob
+
+    def upload_blob(self, data, overwrite=False, metadata=None, content_settings=None, **kwargs):
+        data = data.read() if hasattr(data, "read") else data
+        self.service.call(len(data) / 2 ** 20)
+        self.service.put(self.container, self.blob_name, data, metadata, content_settings)
+
+    def stage_block(self, block_id, data, length=None, **kwargs):
+        self.service.call(len(data) / 2 ** 20)
+        with self.service._lock:
+            self.service.staged[(self.container, self.blob_name)][block_id] = bytes(data)
+
+    def commit_block_list(self, block_list, content_settings=None, metadata=None, **kwargs):
+        self.service.call()
+        with self.service._lock:
+            staged = self.service.staged.pop((self.container, self.blob_name), {})
+        data = b"".join(staged[block.id] for block in block_list)
+        self.service.put(self.container, self.blob_name, data, metadata, content_settings)
+
+    def download_blob(self, etag=None, match_condition=None, **kwargs):
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceNotFoundError, ResourceNotModifiedError
+        with self.service._lock:
+            data = self.service.blobs[self.container].get(self.blob_name)
+            properties = self.service.properties[self.container].get(self.blob_name)
+        if data is None:
+            raise ResourceNotFoundError(message=f"Blob {self.blob_name} not found")
+        if etag and match_condition == MatchConditions.IfModified and etag == properties.etag:
+            self.service.call()
+            raise ResourceNotModifiedError(message="Not modified")
+        self.service.call(len(data) / 2 ** 20)
+        return _Downloader(data)
+
+    def get_blob_properties(self):
+        self.service.call()
+        return self.service.properties[self.container][self.blob_name]
+
+    def set_blob_metadata(self, metadata=None, **kwargs):
+        self.service.call()
+        with self.service._lock:
+            self.service.properties[self.container][self.blob_name].metadata = dict(metadata or {})
+
+    def delete_blob(self, **kwargs):
+        self.service.call()
+        with self.service._lock:
+            self.service.blobs[self.container].pop(self.blob_name, None)
+            self.service.properties[self.container].pop(self.blob_name, None)
+
+
+class _Obj:
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class _Poller:
+
+    def __init__(self, profile, key):
+        self.profile = profile
+        self.key = key
+
+    def result(self):
+        rng = random.Random(_seed(self.key))
+        pages = self.profile.scale(4)
+        if self.profile.fails():
+            from azure.core.exceptions import HttpResponseError
+            self.profile.wait()
+            raise HttpResponseError(message=f"Fake Document Intelligence error {self.profile.error_status}")
+        self.profile.wait(pages)
+        return _Obj(pages=[
+            _Obj(lines=[_Obj(content=f"{i + 1}. {filler(rng, 14)}.") for i in range(40)])
+            for _ in range(pages)
+        ])
+
+
+class FakeDocumentAnalysis:
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def begin_analyze_document_from_url(self, model_id, document_url, **kwargs):
+        return _Poller(self.profile, document_url.split("?")[0])
+
+    def begin_analyze_document(self, model_id, document=None, **kwargs):
+        data = document.read() if hasattr(document, "read") else document
+        return _Poller(self.profile, hashlib.sha256(data or b"").hexdigest())
+
+
+class FakeIndex:
+    # Returns top_k pseudo-random matches with realistic metadata per index.
+
+    def __init__(self, name, profile, size=5000):
+        self.name = name
+        self.profile = profile
+        self.size = size
+
+    def query(self, vector=None, top_k=10, include_metadata=False, **kwargs):
+        if self.profile.fails():
+            self.profile.wait()
+            raise RuntimeError(f"Fake Pinecone error {self.profile.error_status}")
+        self.profile.wait()
+        key = np.asarray(vector, dtype=np.float32)[:8].tobytes() if vector is not None else b""
+        rng = random.Random(int.from_bytes(hashlib.sha256(key).digest()[:8], "little"))
+        ids = rng.sample(range(self.size), min(top_k, self.size))
+        matches = [Record(id=self.record_id(i), score=1.0 - rank * 0.02,
+                          metadata=self.metadata(i) if include_metadata else {}) for rank, i in enumerate(ids)]
+        return Record(matches=matches, namespace="")
+
+    def record_id(self, i):
+        return f"law_{i}" if self.name == "law-kb" else f"judgment_{i // 4:05d}.pdf_chunk_{i % 4}"
+
+    def metadata(self, i):
+        rng = random.Random(i * 7919 + len(self.name))
+        if self.name == "law-kb":
+            section = rng.randint(100, 600)
+            return {"title": f"Section {section} - {rng.choice(TOPICS).title()}", "section": str(section),
+                    "penalty": f"Imprisonment up to {rng.randint(1, 7)} years, or fine, or both",
+                    "description": filler(rng, self.profile.scale(60))}
+        text = f"{rng.choice(PARTIES)} versus State concerning {rng.choice(TOPICS)}. " + sentences(rng, self.profile.scale(500))
+        return {"title": f"judgment_{i // 4:05d}.pdf", "summary_chunk": text}
+
+    def describe_index_stats(self):
+        return {"dimension": EMBEDDING_DIMENSION, "total_vector_count": self.size}
+
+    def upsert(self, vectors=None, **kwargs):
+        self.profile.wait()
+        return {"upserted_count": len(vectors or [])}
+
+    def delete(self, **kwargs):
+        self.profile.wait()
+        return {}
+
+
+class FakePinecone:
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def Index(self, name):
+        return FakeIndex(name, self.profile)
+
+
+FAKE_ENV = {
+    "OPENAI_GPT_ENDPOINT": "https://fake-openai.local",
+    "OPENAI_GPT_API_KEY": "fake",
+    "EMBEDDING_API_ENDPOINT": "https://fake-openai.local",
+    "EMBEDDING_API_KEY": "fake",
+    "EMBEDDING_API_VERSION": "2024-02-01",
+    "PINECONE_API_KEY": "fake",
+    "PINECONE_INDEX_NAME": "cases",
+    "AZURE_STORAGE_ACCOUNT_NAME": "fakeaccount",
+    "AZURE_STORAGE_ACCOUNT_KEY": base64.b64encode(b"fake-key" * 8).decode(),
+    "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+    "AZURE_CONTAINER_NAME": "uploads",
+    "AZURE_CONTAINER_NAME_4": "templates",
+    "AZURE_DOC_INTELLIGENCE_ENDPOINT": "https://fake-di.local",
+    "AZURE_DOC_INTELLIGENCE_KEY": "fake",
+    "AZURE_TRANSLATOR_KEY": "fake",
+    "AZURE_TRANSLATOR_REGION": "local",
+    "VECTOR_BACKEND": "pinecone",
+}
+
+PATH_ENV = {
+    "OCR_STORE_PATH": "ocr.sqlite3",
+    "EMBEDDING_CACHE_PATH": "embeddings.sqlite3",
+    "JOB_STORE_PATH": "jobs.sqlite3",
+    "INGEST_MANIFEST_PATH": "ingest.sqlite3",
+    "LEXICAL_INDEX_PATH": "lexical.sqlite3",
+    "UPLOAD_INDEX_PATH": "uploads.sqlite3",
+    "UPLOAD_CACHE_DIR": "uploads",
+    "DOCUMENT_STORE_DIR": "documents",
+    "TEMPLATE_CACHE_DIR": "templates",
+}
+
+
+class FakeServices:
+
+    def __init__(self, profiles, workdir):
+        self.profiles = profiles
+        self.workdir = workdir
+        self.blob_service = FakeBlobService(profiles["blob"])
+
+    def install(self):
+        # Must run before anything resolves the real clients from the registry.
+        for key, value in FAKE_ENV.items():
+            os.environ[key] = value
+        for key, value in PATH_ENV.items():
+            os.environ[key] = os.path.join(self.workdir, value)
+
+        from llm import LLM
+        from metrics import MetricsTransport
+        from ratelimit import GovernedTransport
+        openai = FakeOpenAI(self.profiles["llm"], self.profiles["embeddings"])
+
+        def http_session():
+            session = _http_session()
+            session.mount(TRANSLATOR_URL, translator_adapter(self.profiles["translator"]))
+            return session
+
+        registry.register("http_session", http_session, replace=True)
+        registry.register("httpx_client", lambda: httpx.Client(
+            transport=GovernedTransport(MetricsTransport(openai), registry.get("rate_limits"))), replace=True)
+        registry.register("gen_llm", lambda: LLM().initialize_gen_llm(http_client=registry.get("httpx_client")),
+                          close=_noop, replace=True)
+        registry.register("emb_llm", lambda: LLM().initialize_emb_llm(http_client=registry.get("httpx_client")),
+                          close=_noop, replace=True)
+        registry.register("pinecone", lambda: FakePinecone(self.profiles["index"]), close=_noop, replace=True)
+        registry.register("blob_service", lambda: self.blob_service, close=_noop, replace=True)
+        registry.register("template_blob_service", lambda: self.blob_service, close=_noop, replace=True)
+        registry.register("document_analysis", lambda: FakeDocumentAnalysis(self.profiles["document_intelligence"]),
+                          close=_noop, replace=True)
+        self.seed_templates()
+        return self
+
+    def seed_templates(self):
+        source = os.path.join(BACKEND_DIR, "legal-template")
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".docx") and not name.startswith("~$"):
+                with open(os.path.join(source, name), "rb") as f:
+                    self.blob_service.put(os.environ["AZURE_CONTAINER_NAME_4"], name, f.read())
+
+    def seed_uploads(self, count):
+        # Distinct scanned-looking documents, so summarise/translate go through OCR once each.
+        import io
+        from pypdf import PdfWriter
+        uploads = registry.get("uploads")
+        ids = []
+        for i in range(count):
+            writer = PdfWriter()
+            for _ in range(4):
+                writer.add_blank_page(width=612, height=792)
+            writer.add_metadata({"/Title": f"Scanned contract {uuid.uuid4().hex}"})
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            ids.append(uploads.upload(f"contract_{i}.pdf", iter([buffer.getvalue()]))["document_id"])
+        return ids
+
+    def stats(self):
+        return {name: profile.stats() for name, profile in self.profiles.items()}
+
+
+def install(profiles=None, workdir=None):
+    import tempfile
+    return FakeServices(profiles or default_profiles(), workdir or tempfile.mkdtemp(prefix="legalreact-fakes-")).install()
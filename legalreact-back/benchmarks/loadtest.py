@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import threading
+import platform
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes
+
+ROUTES = ["case_search", "verdict_prediction", "document_generation", "perform_action"]
+COMPARED = [("throughput_rps", 1), ("goodput_rps", 1), ("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1),
+            ("cpu_ms_per_request", -1)]
+
+
+def make_inputs(route, count, rng, document_ids, repeat_ratio):
+    inputs = []
+    for i in range(count):
+        if inputs and rng.random() < repeat_ratio:
+            inputs.append(rng.choice(inputs))
+            continue
+        party, other = rng.sample(fakes.PARTIES, 2)
+        topic = rng.choice(fakes.TOPICS)
+        if route == "case_search":
+            text = f"find similar cases about {topic} involving {party} (ref {i})"
+        elif route == "verdict_prediction":
+            text = (f"predict the verdict: {party} is accused of {topic} by {other}; "
+                    f"the incident happened on day {i} and the complaint was filed under IPC")
+        elif route == "document_generation":
+            text = f"draft an NDA between {party} and {other} starting 2024-{i % 12 + 1:02d}-01 for {i % 5 + 1} years"
+        else:
+            action = "summarize my uploaded document" if i % 2 == 0 else "translate my uploaded document to Hindi"
+            inputs.append({"user_input": action, "document_id": document_ids[i % len(document_ids)]})
+            continue
+        inputs.append({"user_input": text})
+    return inputs
+
+
+class WorkflowDriver:
+
+    def __init__(self):
+        from workflow import app_workflow
+        self.workflow = app_workflow
+
+    def __call__(self, payload):
+        result = self.workflow.invoke(payload)
+        return not (isinstance(result, dict) and "error" in result) and result not in (None, [])
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    # Serves main.app with the threaded WSGI server and posts to /invoke.
+
+    def __init__(self, concurrency):
+        import httpx
+        from werkzeug.serving import make_server
+        from main import app
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        self.client = httpx.Client(base_url=f"http://127.0.0.1:{self.server.server_port}", limits=limits, timeout=600)
+
+    def __call__(self, payload):
+        response = self.client.post("/invoke", json=payload)
+        body = response.json() if response.status_code == 200 else None
+        return body is not None and not (isinstance(body, dict) and "error" in body) and body != []
+
+    def close(self):
+        self.client.close()
+        self.server.shutdown()
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if platform.system() != "Darwin" else peak / 2 ** 20
+
+
+def run_route(driver, inputs, concurrency, duration):
+    latencies, outcomes = [], []
+    lock = threading.Lock()
+    position = iter(range(len(inputs)))
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        while deadline is None or time.perf_counter() < deadline:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = driver(inputs[index])
+            except Exception as e:
+                logging.getLogger("loadtest").debug(f"Request failed: {e}")
+                ok = False
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                outcomes.append(ok)
+
+    cpu_started = cpu_seconds()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_started
+
+    latencies_ms = np.array(latencies) * 1000
+    count = len(outcomes)
+    ok = sum(outcomes)
+    return {
+        "requests": count,
+        "errors": count - ok,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 3) if elapsed else 0.0,
+        "goodput_rps": round(ok / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1) if count else None,
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 1) if count else None,
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1) if count else None,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_ms_per_request": round(cpu * 1000 / count, 2) if count else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def parse_concurrency(values):
+    # "8" applies to every route; "verdict_prediction=16" overrides one.
+    concurrency = {route: 8 for route in ROUTES}
+    for value in values:
+        if "=" in value:
+            route, count = value.split("=", 1)
+            concurrency[route] = int(count)
+        else:
+            concurrency = {route: int(value) for route in ROUTES}
+    return concurrency
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'route':<20} {'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for route, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        for metric, direction in COMPARED:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change * direction < -tolerance:
+                flag = "  REGRESSION"
+                regressions.append((route, metric))
+            print(f"{route:<20} {metric:<20} {before:>10} {after:>10} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the workflow against local fake services")
+    parser.add_argument("--mode", choices=["workflow", "http"], default="workflow",
+                        help="invoke app_workflow directly, or post to /invoke on a local server")
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=ROUTES)
+    parser.add_argument("--concurrency", nargs="+", default=["8"], help="N, or route=N per route")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--duration", type=float, default=0, help="stop a route after this many seconds")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests per route first")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="share of inputs that repeat an earlier one")
+    parser.add_argument("--documents", type=int, default=8, help="uploads rotated through by perform_action")
+    parser.add_argument("--profile", help="JSON file of fake service settings, e.g. {\"llm\": {\"latency\": 1.0}}")
+    parser.add_argument("--llm-latency", type=float, help="base seconds per chat completion")
+    parser.add_argument("--error-rate", type=float, help="error rate applied to every fake service")
+    parser.add_argument("--payload", type=float, help="response size multiplier for every fake service")
+    parser.add_argument("--no-governor", action="store_true",
+                        help="disable the outbound rate limiter and leave retries to the SDKs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change reported as a regression")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    profiles = fakes.default_profiles()
+    if args.profile:
+        with open(args.profile) as f:
+            for name, settings in json.load(f).items():
+                profiles[name].__dict__.update(settings)
+    for profile in profiles.values():
+        if args.error_rate is not None:
+            profile.error_rate = args.error_rate
+        if args.payload is not None:
+            profile.payload = args.payload
+    if args.llm_latency is not None:
+        profiles["llm"].latency = args.llm_latency
+
+    # Read when the clients are first built, so it must be set before install.
+    os.environ["RATE_LIMIT_ENABLED"] = "false" if args.no_governor else "true"
+    services = fakes.install(profiles)
+    document_ids = services.seed_uploads(args.documents) if "perform_action" in args.routes else []
+    concurrency = parse_concurrency(args.concurrency)
+    driver = HttpDriver(max(concurrency.values())) if args.mode == "http" else WorkflowDriver()
+
+    rng = random.Random(args.seed)
+    results = {
+        "mode": args.mode,
+        "governor": not args.no_governor,
+        "requests_per_route": args.requests,
+        "duration": args.duration,
+        "repeat_ratio": args.repeat_ratio,
+        "profiles": {name: {k: v for k, v in vars(p).items() if not k.startswith("_") and k not in ("calls", "errors", "throttled")}
+                     for name, p in profiles.items()},
+        "routes": {},
+    }
+    print(f"{'route':<20} {'conc':>4} {'reqs':>5} {'err':>4} {'rps':>7} {'good':>7} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'cpu ms/r':>8} {'rss MB':>7}")
+    try:
+        for route in args.routes:
+            inputs = make_inputs(route, args.requests + args.warmup, rng, document_ids, args.repeat_ratio)
+            for payload in inputs[:args.warmup]:
+                driver(payload)
+            stats = run_route(driver, inputs[args.warmup:], concurrency[route], args.duration)
+            results["routes"][route] = stats
+            print(f"{route:<20} {stats['concurrency']:>4} {stats['requests']:>5} {stats['errors']:>4} "
+                  f"{stats['throughput_rps']:>7.2f} {stats['goodput_rps']:>7.2f} {stats['p50_ms']:>8} "
+                  f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['cpu_ms_per_request']:>8} {stats['peak_rss_mb']:>7}")
+    finally:
+        driver.close()
+    results["upstream_calls"] = services.stats()
+    results["rate_limits"] = fakes.registry.get("rate_limits").stats()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
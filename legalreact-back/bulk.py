@@ -0,0 +1,164 @@
+import io
+import os
+import re
+import csv
+import json
+import zipfile
+import logging
+from concurrency import ordered_map
+
+logger = logging.getLogger(__name__)
+
+# Fields holding a free-text description to extract placeholder values from.
+DESCRIPTION_FIELDS = ("description", "user_input", "text")
+NAME_FIELDS = ("id", "name")
+
+
+class BulkError(Exception):
+    pass
+
+
+def parse_records(data, filename=""):
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    if filename.lower().endswith(".csv") or (not filename and not text.lstrip().startswith(("{", "\""))):
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    records = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BulkError(f"Invalid JSON on line {number}: {e}")
+        records.append(record if isinstance(record, dict) else {"description": str(record)})
+    return records
+
+
+def document_name(index, record):
+    name = next((str(record[field]) for field in NAME_FIELDS if record.get(field)), "")
+    slug = re.sub(r"[^\w.-]+", "_", name).strip("_")[:80]
+    return f"{index + 1:05d}-{slug}.docx" if slug else f"{index + 1:05d}.docx"
+
+
+class _ZipStream(io.RawIOBase):
+    # Write-only sink that lets zipfile stream to a response in pieces.
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class BulkGenerator:
+
+    def __init__(self, formatter, template_cache, executor, blob_service_client=None):
+        self.BULK_MAX_IN_FLIGHT = int(os.getenv("BULK_MAX_IN_FLIGHT", "8"))
+        self.BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "1000"))
+        # Containers bulk output may be written to; empty means documents are only returned as a zip.
+        self.BULK_OUTPUT_CONTAINERS = {
+            name.strip() for name in os.getenv("BULK_OUTPUT_CONTAINERS", "").split(",") if name.strip()
+        }
+
+        self.formatter = formatter
+        self.template_cache = template_cache
+        self.executor = executor
+        self.blob_service_client = blob_service_client
+
+    def prepare(self, template_name, records, destination=None):
+        if not records:
+            raise BulkError("No records supplied")
+        if len(records) > self.BULK_MAX_RECORDS:
+            raise BulkError(f"At most {self.BULK_MAX_RECORDS} records per batch, got {len(records)}")
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise BulkError(f"Record {index} is not an object")
+        if destination:
+            container, prefix = destination
+            if container not in self.BULK_OUTPUT_CONTAINERS:
+                raise BulkError(f"Writing to container {container} is not allowed")
+            if ".." in (prefix or "").split("/"):
+                raise BulkError("prefix must not contain '..'")
+        template_path = self.template_cache.resolve(template_name)
+        if not template_path:
+            raise BulkError(f"No matching template found for {template_name}")
+        return template_path, self.template_cache.compiled(template_path)
+
+    def generate(self, template_name, records, destination=None, prepared=None):
+        # Yields one manifest entry per record, in input order. Entries carry
+        # the rendered bytes under "document" unless a destination was given.
+        # prepared is what prepare() returned, when the caller already validated.
+        template_path, compiled = prepared or self.prepare(template_name, records, destination)
+        document_type = os.path.splitext(os.path.basename(template_path))[0]
+        placeholders = set(compiled.placeholders)
+
+        def run(item):
+            index, record = item
+            entry = {"index": index, "name": document_name(index, record), "status": "failed", "extracted": False}
+            try:
+                values = {k: v for k, v in record.items() if k in placeholders and v not in ("", None)}
+                description = next((record[field] for field in DESCRIPTION_FIELDS if record.get(field)), None)
+                if description and placeholders - set(values):
+                    extracted = self.formatter.extract_entities_from_gpt(description, document_type, sorted(placeholders))
+                    if extracted is None:
+                        raise BulkError("Entity extraction returned no JSON")
+                    # Values given explicitly in the record win over extracted ones.
+                    values = {**extracted, **values}
+                    entry["extracted"] = True
+                elif not values:
+                    raise BulkError("Record has neither placeholder fields nor a description")
+
+                document = compiled.render(values)
+                if destination:
+                    container, prefix = destination
+                    blob_name = f"{prefix.strip('/')}/{entry['name']}" if prefix else entry["name"]
+                    self.blob_service_client.get_blob_client(container=container, blob=blob_name).upload_blob(
+                        document, overwrite=True
+                    )
+                    entry["blob"] = blob_name
+                else:
+                    entry["document"] = document
+                entry["status"] = "succeeded"
+            except Exception as e:
+                logger.warning(f"Bulk record {index} failed: {e}")
+                entry["error"] = str(e)
+            return entry
+
+        yield from ordered_map(self.executor, run, enumerate(records), self.BULK_MAX_IN_FLIGHT)
+
+    def stream_zip(self, template_name, records, prepared=None):
+        entries = self.generate(template_name, records, prepared=prepared)
+        sink = _ZipStream()
+        manifest = []
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            for entry in entries:
+                document = entry.pop("document", None)
+                if document is not None:
+                    archive.writestr(entry["name"], document)
+                manifest.append(entry)
+                yield sink.drain()
+            archive.writestr("manifest.json", json.dumps(summarize(manifest), indent=2))
+        yield sink.drain()
+
+    def write_to_container(self, template_name, records, container, prefix="", prepared=None):
+        return summarize(list(self.generate(template_name, records, (container, prefix), prepared)))
+
+
+def summarize(manifest):
+    succeeded = sum(1 for entry in manifest if entry["status"] == "succeeded")
+    return {
+        "total": len(manifest),
+        "succeeded": succeeded,
+        "failed": len(manifest) - succeeded,
+        "extracted": sum(1 for entry in manifest if entry["extracted"]),
+        "records": manifest,
+    }
@@ -1,7 +1,8 @@
 import os
-import pinecone
 import logging
-from llm import LLM
+from lexical import reciprocal_rank_fusion
+from registry import registry
+from semantic_cache import exact_terms
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,50 +11,54 @@ class CaseSearch:
 
     def __init__(self):
         self.AZURE_OPENAI_MODEL = "text-embedding-ada-002"
-        self.PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
         self.PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+        self.CASE_SEARCH_TOP_K = int(os.getenv("CASE_SEARCH_TOP_K", "5"))
+        self.HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+        self.HYBRID_VECTOR_DEPTH = int(os.getenv("HYBRID_VECTOR_DEPTH", "20"))
+        self.HYBRID_LEXICAL_DEPTH = int(os.getenv("HYBRID_LEXICAL_DEPTH", "20"))
+        self.HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
 
-        if not self.PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY is not set.")
-        pc = pinecone.Pinecone(api_key=self.PINECONE_API_KEY)
-
-        self.index2 = pc.Index(self.PINECONE_INDEX_NAME)
-
-        self.llm = LLM()
-        self.emb_llm = self.llm.initialize_emb_llm()
+        self.index2 = registry.get("index:cases")
+        self.emb_llm = registry.get("emb_llm")
+        self.embedding_cache = registry.get("embedding_cache")
+        self.semantic_cache = registry.get("semantic_cache")
+        self.lexical_index = registry.get("lexical:cases") if self.HYBRID_SEARCH_ENABLED else None
 
     def search_cases(self, query):
         logger.info("Generating embedding for query")
-        response = self.emb_llm.embeddings.create(
-            model=self.AZURE_OPENAI_MODEL,
-            input=query
-        )
+        query_embedding = self.embedding_cache.get_or_create(self.emb_llm, self.AZURE_OPENAI_MODEL, query)
 
-        if hasattr(response, "data") and len(response.data) > 0:
-            query_embedding = response.data[0].embedding
-        else:
+        if query_embedding is None:
             logger.warning("No embeddings found in OpenAI response")
             return []
-        
-        logger.info("Querying Pinecone index")
-        search_results = self.index2.query(vector=query_embedding, top_k=5, include_metadata=True)
 
-        if not search_results or "matches" not in search_results:
-            logger.warning("No search results returned from Pinecone")
-            return []
-        
-        grouped_results = {}
-        matches = search_results.get("matches", [])
+        # Queries a section number or a name apart embed almost identically,
+        # so a hit also needs the same exact terms.
+        indexes = (self.PINECONE_INDEX_NAME,)
+        terms = exact_terms(query)
+        cached, similarity = self.semantic_cache.lookup("case_search", query_embedding, indexes, terms)
+        if cached is not None:
+            logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+            return [dict(result, cached=True) for result in cached]
 
-        if not matches:
+        logger.info("Querying Pinecone index")
+        vector_depth = self.HYBRID_VECTOR_DEPTH if self.lexical_index else self.CASE_SEARCH_TOP_K
+        search_results = self.index2.query(vector=query_embedding, top_k=vector_depth, include_metadata=True)
+        vector_matches = search_results.get("matches", []) if search_results and "matches" in search_results else []
+        lexical_matches = self.lexical_index.search(query, self.HYBRID_LEXICAL_DEPTH) if self.lexical_index else []
+
+        if not vector_matches and not lexical_matches:
             logger.warning("No matches found in Pinecone search")
             return []
 
+        matches = reciprocal_rank_fusion([vector_matches, lexical_matches], self.HYBRID_RRF_K)[:self.CASE_SEARCH_TOP_K]
+
+        grouped_results = {}
         for match in matches:
             doc_chunk_name = match.get("id", "Unknown ID")
             metadata = match.get("metadata", {})
             doc_name = doc_chunk_name.rsplit("_chunk_", 1)[0]
-            chunk_summary = metadata.get("chunk", "No summary available")
+            chunk_summary = metadata.get("chunk") or metadata.get("summary_chunk") or "No summary available"
             if doc_name not in grouped_results:
                 grouped_results[doc_name] = []
             grouped_results[doc_name].append(chunk_summary)
@@ -63,5 +68,6 @@ class CaseSearch:
             for doc, chunks in grouped_results.items()
         ]
 
-        logger.info(f"Grouped Search Results: {final_results}")
+        logger.debug(f"Grouped Search Results: {final_results}")
+        self.semantic_cache.store("case_search", query_embedding, final_results, indexes, terms)
         return final_results
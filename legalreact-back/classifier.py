@@ -1,16 +1,21 @@
-from llm import LLM
+from registry import registry
 
 class Classifier:
 
     def __init__(self):
-        self.llm = LLM()
-        self.gen_llm = self.llm.initialize_gen_llm()
-        
+        self.gen_llm = registry.get("gen_llm")
+        self.router = registry.get("router")
+        self.executor = registry.get("background_executor")
+
     def classify_query(self, data):
         user_input = data.get("user_input", "").strip()
         if not user_input:
             return "unknown", data
 
+        classification = self.router.classify(user_input, self.classify_with_llm, self.executor)
+        return classification, data
+
+    def classify_with_llm(self, user_input):
         prompt = f"""
         Classify the following user query:
         - "case_search" if searching for similar legal cases.
@@ -24,7 +29,7 @@ class Classifier:
         
         response = self.gen_llm.invoke(prompt) 
         classification = response.content.strip().lower()
-        return classification if classification in ["case_search", "verdict_prediction", "document_generation", "perform_action"] else "unknown", data
+        return classification if classification in ["case_search", "verdict_prediction", "document_generation", "perform_action"] else "unknown"
 
     def extract_language_code(self, user_query):
         prompt = f"""
@@ -0,0 +1,34 @@
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def submit(executor, fn, *args, **kwargs):
+    # Run the task inside a copy of the caller's context so context variables
+    # (request-scoped state) follow the work onto pool threads.
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def create_executor(max_workers, name):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+def shutdown_executor(executor):
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def ordered_map(executor, fn, items, window):
+    # Like executor.map, but keeps at most `window` tasks in flight and pulls
+    # from `items` lazily, so memory stays flat on long inputs.
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(submit(executor, fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
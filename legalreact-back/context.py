@@ -0,0 +1,180 @@
+import os
+import re
+import math
+import logging
+from collections import Counter
+from lexical import tokenize
+from tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+WHITESPACE = re.compile(r"\s+")
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE.split(text or "") if sentence.strip()]
+
+
+def truncate(text, budget):
+    # Longest word prefix of text that fits the budget.
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def _field(match, name):
+    # Pinecone matches read by attribute, local ones (Record) either way.
+    try:
+        return match[name]
+    except Exception:
+        return getattr(match, name, None)
+
+
+def rank(matches, key):
+    # Best score first; later matches with an already-seen key are dropped.
+    ranked = sorted(matches, key=lambda match: _field(match, "score") or 0.0, reverse=True)
+    seen, kept = set(), []
+    for match in ranked:
+        value = key(match)
+        if value in seen:
+            continue
+        seen.add(value)
+        kept.append(match)
+    return kept
+
+
+def _metadata(match):
+    return _field(match, "metadata") or {}
+
+
+def _normalise(text):
+    return WHITESPACE.sub(" ", str(text or "")).strip().casefold()
+
+
+class ContextBuilder:
+
+    def __init__(self, budget=None):
+        self.VERDICT_CONTEXT_TOKENS = budget or int(os.getenv("VERDICT_CONTEXT_TOKENS", "1500"))
+        # Share of the budget laws may use; whatever they leave goes to cases.
+        self.VERDICT_CONTEXT_LAW_SHARE = float(os.getenv("VERDICT_CONTEXT_LAW_SHARE", "0.35"))
+        # Sentences below this similarity to the case description are left out,
+        # except the best one of each case.
+        self.VERDICT_CONTEXT_MIN_SIMILARITY = float(os.getenv("VERDICT_CONTEXT_MIN_SIMILARITY", "0.05"))
+
+    def build(self, case_description, relevant_laws, similar_cases):
+        laws_text, laws_tokens = self.format_laws(
+            relevant_laws, int(self.VERDICT_CONTEXT_TOKENS * self.VERDICT_CONTEXT_LAW_SHARE))
+        cases_text, cases_tokens = self.format_cases(
+            case_description, similar_cases, self.VERDICT_CONTEXT_TOKENS - laws_tokens)
+        logger.info(f"Verdict context: {laws_tokens} law tokens, {cases_tokens} case tokens "
+                    f"(budget {self.VERDICT_CONTEXT_TOKENS})")
+        return laws_text, cases_text
+
+    def format_laws(self, relevant_laws, budget):
+        entries, used = [], 0
+        for law in rank(relevant_laws, self._law_key):
+            metadata = _metadata(law)
+            # Without the description if the full entry does not fit.
+            for entry in (self._law_entry(metadata, True), self._law_entry(metadata, False)):
+                # One more for the newline between entries.
+                cost = count_tokens(entry) + 1
+                if used + cost <= budget:
+                    entries.append(entry)
+                    used += cost
+                    break
+        return "\n".join(entries), used
+
+    def format_cases(self, case_description, similar_cases, budget):
+        chunks = rank(similar_cases, lambda case: _normalise(self._case_text(case)) or _field(case, "id"))
+        grouped = {}
+        for case in chunks:
+            metadata = _metadata(case)
+            grouped.setdefault(metadata.get("title", "No Title"), []).extend(split_sentences(self._case_text(case)))
+        # Overlapping chunks of one case repeat sentences.
+        grouped = {title: list(dict.fromkeys(sentences)) for title, sentences in grouped.items()}
+
+        scores = self._similarities(case_description, [s for sentences in grouped.values() for s in sentences])
+        entries, used = [], 0
+        for position, (title, sentences) in enumerate(grouped.items()):
+            # Even split of what is left, so a case that needs less passes the rest on.
+            share = (budget - used) // (len(grouped) - position)
+            header = f"Title: {title}\nSummary: "
+            available = share - count_tokens(header)
+            if available <= 0 or not sentences:
+                continue
+
+            order = sorted(range(len(sentences)), key=lambda i: scores[sentences[i]], reverse=True)
+            picked, cost = [], 0
+            for i in order:
+                if picked and scores[sentences[i]] < self.VERDICT_CONTEXT_MIN_SIMILARITY:
+                    break
+                sentence_cost = count_tokens(sentences[i])
+                if cost + sentence_cost > available:
+                    continue
+                picked.append(i)
+                cost += sentence_cost
+            # Joined text can count a little differently; drop the weakest until it fits.
+            entry = None
+            while picked:
+                entry = header + " ".join(sentences[i] for i in sorted(picked))
+                if count_tokens(entry) + 1 <= share:
+                    break
+                picked.pop()
+                entry = None
+            if entry is None:
+                summary = truncate(sentences[order[0]], available - 1)
+                if not summary:
+                    continue
+                entry = header + summary
+
+            entries.append(entry)
+            used += count_tokens(entry) + 1
+        return "\n".join(entries), used
+
+    def _similarities(self, query, sentences):
+        # TF-IDF cosine against the case description, with IDF over the candidates.
+        tokenized = {sentence: Counter(tokenize(sentence)) for sentence in sentences}
+        frequency = Counter(term for counts in tokenized.values() for term in counts)
+        total = len(tokenized) or 1
+
+        def vector(counts):
+            return {term: count * math.log(1 + total / frequency.get(term, 1)) for term, count in counts.items()}
+
+        def norm(weights):
+            return math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+
+        query_vector = vector(Counter(tokenize(query)))
+        query_norm = norm(query_vector)
+        scores = {}
+        for sentence, counts in tokenized.items():
+            weights = vector(counts)
+            dot = sum(weight * query_vector.get(term, 0.0) for term, weight in weights.items())
+            scores[sentence] = dot / (norm(weights) * query_norm)
+        return scores
+
+    def _law_key(self, law):
+        metadata = _metadata(law)
+        if metadata.get("title") or metadata.get("section"):
+            return _normalise(metadata.get("title")), _normalise(metadata.get("section"))
+        return _field(law, "id")
+
+    def _law_entry(self, metadata, with_description):
+        entry = f"Title: {metadata.get('title', 'No Title')}"
+        if metadata.get("section"):
+            entry += f"\nSection: {metadata['section']}"
+        if metadata.get("penalty"):
+            entry += f"\nPenalty: {metadata['penalty']}"
+        if with_description and metadata.get("description"):
+            entry += f"\nDescription: {metadata['description']}"
+        return entry
+
+    def _case_text(self, case):
+        metadata = _metadata(case)
+        return metadata.get("summary_chunk") or metadata.get("chunk") or ""
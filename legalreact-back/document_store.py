@@ -0,0 +1,62 @@
+import os
+import re
+import time
+import uuid
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DocumentStore:
+
+    def __init__(self, path=None, ttl_seconds=None):
+        self.DOCUMENT_STORE_DIR = path or os.getenv("DOCUMENT_STORE_DIR", "cache/documents")
+        self.DOCUMENT_STORE_TTL_SECONDS = ttl_seconds or float(os.getenv("DOCUMENT_STORE_TTL_SECONDS", "86400"))
+
+        self._lock = threading.Lock()
+        self._saves = 0
+        os.makedirs(self.DOCUMENT_STORE_DIR, exist_ok=True)
+
+    def save(self, data, extension="docx"):
+        return self.write([data], extension)
+
+    def write(self, chunks, extension="docx"):
+        # Chunks (bytes or str) go to disk as they arrive; the document only
+        # becomes visible once all of them are written.
+        document_id = uuid.uuid4().hex
+        path = os.path.join(self.DOCUMENT_STORE_DIR, f"{document_id}.{extension}")
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._saves += 1
+            prune = self._saves % 64 == 0
+        if prune:
+            self.prune()
+        return document_id
+
+    def path(self, document_id, extension="docx"):
+        if not DOCUMENT_ID.match(document_id or ""):
+            return None
+        path = os.path.join(self.DOCUMENT_STORE_DIR, f"{document_id}.{extension}")
+        return os.path.abspath(path) if os.path.exists(path) else None
+
+    def prune(self):
+        cutoff = time.time() - self.DOCUMENT_STORE_TTL_SECONDS
+        for entry in os.scandir(self.DOCUMENT_STORE_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Failed to prune {entry.path}: {e}")
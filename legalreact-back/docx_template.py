@@ -0,0 +1,138 @@
+import io
+import re
+import zipfile
+import logging
+from xml.sax.saxutils import escape
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_P = f"{{{W_NS}}}p"
+W_T = f"{{{W_NS}}}t"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+PLACEHOLDER = re.compile(r"\{\s*([A-Za-z_][\w.]*)\s*\}")
+# Body, tables, headers, footers and notes all live in these parts.
+TEXT_PARTS = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+# Private-use code points survive serialisation and never occur in templates.
+SLOT = re.compile(r"\ue000(\d+)\ue001")
+LINE_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+
+
+def format_value(value):
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    return escape(str(value if value is not None else "")).replace("\n", LINE_BREAK)
+
+
+def _paragraph_texts(paragraph):
+    # w:t elements owned by this paragraph, not by a text box nested inside it.
+    return [t for t in paragraph.iter(W_T) if next(t.iterancestors(W_P), None) is paragraph]
+
+
+def _mark_paragraph(paragraph, slots):
+    texts = _paragraph_texts(paragraph)
+    if not texts:
+        return
+    joined = "".join(t.text or "" for t in texts)
+    matches = list(PLACEHOLDER.finditer(joined))
+    if not matches:
+        return
+
+    starts = []
+    offset = 0
+    for t in texts:
+        starts.append(offset)
+        offset += len(t.text or "")
+
+    def locate(position, end=False):
+        for i in range(len(texts) - 1, -1, -1):
+            if starts[i] < position or (not end and starts[i] == position):
+                return i, position - starts[i]
+        return 0, 0
+
+    # Right to left, so earlier offsets stay valid while later text is rewritten.
+    for match in reversed(matches):
+        first, first_offset = locate(match.start())
+        last, last_offset = locate(match.end(), end=True)
+        marker = f"\ue000{len(slots)}\ue001"
+        slots.append((match.group(1), match.group(0)))
+
+        head = texts[first].text or ""
+        if first == last:
+            texts[first].text = head[:first_offset] + marker + head[last_offset:]
+        else:
+            texts[first].text = head[:first_offset] + marker
+            for t in texts[first + 1:last]:
+                t.text = ""
+            texts[last].text = (texts[last].text or "")[last_offset:]
+        # The placeholder keeps the formatting of the run it starts in.
+        texts[first].set(XML_SPACE, "preserve")
+
+
+class CompiledTemplate:
+
+    def __init__(self, parts, compiled_parts):
+        self._parts = parts
+        self._compiled = compiled_parts
+        self.placeholders = sorted({name for _, pieces in compiled_parts.items()
+                                    for name, _ in pieces[1::2]})
+
+    def render(self, values):
+        buffer = io.BytesIO()
+        self.render_to(buffer, values)
+        return buffer.getvalue()
+
+    def render_to(self, stream, values):
+        formatted = {name: format_value(value) for name, value in (values or {}).items()}
+        with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+            for info, data in self._parts:
+                pieces = self._compiled.get(info.filename)
+                if pieces is not None:
+                    out = []
+                    for i, piece in enumerate(pieces):
+                        if i % 2 == 0:
+                            out.append(piece)
+                        else:
+                            name, original = piece
+                            out.append(formatted.get(name, escape(original)))
+                    data = "".join(out).encode("utf-8")
+                archive.writestr(info, data)
+        return stream
+
+
+def compile_template(source):
+    # source is a path, bytes, or a binary file object.
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    parts = []
+    compiled = {}
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            data = archive.read(info)
+            parts.append((info, data))
+            if TEXT_PARTS.match(info.filename):
+                pieces = _compile_part(data)
+                if pieces is not None:
+                    compiled[info.filename] = pieces
+    return CompiledTemplate(parts, compiled)
+
+
+def _compile_part(data):
+    root = etree.fromstring(data)
+    slots = []
+    for paragraph in root.iter(W_P):
+        _mark_paragraph(paragraph, slots)
+    if not slots:
+        return None
+    xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).decode("utf-8")
+    # Even indexes are literal XML, odd indexes are (name, original text) slots.
+    pieces = []
+    position = 0
+    for match in SLOT.finditer(xml):
+        pieces.append(xml[position:match.start()])
+        pieces.append(slots[int(match.group(1))])
+        position = match.end()
+    pieces.append(xml[position:])
+    return pieces
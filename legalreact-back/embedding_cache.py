@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model, text):
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+
+    def __init__(self, path=None, max_items=None, ttl_seconds=None, disk_max_items=None, disk_ttl_seconds=None):
+        self.CACHE_PATH = path or os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
+        self.MAX_ITEMS = max_items or int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "5000"))
+        self.TTL_SECONDS = ttl_seconds or float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+        self.DISK_MAX_ITEMS = disk_max_items or int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ITEMS", "200000"))
+        self.DISK_TTL_SECONDS = disk_ttl_seconds or float(os.getenv("EMBEDDING_CACHE_DISK_TTL_SECONDS", str(30 * 86400)))
+        # USD per 1K tokens, used only to report the estimated saving.
+        self.PRICE_PER_1K_TOKENS = float(os.getenv("EMBEDDING_PRICE_PER_1K_TOKENS", "0.0001"))
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._puts_since_prune = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "disk_evictions": 0,
+            "saved_tokens": 0,
+        }
+
+        self._db = None
+        if self.CACHE_PATH:
+            try:
+                self._db = self._open_db(self.CACHE_PATH)
+            except Exception as e:
+                logger.error(f"Embedding cache disk tier disabled: {e}")
+
+    def _open_db(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+        return db
+
+    def get(self, model, text):
+        key = cache_key(model, text)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if now - created_at <= self.TTL_SECONDS:
+                    self._memory.move_to_end(key)
+                    self._record_hit("memory_hits", text)
+                    return vector
+                del self._memory[key]
+                self._counters["expirations"] += 1
+
+            row = None
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and now - row[1] <= self.DISK_TTL_SECONDS:
+                vector = array("f", row[0]).tolist()
+                self._remember(key, vector, now)
+                self._record_hit("disk_hits", text)
+                return vector
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, model, text, vector):
+        key = cache_key(model, text)
+        now = time.time()
+        with self._lock:
+            self._remember(key, vector, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, array("f", vector).tobytes(), now)
+                )
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= 256:
+                    self._puts_since_prune = 0
+                    self._prune_disk(now)
+
+    def get_or_create(self, client, model, text):
+        vector = self.get(model, text)
+        if vector is not None:
+            return vector
+        response = client.embeddings.create(model=model, input=text)
+        if not hasattr(response, "data") or len(response.data) == 0:
+            return None
+        vector = response.data[0].embedding
+        self.put(model, text, vector)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_items"] = len(self._memory)
+            if self._db is not None:
+                counters["disk_items"] = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        counters["saved_requests"] = hits
+        counters["saved_cost_usd"] = round(counters["saved_tokens"] / 1000 * self.PRICE_PER_1K_TOKENS, 6)
+        return counters
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, vector, now):
+        self._memory[key] = (vector, now)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.MAX_ITEMS:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _record_hit(self, counter, text):
+        self._counters[counter] += 1
+        # Roughly four characters per token for ada-002 on English text.
+        self._counters["saved_tokens"] += max(1, len(text) // 4)
+
+    def _prune_disk(self, now):
+        self._db.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.DISK_TTL_SECONDS,))
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.DISK_MAX_ITEMS
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY created_at LIMIT ?)", (overflow,)
+            )
+            self._counters["disk_evictions"] += overflow
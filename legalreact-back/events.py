@@ -0,0 +1,89 @@
+import json
+import queue
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_sink = contextvars.ContextVar("event_sink", default=None)
+_DONE = object()
+
+
+def emit(event, payload=None):
+    sink = _sink.get()
+    if sink is not None:
+        sink(event, payload)
+
+
+def is_streaming():
+    return _sink.get() is not None
+
+
+@contextmanager
+def capture(sink):
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+def invoke_llm(llm, prompt, stage):
+    # Drop-in for llm.invoke(prompt): streams tokens to the active sink when
+    # there is one and returns the merged message either way.
+    if not is_streaming():
+        return llm.invoke(prompt)
+    response = None
+    for chunk in llm.stream(prompt):
+        if chunk.content:
+            emit("token", {"stage": stage, "text": chunk.content})
+        response = chunk if response is None else response + chunk
+    return response
+
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str, ensure_ascii=False)}\n\n"
+
+
+def stream_workflow(workflow, data, heartbeat_seconds=15):
+    events = queue.Queue()
+    closed = threading.Event()
+
+    def sink(event, payload):
+        if not closed.is_set():
+            events.put((event, payload))
+
+    def run():
+        with capture(sink):
+            try:
+                for step in workflow.stream(data):
+                    for node, output in step.items():
+                        if node == "classifier" and isinstance(output, tuple):
+                            sink("classification", {"classification": output[0]})
+                        else:
+                            sink("node", {"node": node})
+                            sink("result", output)
+            except Exception as e:
+                logger.exception("Streaming workflow failed")
+                sink("error", {"error": str(e)})
+            finally:
+                events.put(_DONE)
+
+    threading.Thread(target=run, name="workflow-stream", daemon=True).start()
+
+    try:
+        while True:
+            try:
+                item = events.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is _DONE:
+                yield format_sse("done", {})
+                break
+            yield format_sse(*item)
+    finally:
+        # The client may disconnect early; stop queueing events nobody will read.
+        closed.set()
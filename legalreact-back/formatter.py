@@ -2,11 +2,7 @@ import os
 import json
 import re
 import logging
-from azure.storage.blob import BlobServiceClient
-from langchain_openai import AzureChatOpenAI
-from docx import Document
-from difflib import get_close_matches
-from llm import LLM
+from registry import registry
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -14,17 +10,13 @@ class Formatter:
     def __init__(self):
         self.AZURE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         self.CONTAINER_NAME = os.getenv("AZURE_CONTAINER_NAME_4")
-        self.llm = LLM()
-        self.gen_llm = self.llm.initialize_gen_llm()
+        self.template_cache = registry.get("template_cache")
+        self.gen_llm = registry.get("gen_llm")
 
 
     def list_templates_from_blob(self):
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(self.AZURE_CONNECTION_STRING)
-            container_client = blob_service_client.get_container_client(self.CONTAINER_NAME)
-            templates = [os.path.splitext(os.path.basename(blob.name))[0]
-                        for blob in container_client.list_blobs() if blob.name.endswith(".docx")]
-            return templates
+            return self.template_cache.names()
         except Exception as e:
             logging.error(f"Error listing templates: {e}")
             return []
@@ -49,23 +41,10 @@ class Formatter:
 
     def fetch_template_from_blob(self, document_type):
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(self.AZURE_CONNECTION_STRING)
-            container_client = blob_service_client.get_container_client(self.CONTAINER_NAME)
-            templates = [blob.name.replace(".docx", "") for blob in container_client.list_blobs()]
-            best_match = get_close_matches(document_type, templates, n=1, cutoff=0.5)
-            if not best_match:
+            local_path = self.template_cache.resolve(document_type)
+            if not local_path:
                 logging.error(f"No matching template found for {document_type}")
                 return None
-
-            selected = best_match[0]
-            blob_client = blob_service_client.get_blob_client(self.CONTAINER_NAME, f"{selected}.docx")
-            os.makedirs("templates", exist_ok=True)
-            local_path = f"templates/{selected}.docx"
-
-            with open(local_path, "wb") as file:
-                file.write(blob_client.download_blob().readall())
-
-            logging.info(f"Template downloaded: {selected}.docx")
             return local_path
         except Exception as e:
             logging.error(f"Error fetching template: {e}")
@@ -74,9 +53,7 @@ class Formatter:
 
     def extract_placeholders(self, template_path):
         try:
-            doc = Document(template_path)
-            text = "\n".join([p.text for p in doc.paragraphs])
-            return list(set(re.findall(r"\{(.*?)\}", text)))
+            return self.template_cache.placeholders(template_path)
         except Exception as e:
             logging.error(f"Error extracting placeholders: {e}")
             return []
@@ -120,19 +97,9 @@ class Formatter:
             return None
 
 
-    def fill_document_with_gpt(self, template_path, extracted_data):
+    def render_document(self, template_path, extracted_data):
         try:
-            doc = Document(template_path)
-            cleaned = {k: (", ".join(v) if isinstance(v, list) else str(v or "")) for k, v in extracted_data.items()}
-
-            for para in doc.paragraphs:
-                for placeholder, value in cleaned.items():
-                    para.text = para.text.replace(f"{{ {placeholder} }}", value)
-
-            output_path = "/Users/aryan_zingade/Downloads/generated_document.docx"
-            doc.save(output_path)
-            logging.info(f"Document saved: {output_path}")
-            return output_path
+            return self.template_cache.compiled(template_path).render(extracted_data or {})
         except Exception as e:
             logging.error(f"Error filling document: {e}")
             return None
@@ -164,4 +131,4 @@ class Formatter:
             return None
 
         logging.info("Filling the document with extracted data...")
-        return self.fill_document_with_gpt(template_path, data)
+        return self.render_document(template_path, data)
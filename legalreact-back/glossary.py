@@ -0,0 +1,80 @@
+import re
+import json
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_word_class = None
+
+
+def word_class():
+    # \w plus combining marks, so a term never matches inside a word written in
+    # a script whose vowel signs are marks (Devanagari, Arabic, ...).
+    global _word_class
+    if _word_class is None:
+        ranges, start, previous = [], None, None
+        for code in range(0x300, 0x10000):
+            ch = chr(code)
+            if unicodedata.category(ch).startswith("M") and not re.match(r"\w", ch):
+                if start is None:
+                    start = code
+                elif code != previous + 1:
+                    ranges.append((start, previous))
+                    start = code
+                previous = code
+        if start is not None:
+            ranges.append((start, previous))
+        marks = "".join(
+            f"\\u{low:04x}" if low == high else f"\\u{low:04x}-\\u{high:04x}"
+            for low, high in ranges
+        )
+        _word_class = f"[\\w{marks}]"
+    return _word_class
+
+
+def _trie_pattern(node):
+    alternatives = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not alternatives:
+        return ""
+    body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if "" in node:
+        # Greedy optional: the longer term is tried first, the shorter one on backtrack.
+        return ("(?:" + body + ")?") if len(alternatives) == 1 else body + "?"
+    return body
+
+
+class GlossaryMatcher:
+
+    def __init__(self, terms):
+        self.terms = {term: replacement for term, replacement in terms.items() if term}
+        self.pattern = self._compile(self.terms)
+
+    def _compile(self, terms):
+        if not terms:
+            return None
+        trie = {}
+        for term in terms:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        word = word_class()
+        return re.compile(f"(?<!{word}){_trie_pattern(trie)}(?!{word})")
+
+    def replace(self, text):
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(lambda match: self.terms[match.group(0)], text)
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def load_glossaries(file_path, default_language="hi"):
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    # The original file was a flat English -> Hindi mapping.
+    if data and all(isinstance(value, str) for value in data.values()):
+        data = {default_language: data}
+    return {language: GlossaryMatcher(terms) for language, terms in data.items()}
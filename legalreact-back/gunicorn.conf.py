@@ -0,0 +1,48 @@
+import gc
+import os
+import multiprocessing
+
+# gunicorn -c gunicorn.conf.py
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# Requests mostly wait on the model, search and storage APIs, so each worker
+# serves several at once. gevent needs GUNICORN_PRELOAD=false: it has to patch
+# before the app is imported.
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(multiprocessing.cpu_count(), 4))))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Each worker takes an equal share of the upstream RPM/TPM quotas.
+os.environ.setdefault("RATE_LIMIT_PROCESSES", str(workers))
+
+# Verdicts and document summaries can take minutes end to end.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# Import the app and compile app_workflow once in the master; workers share it.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+worker_tmp_dir = os.getenv("GUNICORN_WORKER_TMP_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else None)
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    # Keeps the collector from touching preloaded objects, which would copy
+    # their pages into every worker.
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from registry import registry
+    registry.reset()
+
+
+def post_worker_init(worker):
+    from serving import warmup
+    warmup.ensure_started()
@@ -0,0 +1,350 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from concurrency import create_executor, ordered_map, shutdown_executor
+from lexical import LexicalIndex
+from metrics import route
+from ocr_store import pages_to_text
+from registry import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def chunk_text(text, chunk_size=500):
+    words = text.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+
+def vector_size(vector):
+    # Rough JSON size of an upsert entry, to keep requests under the API limit.
+    return 12 * len(vector["values"]) + len(json.dumps(vector["metadata"])) + len(vector["id"]) + 64
+
+
+class IngestManifest:
+    # Which version of each source document is in an index, and under which
+    # vector ids. Written per document once its vectors are upserted, so a
+    # crashed run resumes where it stopped.
+
+    def __init__(self, path=None):
+        self.INGEST_MANIFEST_PATH = path or os.getenv("INGEST_MANIFEST_PATH", "cache/ingest.sqlite3")
+
+        self._lock = threading.Lock()
+        if self.INGEST_MANIFEST_PATH != ":memory:":
+            os.makedirs(os.path.dirname(self.INGEST_MANIFEST_PATH) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.INGEST_MANIFEST_PATH, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "index_name TEXT NOT NULL, source_id TEXT NOT NULL, etag TEXT NOT NULL, "
+            "chunk_ids TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (index_name, source_id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS index_versions (index_name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+
+    def documents(self, index_name):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source_id, etag, chunk_ids FROM documents WHERE index_name = ?", (index_name,)
+            ).fetchall()
+        return {source_id: (etag, json.loads(chunk_ids)) for source_id, etag, chunk_ids in rows}
+
+    def record(self, index_name, source_id, etag, chunk_ids):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (index_name, source_id, etag, chunk_ids, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (index_name, source_id, etag, json.dumps(chunk_ids), time.time())
+            )
+
+    def remove(self, index_name, source_id):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM documents WHERE index_name = ? AND source_id = ?", (index_name, source_id)
+            )
+
+    def version(self, index_name):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version FROM index_versions WHERE index_name = ?", (index_name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, index_name):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO index_versions (index_name, version) VALUES (?, 1) "
+                "ON CONFLICT(index_name) DO UPDATE SET version = version + 1",
+                (index_name,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class BlobSource:
+    # Judgments in a blob container, OCR'd and split into 500-word chunks.
+
+    def __init__(self, blob_service_client, container_name, document_analysis_client, ocr_store, chunk_size=500):
+        self.container_client = blob_service_client.get_container_client(container_name)
+        self.document_analysis_client = document_analysis_client
+        self.ocr_store = ocr_store
+        self.chunk_size = chunk_size
+
+    def list(self):
+        return {blob.name: blob.etag for blob in self.container_client.list_blobs()}
+
+    def load(self, source_id):
+        data = self.container_client.get_blob_client(source_id).download_blob().readall()
+
+        def analyze():
+            poller = self.document_analysis_client.begin_analyze_document("prebuilt-read", document=data)
+            return poller.result()
+
+        text = pages_to_text(self.ocr_store.analyze(data, "prebuilt-read", analyze))
+        return [
+            (f"{source_id}_chunk_{i}", chunk, {"title": source_id, "summary_chunk": chunk})
+            for i, chunk in enumerate(chunk_text(text, self.chunk_size))
+        ]
+
+
+class LawSource:
+    # Law records from a JSON list, one vector per law, as law_kb.ipynb stored them.
+
+    def __init__(self, file_path):
+        with open(file_path, "r", encoding="utf-8") as file:
+            self.laws = {str(law["id"]): law for law in json.load(file)}
+
+    def list(self):
+        return {
+            law_id: hashlib.sha256(json.dumps(law, sort_keys=True).encode("utf-8")).hexdigest()
+            for law_id, law in self.laws.items()
+        }
+
+    def load(self, source_id):
+        law = self.laws[source_id]
+        text = f"{law['title']} {law['description']} {law['section']} {law['penalty']} {law['jurisdiction']}"
+        return [(source_id, text, law)]
+
+
+class Ingestor:
+
+    def __init__(self, index, index_name, emb_llm, manifest, embedding_cache=None, lexical=None):
+        self.INGEST_OCR_WORKERS = int(os.getenv("INGEST_OCR_WORKERS", "8"))
+        self.EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+        self.EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+        self.UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+        self.UPSERT_MAX_BYTES = int(os.getenv("UPSERT_MAX_BYTES", str(2 * 1024 * 1024)))
+        self.DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+
+        self.index = index
+        self.index_name = index_name
+        self.emb_llm = emb_llm
+        self.manifest = manifest
+        self.embedding_cache = embedding_cache
+        self.lexical = lexical
+        self._lock = threading.Lock()
+        self.counters = {
+            "listed": 0, "unchanged": 0, "ingested": 0, "failed": 0, "removed": 0,
+            "chunks": 0, "cached_embeddings": 0, "embed_calls": 0, "upsert_calls": 0, "delete_calls": 0,
+        }
+
+    def run(self, source, limit=None, dry_run=False, full=False):
+        started = time.perf_counter()
+        listing = source.list()
+        known = self.manifest.documents(self.index_name)
+        changed = [(source_id, etag) for source_id, etag in listing.items()
+                   if full or source_id not in known or known[source_id][0] != etag]
+        removed = [source_id for source_id in known if source_id not in listing]
+        self.counters["listed"] = len(listing)
+        self.counters["unchanged"] = len(listing) - len(changed)
+        if limit is not None:
+            changed = changed[:limit]
+
+        logger.info(f"{self.index_name}: {len(listing)} documents, {len(changed)} new or changed, {len(removed)} removed")
+        if dry_run:
+            return dict(self.counters, changed=len(changed), to_remove=len(removed))
+
+        for source_id in removed:
+            self.delete(known[source_id][1])
+            self.manifest.remove(self.index_name, source_id)
+            self.counters["removed"] += 1
+
+        if changed:
+            self.ingest(source, changed, known)
+        if self.counters["ingested"] or self.counters["removed"]:
+            self.manifest.bump_version(self.index_name)
+
+        elapsed = time.perf_counter() - started
+        return dict(self.counters, seconds=round(elapsed, 2),
+                    chunks_per_second=round(self.counters["chunks"] / elapsed, 1) if elapsed else 0.0)
+
+    def ingest(self, source, changed, known):
+        executor = create_executor(self.INGEST_OCR_WORKERS, "ingest-ocr")
+        embed_executor = create_executor(self.EMBED_MAX_IN_FLIGHT, "ingest-embed")
+        # source_id -> [etag, chunk ids, chunks not yet upserted]
+        pending = {}
+
+        def load(item):
+            source_id, etag = item
+            try:
+                return source_id, etag, source.load(source_id)
+            except Exception as e:
+                logger.error(f"Failed to load {source_id}: {e}")
+                return source_id, etag, None
+
+        def batches():
+            batch = []
+            for source_id, etag, chunks in ordered_map(executor, load, changed, self.INGEST_OCR_WORKERS * 2):
+                if chunks is None:
+                    self.counters["failed"] += 1
+                    continue
+                pending[source_id] = [etag, [chunk_id for chunk_id, _, _ in chunks], len(chunks)]
+                if not chunks:
+                    self.commit(source_id, pending.pop(source_id), known)
+                    continue
+                for chunk in chunks:
+                    batch.append((source_id, chunk))
+                    if len(batch) >= self.EMBED_BATCH_SIZE:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+
+        buffer = []
+        buffer_bytes = 0
+        try:
+            for vectors in ordered_map(embed_executor, self.embed, batches(), self.EMBED_MAX_IN_FLIGHT):
+                for source_id, vector, text in vectors:
+                    size = vector_size(vector)
+                    if buffer and (len(buffer) >= self.UPSERT_BATCH_SIZE or buffer_bytes + size > self.UPSERT_MAX_BYTES):
+                        self.flush(buffer, pending, known)
+                        buffer, buffer_bytes = [], 0
+                    buffer.append((source_id, vector, text))
+                    buffer_bytes += size
+            if buffer:
+                self.flush(buffer, pending, known)
+        finally:
+            shutdown_executor(executor)
+            shutdown_executor(embed_executor)
+
+    def embed(self, batch):
+        vectors = [None] * len(batch)
+        missing = []
+        for i, (_, (_, text, _)) in enumerate(batch):
+            cached = self.embedding_cache.get(EMBEDDING_MODEL, text) if self.embedding_cache else None
+            if cached is not None:
+                vectors[i] = cached
+                self._count("cached_embeddings")
+            else:
+                missing.append(i)
+
+        if missing:
+            response = self.emb_llm.embeddings.create(model=EMBEDDING_MODEL, input=[batch[i][1][1] for i in missing])
+            self._count("embed_calls")
+            for item in response.data:
+                i = missing[item.index]
+                vectors[i] = item.embedding
+                if self.embedding_cache:
+                    self.embedding_cache.put(EMBEDDING_MODEL, batch[i][1][1], item.embedding)
+
+        return [
+            (source_id, {"id": chunk_id, "values": vector, "metadata": metadata}, text)
+            for (source_id, (chunk_id, text, metadata)), vector in zip(batch, vectors)
+        ]
+
+    def flush(self, buffer, pending, known):
+        self.index.upsert(vectors=[vector for _, vector, _ in buffer])
+        if self.lexical is not None:
+            self.lexical.upsert([(vector["id"], text, vector["metadata"]) for _, vector, text in buffer])
+        self.counters["upsert_calls"] += 1
+        self.counters["chunks"] += len(buffer)
+        for source_id, _, _ in buffer:
+            entry = pending[source_id]
+            entry[2] -= 1
+            if entry[2] == 0:
+                self.commit(source_id, pending.pop(source_id), known)
+
+    def commit(self, source_id, entry, known):
+        etag, chunk_ids, _ = entry
+        # A shorter new version leaves the old tail chunks behind.
+        stale = set(known.get(source_id, (None, []))[1]) - set(chunk_ids)
+        if stale:
+            self.delete(sorted(stale))
+        self.manifest.record(self.index_name, source_id, etag, chunk_ids)
+        self.counters["ingested"] += 1
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def delete(self, ids):
+        for i in range(0, len(ids), self.DELETE_BATCH_SIZE):
+            self.index.delete(ids=ids[i:i + self.DELETE_BATCH_SIZE])
+            if self.lexical is not None:
+                self.lexical.delete(ids[i:i + self.DELETE_BATCH_SIZE])
+            self.counters["delete_calls"] += 1
+
+
+def resolve_index(index_name):
+    try:
+        return registry.get(f"index:{index_name}")
+    except KeyError:
+        from registry import _vector_index
+        return _vector_index(index_name)()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally ingest judgments or laws into a vector index")
+    subparsers = parser.add_subparsers(dest="source", required=True)
+    cases = subparsers.add_parser("cases", help="OCR and index the PDFs in a blob container")
+    cases.add_argument("--container", default=os.getenv("AZURE_CONTAINER_NAME_3"))
+    # CaseSearch reads the vectors and lexical postings of PINECONE_INDEX_NAME.
+    cases.add_argument("--index", default=os.getenv("PINECONE_INDEX_NAME"))
+    laws = subparsers.add_parser("laws", help="index law records from a JSON list")
+    laws.add_argument("--file", default="laws.json")
+    laws.add_argument("--index", default="law-kb")
+    for sub in (cases, laws):
+        sub.add_argument("--limit", type=int, help="process at most this many new or changed documents")
+        sub.add_argument("--dry-run", action="store_true", help="only report what would change")
+        sub.add_argument("--full", action="store_true",
+                         help="reprocess unchanged documents too, e.g. to backfill the lexical index")
+    args = parser.parse_args(argv)
+
+    if args.source == "cases":
+        if not args.container:
+            parser.error("--container or AZURE_CONTAINER_NAME_3 is required")
+        if not args.index:
+            parser.error("--index or PINECONE_INDEX_NAME is required")
+        source = BlobSource(registry.get("blob_service"), args.container,
+                            registry.get("document_analysis"), registry.get("ocr_store"))
+    else:
+        source = LawSource(args.file)
+
+    manifest = IngestManifest()
+    try:
+        lexical = LexicalIndex(args.index)
+        ingestor = Ingestor(resolve_index(args.index), args.index, registry.get("emb_llm"), manifest,
+                            registry.get("embedding_cache"), lexical)
+        with route(f"ingest:{args.source}"):
+            result = ingestor.run(source, limit=args.limit, dry_run=args.dry_run, full=args.full)
+        lexical.compact()
+        lexical.close()
+        print(json.dumps(result, indent=2))
+    finally:
+        manifest.close()
+        registry.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
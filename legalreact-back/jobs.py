@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrency import create_executor, shutdown_executor, submit
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+
+    def __init__(self, handlers, path=None, max_workers=None, max_pending=None):
+        self.JOB_STORE_PATH = path or os.getenv("JOB_STORE_PATH", "cache/jobs.sqlite3")
+        self.JOB_MAX_WORKERS = max_workers or int(os.getenv("JOB_MAX_WORKERS", "4"))
+        self.JOB_MAX_PENDING = max_pending or int(os.getenv("JOB_MAX_PENDING", "100"))
+        self.JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+        # Every worker process shares the store; each one marks the jobs it owns
+        # and refreshes them so the others can tell when it has died.
+        self.JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+        self.JOB_OWNER_TIMEOUT_SECONDS = float(os.getenv("JOB_OWNER_TIMEOUT_SECONDS", "60"))
+
+        self.handlers = handlers
+        self._pid = os.getpid()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._cancelled = set()
+        self._executor = create_executor(self.JOB_MAX_WORKERS, "jobs")
+        self._db = self._open_db(self.JOB_STORE_PATH)
+        self._recover(startup=True)
+        self._heartbeat = threading.Thread(target=self._beat, name="jobs-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _open_db(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, idempotency_key TEXT UNIQUE, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "owner_pid INTEGER, heartbeat_at REAL)"
+        )
+        # Stores created before jobs had owners.
+        columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner_pid", "INTEGER"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        return db
+
+    def _recover(self, startup=False):
+        # Only jobs whose owner has died are touched. Work that was running
+        # then cannot be resumed safely; queued work never started and is
+        # taken over, by whichever process claims it first.
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, payload, status, owner_pid, heartbeat_at FROM jobs "
+                "WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING)
+            ).fetchall()
+            taken = []
+            for job_id, kind, payload, status, owner_pid, heartbeat_at in rows:
+                if owner_pid == self._pid:
+                    # Nothing is ours yet at startup, so these were left by an
+                    # earlier process that had the same pid.
+                    if not startup:
+                        continue
+                elif not self._dead(owner_pid, heartbeat_at, now):
+                    continue
+                if status == RUNNING:
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                        "WHERE id = ? AND status = ? AND owner_pid IS ?",
+                        (FAILED, "Interrupted by server restart", now, job_id, RUNNING, owner_pid)
+                    )
+                    continue
+                claimed = self._db.execute(
+                    "UPDATE jobs SET owner_pid = ?, heartbeat_at = ? "
+                    "WHERE id = ? AND status = ? AND owner_pid IS ?",
+                    (self._pid, now, job_id, QUEUED, owner_pid)
+                ).rowcount
+                if claimed:
+                    taken.append((job_id, kind, payload))
+            self._db.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (now - self.JOB_RETENTION_SECONDS,)
+            )
+        for job_id, kind, payload in taken:
+            logger.info(f"Job {job_id} taken over ({kind})")
+            self._schedule(job_id, kind, json.loads(payload))
+
+    def _dead(self, owner_pid, heartbeat_at, now):
+        if owner_pid is None or heartbeat_at is None:
+            return True
+        if heartbeat_at < now - self.JOB_OWNER_TIMEOUT_SECONDS:
+            return True
+        return not _alive(owner_pid)
+
+    def _beat(self):
+        while not self._stopped.wait(self.JOB_HEARTBEAT_SECONDS):
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner_pid = ? AND status IN (?, ?)",
+                        (time.time(), self._pid, QUEUED, RUNNING)
+                    )
+                self._recover()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def submit(self, kind, payload, idempotency_key=None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        with self._lock:
+            existing = self._find(idempotency_key)
+            if existing:
+                return existing, False
+
+            # Other workers write to the same store; the count and the insert
+            # must see the same table.
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+                ).fetchone()[0]
+                if pending >= self.JOB_MAX_PENDING:
+                    raise QueueFullError("Too many pending jobs, retry later.")
+
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                inserted = self._db.execute(
+                    "INSERT INTO jobs (id, kind, payload, status, idempotency_key, created_at, owner_pid, heartbeat_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(idempotency_key) DO NOTHING",
+                    (job_id, kind, json.dumps(payload), QUEUED, idempotency_key, now, self._pid, now)
+                ).rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            if not inserted:
+                # Another worker stored the same key in between.
+                return self._find(idempotency_key), False
+
+        self._schedule(job_id, kind, payload)
+        logger.info(f"Job {job_id} queued ({kind})")
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._load(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._load(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            # The job may belong to another worker: it sees the status and
+            # skips the job, or drops the result of a handler that is running.
+            future = self._futures.pop(job_id, None)
+            if future is None or not future.cancel():
+                # A running handler cannot be interrupted; its result is discarded instead.
+                self._cancelled.add(job_id)
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+            return self._load(job_id)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._heartbeat.join()
+        shutdown_executor(self._executor)
+        with self._lock:
+            self._db.close()
+
+    def close(self):
+        self.shutdown()
+
+    def _schedule(self, job_id, kind, payload):
+        future = submit(self._executor, self._run, job_id, kind, payload)
+        with self._lock:
+            if not future.done():
+                self._futures[job_id] = future
+
+    def _run(self, job_id, kind, payload):
+        with self._lock:
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                return
+            now = time.time()
+            claimed = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = ? AND owner_pid = ?",
+                (RUNNING, now, now, job_id, QUEUED, self._pid)
+            ).rowcount
+            if not claimed:
+                # Cancelled, or taken over by another worker.
+                self._futures.pop(job_id, None)
+                return
+
+        logger.info(f"Job {job_id} started ({kind})")
+        try:
+            result = self.handlers[kind](payload)
+            status, error = SUCCEEDED, None
+            if isinstance(result, dict) and "error" in result:
+                status, error = FAILED, str(result["error"])
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            result, status, error = None, FAILED, str(e)
+
+        with self._lock:
+            self._futures.pop(job_id, None)
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                return
+            self._finish(job_id, status, result, error)
+        logger.info(f"Job {job_id} {status}")
+
+    def _finish(self, job_id, status, result, error):
+        # A job cancelled or given up on meanwhile keeps that status.
+        self._db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND status = ? AND owner_pid = ?",
+            (status, json.dumps(result, default=str) if result is not None else None, error, time.time(),
+             job_id, RUNNING, self._pid)
+        )
+
+    def _find(self, idempotency_key):
+        if not idempotency_key:
+            return None
+        row = self._db.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        return self._load(row[0]) if row else None
+
+    def _load(self, job_id):
+        row = self._db.execute(
+            "SELECT id, kind, status, result, error, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "error": row[4],
+            "created_at": row[5],
+            "started_at": row[6],
+            "finished_at": row[7],
+        }
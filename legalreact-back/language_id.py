@@ -0,0 +1,164 @@
+import os
+import json
+import math
+import logging
+import unicodedata
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# (first code point, last code point, script)
+SCRIPT_RANGES = [
+    (0x0041, 0x024F, "latin"),
+    (0x0370, 0x03FF, "greek"),
+    (0x0400, 0x04FF, "cyrillic"),
+    (0x0590, 0x05FF, "hebrew"),
+    (0x0600, 0x06FF, "arabic"),
+    (0x0750, 0x077F, "arabic"),
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "gurmukhi"),
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B00, 0x0B7F, "oriya"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+    (0x0E00, 0x0E7F, "thai"),
+    (0x1100, 0x11FF, "hangul"),
+    (0x3040, 0x30FF, "kana"),
+    (0x4E00, 0x9FFF, "han"),
+    (0xAC00, 0xD7AF, "hangul"),
+    (0xFB50, 0xFDFF, "arabic"),
+    (0xFE70, 0xFEFF, "arabic"),
+]
+
+# Scripts used by a single language we translate into.
+SCRIPT_LANGUAGES = {
+    "greek": "el",
+    "hebrew": "he",
+    "bengali": "bn",
+    "gurmukhi": "pa",
+    "gujarati": "gu",
+    "oriya": "or",
+    "tamil": "ta",
+    "telugu": "te",
+    "kannada": "kn",
+    "malayalam": "ml",
+    "thai": "th",
+    "hangul": "ko",
+    "kana": "ja",
+}
+
+# Scripts shared by several languages; settled with character trigram profiles.
+PROFILED_SCRIPTS = {
+    "latin": ["en", "fr", "es", "de", "it", "pt", "nl"],
+    "devanagari": ["hi", "mr"],
+    "arabic": ["ar", "ur", "fa"],
+}
+
+PROFILE_SIZE = 1000
+MIN_LETTERS = 10
+# Trigram scores settle after a sentence or so; shorter samples get proportionally less confidence.
+FULL_CONFIDENCE_LETTERS = 80
+
+
+def script_of(ch):
+    code = ord(ch)
+    for low, high, script in SCRIPT_RANGES:
+        if low <= code <= high:
+            return script
+    return None
+
+
+def trigrams(text):
+    counts = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+    return counts
+
+
+def sample_text(text, sample_chars):
+    # Three windows spread over the document, so an English cover page does
+    # not decide the language of a Hindi filing.
+    if len(text) <= sample_chars:
+        return text
+    window = sample_chars // 3
+    middle = len(text) // 2
+    return " ".join([text[:window], text[middle - window // 2:middle + window // 2], text[-window:]])
+
+
+def clean(text):
+    chars = []
+    for ch in unicodedata.normalize("NFC", text).lower():
+        category = unicodedata.category(ch)
+        chars.append(ch if category[0] in ("L", "M") else " ")
+    return " ".join("".join(chars).split())
+
+
+class LanguageIdentifier:
+
+    def __init__(self, profiles_path=None):
+        self.PROFILES_PATH = profiles_path or os.getenv("LANGID_PROFILES_PATH", "language_profiles.json")
+        self.LANGID_SAMPLE_CHARS = int(os.getenv("LANGID_SAMPLE_CHARS", "3000"))
+        self.profiles = self.load_profiles(self.PROFILES_PATH)
+
+    def load_profiles(self, file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                texts = json.load(file)
+        except Exception as e:
+            logger.error(f"Failed to load language profiles: {e}")
+            return {}
+        profiles = {}
+        for language, text in texts.items():
+            counts = dict(trigrams(clean(text)).most_common(PROFILE_SIZE))
+            norm = math.sqrt(sum(value * value for value in counts.values()))
+            profiles[language] = {gram: value / norm for gram, value in counts.items()}
+        return profiles
+
+    def detect(self, text):
+        # Returns (language, confidence); language is None when nothing usable was found.
+        sample = clean(sample_text(text or "", self.LANGID_SAMPLE_CHARS))
+        scripts = Counter(script for script in map(script_of, sample) if script)
+        letters = sum(scripts.values())
+        if letters < MIN_LETTERS:
+            return None, 0.0
+
+        if scripts["kana"] and scripts["kana"] >= 0.1 * (scripts["kana"] + scripts["han"]):
+            scripts["kana"] += scripts.pop("han", 0)
+        script, count = scripts.most_common(1)[0]
+        share = count / letters
+
+        if script in SCRIPT_LANGUAGES:
+            return SCRIPT_LANGUAGES[script], share
+        if script == "han":
+            return "zh-Hans", share
+        if script == "cyrillic":
+            # Russian is the only Cyrillic language we serve; other Cyrillic
+            # languages are left to the remote detector.
+            return "ru", 0.8 * share
+        if script not in PROFILED_SCRIPTS:
+            return None, 0.0
+
+        scores = self.score(sample, PROFILED_SCRIPTS[script])
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_language, best = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        margin = 1.0 - second / best if best else 0.0
+        length_factor = min(1.0, letters / FULL_CONFIDENCE_LETTERS)
+        return best_language, share * margin * length_factor
+
+    def score(self, sample, languages):
+        counts = trigrams(sample)
+        norm = math.sqrt(sum(value * value for value in counts.values())) or 1.0
+        scores = {}
+        for language in languages:
+            profile = self.profiles.get(language)
+            if profile:
+                scores[language] = sum(profile.get(gram, 0.0) * value for gram, value in counts.items()) / norm
+        return scores
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import sqlite3
+import logging
+import threading
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall((text or "").casefold()) if token not in STOPWORDS]
+
+
+class BM25:
+    # In-memory Okapi BM25 that supports adding and removing documents one at a time.
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id, text):
+        self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+        self.terms[doc_id] = list(counts)
+        length = sum(counts.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+
+    def search(self, query, top_k):
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average = self.total_length / count or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+class LexicalIndex:
+    # BM25 over chunk texts for one vector index. Writers (ingest.py) append to
+    # a SQLite log; readers replay new log entries into memory at most every
+    # LEXICAL_REFRESH_SECONDS, so the server picks up ingestion without a restart.
+
+    def __init__(self, index_name, path=None):
+        self.LEXICAL_INDEX_PATH = path or os.getenv("LEXICAL_INDEX_PATH", "cache/lexical.sqlite3")
+        self.LEXICAL_REFRESH_SECONDS = float(os.getenv("LEXICAL_REFRESH_SECONDS", "60"))
+
+        self.index_name = index_name
+        self._lock = threading.Lock()
+        self._bm25 = BM25()
+        self._last_seq = 0
+        self._refreshed_at = 0.0
+        if self.LEXICAL_INDEX_PATH != ":memory:":
+            os.makedirs(os.path.dirname(self.LEXICAL_INDEX_PATH) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.LEXICAL_INDEX_PATH, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # text is NULL for a deletion.
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, index_name TEXT NOT NULL, id TEXT NOT NULL, "
+            "text TEXT, metadata TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_lookup ON chunks (index_name, id, seq)")
+
+    def __len__(self):
+        self.refresh()
+        return len(self._bm25)
+
+    def upsert(self, records):
+        # records: (id, text, metadata) tuples.
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO chunks (index_name, id, text, metadata) VALUES (?, ?, ?, ?)",
+                [(self.index_name, chunk_id, text or "", json.dumps(metadata or {})) for chunk_id, text, metadata in records]
+            )
+            # Applied on the next search, so a write-only ingest run never builds postings.
+            self._refreshed_at = 0.0
+
+    def delete(self, ids):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO chunks (index_name, id, text, metadata) VALUES (?, ?, NULL, NULL)",
+                [(self.index_name, chunk_id) for chunk_id in ids]
+            )
+            self._refreshed_at = 0.0
+
+    def search(self, query, top_k=20):
+        self.refresh()
+        with self._lock:
+            hits = self._bm25.search(query, top_k)
+            if not hits:
+                return []
+            metadata = self._metadata([doc_id for doc_id, _ in hits])
+        return [{"id": doc_id, "score": score, "metadata": metadata.get(doc_id, {})} for doc_id, score in hits]
+
+    def refresh(self, force=False):
+        now = time.time()
+        if not force and now - self._refreshed_at < self.LEXICAL_REFRESH_SECONDS:
+            return
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, id, text FROM chunks WHERE index_name = ? AND seq > ? ORDER BY seq",
+                (self.index_name, self._last_seq)
+            ).fetchall()
+            for seq, chunk_id, text in rows:
+                if text is None:
+                    self._bm25.remove(chunk_id)
+                else:
+                    self._bm25.add(chunk_id, text)
+                self._last_seq = seq
+            self._refreshed_at = now
+        if rows:
+            logger.info(f"Lexical index {self.index_name}: applied {len(rows)} changes, {len(self._bm25)} chunks")
+
+    def compact(self):
+        # Drop log rows superseded by a later write to the same id. The latest
+        # deletion markers stay so a running reader still sees them.
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM chunks WHERE index_name = ? AND seq NOT IN "
+                "(SELECT MAX(seq) FROM chunks WHERE index_name = ? GROUP BY id)",
+                (self.index_name, self.index_name)
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _metadata(self, ids):
+        rows = self._db.execute(
+            f"SELECT id, metadata FROM chunks WHERE index_name = ? AND id IN ({','.join('?' * len(ids))}) "
+            "AND text IS NOT NULL ORDER BY seq",
+            (self.index_name, *ids)
+        ).fetchall()
+        return {chunk_id: json.loads(metadata) for chunk_id, metadata in rows}
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # rankings: lists of matches (dicts with "id" and "metadata"), best first.
+    # Returns one list ordered by sum(1 / (k + rank)), keeping the first metadata seen.
+    fused = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, 1):
+            match_id = match.get("id")
+            if match_id not in fused:
+                fused[match_id] = {"id": match_id, "metadata": match.get("metadata") or {}, "score": 0.0}
+            fused[match_id]["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)
@@ -1,6 +1,7 @@
 from langchain_openai import AzureChatOpenAI
 import os
 import openai
+from ratelimit import RATE_LIMIT_ENABLED
 
 class LLM:
 
@@ -12,19 +13,25 @@ class LLM:
         self.AZURE_OPENAI_KEY = os.getenv("EMBEDDING_API_KEY")
         self.AZURE_OPENAI_MODEL = "text-embedding-ada-002"
         self.AZURE_OPENAI_VERSION = os.getenv("EMBEDDING_API_VERSION")
+        # Retries happen in the rate limiter when it is on, not in the SDK.
+        self.MAX_RETRIES = 0 if RATE_LIMIT_ENABLED else 2
 
-    def initialize_emb_llm(self):
+    def initialize_emb_llm(self, http_client=None):
         return openai.AzureOpenAI(
         api_key=self.AZURE_OPENAI_KEY,
         api_version=self.AZURE_OPENAI_VERSION,
-        azure_endpoint=self.AZURE_OPENAI_ENDPOINT
+        azure_endpoint=self.AZURE_OPENAI_ENDPOINT,
+        max_retries=self.MAX_RETRIES,
+        http_client=http_client
     )
 
-    def initialize_gen_llm(self):
+    def initialize_gen_llm(self, http_client=None):
         return AzureChatOpenAI(
         azure_deployment="gpt-4o-mini",
         azure_endpoint=self.AZURE_ENDPOINT,
         api_key=self.OPENAI_API_KEY,
         api_version="2024-10-21",
-        temperature=0.2
+        temperature=0.2,
+        max_retries=self.MAX_RETRIES,
+        http_client=http_client
     )
\ No newline at end of file
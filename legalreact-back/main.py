@@ -1,13 +1,53 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, send_file, g
 from flask_cors import CORS
 from workflow import app_workflow
-import os
-from utils import Utils
+from agents import DocumentRequired
+from events import stream_workflow
+from jobs import QueueFullError
+from bulk import BulkError, parse_records
+from uploads import UploadError, UploadTooLarge, read_request_file
+from registry import registry
+from serving import warmup
+import metrics
+import atexit
+import time
 
 app = Flask(__name__)
 CORS(app)
 
-utils = Utils()
+atexit.register(registry.shutdown)
+
+@app.before_request
+def start_request_metrics():
+    # Under gunicorn the worker starts warming before its first request; other
+    # servers start it here.
+    warmup.ensure_started()
+    g.metrics_started = time.perf_counter()
+    g.metrics_route = metrics.set_route(request.endpoint or "unknown")
+
+@app.after_request
+def record_request_metrics(response):
+    if "metrics_started" in g:
+        metrics.observe_request(request.endpoint or "unknown", request.method, response.status_code,
+                                time.perf_counter() - g.metrics_started)
+    return response
+
+@app.teardown_request
+def reset_request_route(exc):
+    if "metrics_route" in g:
+        metrics.reset_route(g.pop("metrics_route"))
+
+@app.route("/healthz", methods=["GET"])
+def liveness():
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/readyz", methods=["GET"])
+def readiness():
+    return jsonify(warmup.status()), 200 if warmup.ready() else 503
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.route("/", methods=["GET"])
 def home():
@@ -15,30 +55,182 @@ def home():
 
 @app.route("/upload-pdf", methods=["POST"])
 def upload_pdf():
-    # Handling PDF upload (using helper function)
-    file = request.files.get("file")
-    if not file:
-        return jsonify({"error": "No file part in the request"}), 400
-
-    filename = file.filename
-    temp_path = os.path.join("/tmp", filename)
-    file.save(temp_path)
+    # The body is streamed into staged blocks; nothing is written to local disk.
+    uploads = registry.get("uploads")
+    if request.content_length and request.content_length > uploads.MAX_UPLOAD_BYTES + 64 * 1024:
+        return jsonify({"error": f"Upload exceeds {uploads.MAX_UPLOAD_BYTES} bytes"}), 413
 
     try:
-        message = utils.upload_pdf_to_blob(temp_path, filename)
-        os.remove(temp_path)
-        return jsonify({"message": message, "filename": filename}), 200
+        filename, chunks = read_request_file(request)
+        upload = uploads.upload(filename, chunks)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    message = f"File {filename} already uploaded." if upload["deduplicated"] else f"File {filename} uploaded successfully."
+    return jsonify({"message": message, "document_id": upload["document_id"], "filename": filename,
+                    "sha256": upload["sha256"], "deduplicated": upload["deduplicated"]}), 200
+
 @app.route("/invoke", methods=["POST"])
 def invoke_workflow():
     data = request.json
     if not data or "user_input" not in data:
         return jsonify({"error": "user_input is required"}), 400
 
-    result = app_workflow.invoke(data)
+    try:
+        result = app_workflow.invoke(data)
+    except DocumentRequired as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(result)
 
+@app.route("/invoke/stream", methods=["POST"])
+def invoke_workflow_stream():
+    data = request.json
+    if not data or "user_input" not in data:
+        return jsonify({"error": "user_input is required"}), 400
+
+    return Response(
+        stream_workflow(app_workflow, data),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    data = request.json
+    if not data or "user_input" not in data:
+        return jsonify({"error": "user_input is required"}), 400
+
+    kind = data.get("action")
+    if not kind:
+        kind, _ = registry.get("classifier").classify_query(data)
+    if kind not in ("perform_action", "document_generation"):
+        return jsonify({"error": f"'{kind}' cannot run as a background job"}), 400
+    if kind == "perform_action" and not data.get("document_id"):
+        return jsonify({"error": "document_id is required. Upload a PDF and pass the document_id it returns."}), 400
+
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+    payload = {"user_input": data["user_input"]}
+    if data.get("document_id"):
+        payload["document_id"] = data["document_id"]
+    try:
+        job, created = registry.get("jobs").submit(kind, payload, idempotency_key)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify(job), 202 if created else 200
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = registry.get("jobs").get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({k: v for k, v in job.items() if k != "result"})
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = registry.get("jobs").get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"job_id": job_id, "status": job["status"]}), 409
+    if job["status"] == "succeeded":
+        return jsonify(job["result"])
+    return jsonify({"job_id": job_id, "status": job["status"], "error": job["error"], "result": job["result"]}), 200
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    job = registry.get("jobs").cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({k: v for k, v in job.items() if k != "result"})
+
+@app.route("/documents/bulk", methods=["POST"])
+def bulk_documents():
+    # Multipart with a "records" CSV/JSONL file, or JSON with a "records" list.
+    if request.files.get("records"):
+        upload = request.files["records"]
+        options = request.form
+        try:
+            records = parse_records(upload.read(), upload.filename or "")
+        except BulkError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        options = request.json or {}
+        records = options.get("records") or []
+
+    template_name = options.get("template")
+    if not template_name:
+        return jsonify({"error": "template is required"}), 400
+
+    container = options.get("container")
+    destination = (container, options.get("prefix", "")) if container else None
+    bulk = registry.get("bulk")
+    try:
+        prepared = bulk.prepare(template_name, records, destination)
+    except BulkError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if destination:
+        return jsonify(bulk.write_to_container(template_name, records, *destination, prepared=prepared))
+    return Response(
+        bulk.stream_zip(template_name, records, prepared),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={template_name}.zip"}
+    )
+
+@app.route("/documents/<document_id>", methods=["GET"])
+def download_document(document_id):
+    path = registry.get("document_store").path(document_id)
+    if path is None:
+        return jsonify({"error": "Document not found"}), 404
+    return send_file(
+        path,
+        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        as_attachment=True,
+        download_name="generated_document.docx"
+    )
+
+@app.route("/translations/<translation_id>", methods=["GET"])
+def download_translation(translation_id):
+    path = registry.get("document_store").path(translation_id, "txt")
+    if path is None:
+        return jsonify({"error": "Translation not found"}), 404
+    return send_file(path, mimetype="text/plain; charset=utf-8", as_attachment=False)
+
+@app.route("/stats/clients", methods=["GET"])
+def client_stats():
+    return jsonify(registry.stats())
+
+@app.route("/stats/router", methods=["GET"])
+def router_stats():
+    return jsonify(registry.get("router").stats())
+
+@app.route("/stats/ocr", methods=["GET"])
+def ocr_stats():
+    return jsonify(registry.get("ocr_store").stats())
+
+@app.route("/stats/embeddings", methods=["GET"])
+def embedding_stats():
+    return jsonify(registry.get("embedding_cache").stats())
+
+@app.route("/stats/semantic-cache", methods=["GET"])
+def semantic_cache_stats():
+    return jsonify(registry.get("semantic_cache").stats())
+
+@app.route("/stats/uploads", methods=["GET"])
+def upload_stats():
+    return jsonify(registry.get("uploads").stats())
+
+@app.route("/stats/rate-limits", methods=["GET"])
+def rate_limit_stats():
+    return jsonify(registry.get("rate_limits").stats())
+
+@app.route("/stats/templates", methods=["GET"])
+def template_stats():
+    return jsonify(registry.get("template_cache").stats())
+
 if __name__ == "__main__":
     app.run(debug=True)
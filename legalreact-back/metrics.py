@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit, parse_qs
+import httpx
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+_route = contextvars.ContextVar("metrics_route", default="none")
+
+
+def current_route():
+    return _route.get()
+
+
+def set_route(name):
+    return _route.set(name)
+
+
+def reset_route(token):
+    _route.reset(token)
+
+
+@contextmanager
+def route(name):
+    # Labels every external call made inside the block (including work handed
+    # to executors through concurrency.submit) with the route that caused it.
+    token = set_route(name)
+    try:
+        yield
+    finally:
+        reset_route(token)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values = {}
+
+    def observe(self, value, *values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(values)
+            if entry is None:
+                entry = self._values[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, tuple(labels)))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, tuple(labels), buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+
+metrics = Metrics()
+
+REQUEST_SECONDS = metrics.histogram(
+    "legalreact_http_request_seconds", "Flask request latency", ("endpoint", "method", "status"))
+NODE_SECONDS = metrics.histogram(
+    "legalreact_workflow_node_seconds", "Workflow node latency", ("node",))
+NODE_ERRORS = metrics.counter(
+    "legalreact_workflow_node_errors_total", "Workflow nodes that raised or returned an error", ("node",))
+EXTERNAL_SECONDS = metrics.histogram(
+    "legalreact_external_seconds", "Latency of calls to external services", ("service", "operation", "route"))
+EXTERNAL_ERRORS = metrics.counter(
+    "legalreact_external_errors_total", "Failed calls to external services", ("service", "operation", "route"))
+PAYLOAD_BYTES = metrics.histogram(
+    "legalreact_external_payload_bytes", "Request and response body sizes of external calls",
+    ("service", "operation", "direction", "route"), buckets=SIZE_BUCKETS)
+LLM_TOKENS = metrics.counter(
+    "legalreact_llm_tokens_total", "Tokens reported by the model API", ("operation", "kind", "route"))
+
+
+_tracer = None
+if TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("legalreact")
+    except ImportError:
+        logger.warning("TRACING_ENABLED is set but opentelemetry is not installed; spans are disabled")
+
+
+def span(name, **attributes):
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+@contextmanager
+def track(service, operation):
+    # Times one external call; the caller marks soft failures with failed().
+    call = _Call()
+    if not METRICS_ENABLED and _tracer is None:
+        yield call
+        return
+    label = current_route()
+    started = time.perf_counter()
+    with span(f"{service}.{operation}", service=service, operation=operation, route=label):
+        try:
+            yield call
+        except Exception:
+            call.error = True
+            raise
+        finally:
+            if METRICS_ENABLED:
+                EXTERNAL_SECONDS.observe(time.perf_counter() - started, service, operation, label)
+                if call.error:
+                    EXTERNAL_ERRORS.inc(service, operation, label)
+                for direction, size in call.sizes:
+                    PAYLOAD_BYTES.observe(size, service, operation, direction, label)
+
+
+class _Call:
+
+    def __init__(self):
+        self.error = False
+        self.sizes = []
+
+    def failed(self, failed=True):
+        self.error = self.error or failed
+
+    def payload(self, direction, size):
+        if size is not None:
+            self.sizes.append((direction, int(size)))
+
+
+def observe_request(endpoint, method, status, seconds):
+    if METRICS_ENABLED:
+        REQUEST_SECONDS.observe(seconds, endpoint, method, status)
+
+
+def record_tokens(operation, usage):
+    if not METRICS_ENABLED or not usage:
+        return
+    label = current_route()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(operation, kind.split("_")[0], label, amount=usage[kind])
+
+
+def traced_node(name, fn):
+    # Wraps a workflow node: the node name becomes the route label for
+    # everything it calls.
+    def node(inputs):
+        if not METRICS_ENABLED and _tracer is None:
+            return fn(inputs)
+        started = time.perf_counter()
+        failed = True
+        with route(name), span(f"node.{name}", node=name):
+            try:
+                result = fn(inputs)
+                failed = isinstance(result, dict) and "error" in result
+                return result
+            finally:
+                if METRICS_ENABLED:
+                    NODE_SECONDS.observe(time.perf_counter() - started, name)
+                    if failed:
+                        NODE_ERRORS.inc(name)
+    node.__name__ = getattr(fn, "__name__", name)
+    return node
+
+
+def _content_length(headers):
+    value = headers.get("Content-Length") or headers.get("content-length")
+    return int(value) if value and value.isdigit() else None
+
+
+def classify_azure_request(method, url):
+    # Maps a REST call made through the shared requests session to (service, operation).
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    query = parse_qs(parts.query)
+    comp = query.get("comp", [""])[0]
+    if ".blob." in host or host in ("127.0.0.1", "localhost"):
+        if comp == "list" or query.get("restype") == ["container"]:
+            return "blob", "list"
+        if comp in ("block", "blocklist", "metadata", "properties"):
+            return "blob", {"block": "stage_block", "blocklist": "commit_block_list"}.get(comp, comp)
+        return "blob", {"GET": "download", "PUT": "upload", "HEAD": "properties", "DELETE": "delete"}.get(method, method.lower())
+    if "translator" in host:
+        return "translator", parts.path.rstrip("/").rsplit("/", 1)[-1] or "request"
+    if "formrecognizer" in parts.path or "documentintelligence" in parts.path:
+        return "document_intelligence", "analyze" if method == "POST" else "poll"
+    return host or "http", method.lower()
+
+
+class MetricsAdapter(HTTPAdapter):
+    # Mounted on the shared requests session, which also carries the Azure SDK
+    # transport: covers Blob, Document Intelligence and Translator calls.
+
+    def send(self, request, **kwargs):
+        if not METRICS_ENABLED and _tracer is None:
+            return super().send(request, **kwargs)
+        service, operation = classify_azure_request(request.method, request.url)
+        with track(service, operation) as call:
+            body = request.body
+            call.payload("request", len(body) if isinstance(body, (bytes, str)) else _content_length(request.headers))
+            response = super().send(request, **kwargs)
+            call.failed(response.status_code >= 400)
+            call.payload("response", _content_length(response.headers))
+            return response
+
+
+class MetricsTransport(httpx.BaseTransport):
+    # Wraps the httpx transport used by the OpenAI clients. JSON responses are
+    # read here so their token usage can be recorded; streamed ones are not.
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request):
+        if not METRICS_ENABLED and _tracer is None:
+            return self.transport.handle_request(request)
+        path = request.url.path
+        operation = "embeddings" if path.endswith("/embeddings") else "chat" if "/chat/" in path else "request"
+        with track("openai", operation) as call:
+            call.payload("request", _content_length(request.headers))
+            response = self.transport.handle_request(request)
+            call.failed(response.status_code >= 400)
+            if response.headers.get("content-type", "").startswith("application/json"):
+                response.read()
+                call.payload("response", len(response.content))
+                try:
+                    record_tokens(operation, json.loads(response.content).get("usage"))
+                except ValueError:
+                    pass
+            return response
+
+    def close(self):
+        self.transport.close()
+
+
+class InstrumentedIndex:
+    # Proxy for a Pinecone or local vector index.
+
+    OPERATIONS = ("query", "upsert", "delete", "fetch", "describe_index_stats")
+
+    def __init__(self, index, service):
+        self._index = index
+        self._service = service
+
+    def __getattr__(self, name):
+        attribute = getattr(self._index, name)
+        if name not in self.OPERATIONS or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with track(self._service, name):
+                return attribute(*args, **kwargs)
+        return call
@@ -0,0 +1,154 @@
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TEXT_LAYER = "text-layer"
+
+# Models whose stored output can answer a request for the key model. The
+# layout model is a superset of read, and a good text layer answers both.
+COMPATIBLE_MODELS = {
+    "prebuilt-read": ["prebuilt-read", "prebuilt-layout", TEXT_LAYER],
+    "prebuilt-layout": ["prebuilt-layout", TEXT_LAYER],
+}
+
+
+def document_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def pages_from_result(result):
+    return [[line.content for line in page.lines] for page in result.pages]
+
+
+def pages_to_text(pages):
+    return "\n".join([line for page in pages for line in page])
+
+
+class OcrStore:
+
+    def __init__(self, path=None):
+        self.OCR_STORE_PATH = path or os.getenv("OCR_STORE_PATH", "cache/ocr.sqlite3")
+        self.OCR_TEXT_LAYER_ENABLED = os.getenv("OCR_TEXT_LAYER_ENABLED", "true").lower() == "true"
+        self.OCR_TEXT_LAYER_MIN_CHARS_PER_PAGE = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS_PER_PAGE", "200"))
+        self.OCR_TEXT_LAYER_MIN_PAGE_COVERAGE = float(os.getenv("OCR_TEXT_LAYER_MIN_PAGE_COVERAGE", "0.9"))
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "text_layer_hits": 0, "misses": 0, "remote_calls": 0}
+        if self.OCR_STORE_PATH != ":memory:":
+            os.makedirs(os.path.dirname(self.OCR_STORE_PATH) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.OCR_STORE_PATH, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results ("
+            "digest TEXT NOT NULL, model_id TEXT NOT NULL, pages TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (digest, model_id))"
+        )
+
+    def get(self, digest, model_id):
+        models = COMPATIBLE_MODELS.get(model_id, [model_id])
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT model_id, pages FROM ocr_results WHERE digest = ? AND model_id IN ({','.join('?' * len(models))})",
+                (digest, *models)
+            ).fetchall()
+        if not rows:
+            return None
+        stored = dict(rows)
+        for model in models:
+            if model in stored:
+                return json.loads(stored[model])
+
+    def put(self, digest, model_id, pages):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_results (digest, model_id, pages, created_at) VALUES (?, ?, ?, ?)",
+                (digest, model_id, json.dumps(pages, ensure_ascii=False), time.time())
+            )
+
+    def lookup(self, data, model_id, digest=None):
+        # data may be a callable that loads the document, so a stored result
+        # for a known digest never needs the bytes themselves.
+        digest = digest or document_digest(data)
+        pages = self.get(digest, model_id)
+        if pages is not None:
+            self._count("hits")
+            logger.info(f"OCR store hit for {digest[:12]} ({model_id})")
+            return pages
+
+        if model_id in COMPATIBLE_MODELS and TEXT_LAYER in COMPATIBLE_MODELS[model_id]:
+            pages = self.extract_text_layer(data() if callable(data) else data)
+            if pages is not None:
+                self.put(digest, TEXT_LAYER, pages)
+                self._count("text_layer_hits")
+                logger.info(f"Using embedded PDF text layer for {digest[:12]}")
+                return pages
+
+        self._count("misses")
+        return None
+
+    def analyze(self, data, model_id, run, digest=None):
+        digest = digest or document_digest(data)
+        pages = self.lookup(data, model_id, digest)
+        if pages is not None:
+            return pages
+        result = run()
+        self._count("remote_calls")
+        pages = pages_from_result(result)
+        self.put(digest, model_id, pages)
+        return pages
+
+    def extract_text_layer(self, data):
+        if not self.OCR_TEXT_LAYER_ENABLED or not data or not data.startswith(b"%PDF"):
+            return None
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            logger.debug("pypdf not installed; PDF text layer fast path disabled")
+            return None
+
+        try:
+            reader = PdfReader(io.BytesIO(data))
+            pages = []
+            for page in reader.pages:
+                text = page.extract_text() or ""
+                pages.append([line.strip() for line in text.splitlines() if line.strip()])
+        except Exception as e:
+            logger.warning(f"Failed to read PDF text layer: {e}")
+            return None
+
+        return pages if self._is_good_text_layer(pages) else None
+
+    def _is_good_text_layer(self, pages):
+        if not pages:
+            return False
+        page_chars = [sum(len(line) for line in page) for page in pages]
+        covered = sum(1 for chars in page_chars if chars >= self.OCR_TEXT_LAYER_MIN_CHARS_PER_PAGE)
+        if covered / len(pages) < self.OCR_TEXT_LAYER_MIN_PAGE_COVERAGE:
+            return False
+        # Broken font encodings come out as replacement characters or "(cid:NN)" runs.
+        text = pages_to_text(pages)
+        if not text.strip():
+            return False
+        readable = sum(1 for ch in text if ch.isalnum() or ch.isspace() or ch in ".,;:()-'\"/&%$₹")
+        return readable / len(text) >= 0.85 and "�" not in text and "(cid:" not in text
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["stored_results"] = self._db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        return counters
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import heapq
+import random
+import logging
+import itertools
+import threading
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from metrics import MetricsAdapter, classify_azure_request, current_route, metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# Upstreams with a governor, and their default concurrency ceilings. RPM/TPM
+# quotas default to 0 (off); for the Translator, TPM counts characters.
+UPSTREAMS = {"chat": 16, "embeddings": 16, "translator": 8}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_PRIORITIES = (
+    "classifier=0,case_search_agent=1,verdict_agent=1,invoke_workflow=1,invoke_workflow_stream=1,"
+    "perform_action=2,document_generation=2,submit_job=3,bulk_documents=3,ingest=4"
+)
+
+WAIT_SECONDS = metrics.histogram(
+    "legalreact_rate_limit_wait_seconds", "Time spent queued for an upstream slot", ("upstream", "route"))
+RETRIES = metrics.counter(
+    "legalreact_rate_limit_retries_total", "Upstream calls retried by the governor", ("upstream", "reason"))
+REJECTED = metrics.counter(
+    "legalreact_rate_limit_rejected_total", "Calls that found no upstream capacity before their deadline",
+    ("upstream", "route"))
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+def retry_after_seconds(headers):
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _priorities():
+    priorities = {}
+    for item in os.getenv("RATE_LIMIT_PRIORITIES", DEFAULT_PRIORITIES).split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            priorities[name.strip()] = int(value)
+    return priorities
+
+
+class TokenBucket:
+    # Refills at per_minute and holds burst_seconds of it. A rate of 0 never limits.
+
+    def __init__(self, per_minute, burst_seconds):
+        self.rate = per_minute / 60.0
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def delay(self, cost, now):
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # A call bigger than the bucket waits for a full one and leaves it in debt.
+        return max(0.0, (min(cost, self.capacity) - self.level) / self.rate)
+
+    def take(self, cost, now):
+        if self.rate:
+            self._refill(now)
+            self.level -= cost
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class Governor:
+    # Client-side limits for one upstream: token buckets for the RPM/TPM quota,
+    # an AIMD concurrency limit that is cut on throttling and creeps back on
+    # success, a pause for Retry-After, and jittered retries within a deadline.
+    # Waiting calls are served by route priority, then arrival.
+
+    def __init__(self, name, max_concurrency, processes=1, priorities=None):
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        # Quotas are per deployment; each serving process takes an equal share.
+        self.RPM = float(os.getenv(f"{prefix}_RPM", "0")) / processes
+        self.TPM = float(os.getenv(f"{prefix}_TPM", "0")) / processes
+        self.MAX_CONCURRENCY = int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrency)))
+        self.MIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", "1"))
+        self.BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+        self.DECREASE_FACTOR = float(os.getenv("RATE_LIMIT_DECREASE_FACTOR", "0.75"))
+        self.DEADLINE_SECONDS = float(os.getenv(f"{prefix}_DEADLINE", os.getenv("RATE_LIMIT_DEADLINE", "60")))
+        self.MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "6"))
+        self.BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "0.5"))
+        self.BACKOFF_CAP = float(os.getenv("RATE_LIMIT_BACKOFF_CAP", "8"))
+
+        self.name = name
+        self.priorities = priorities or {}
+        self.requests = TokenBucket(self.RPM, self.BURST_SECONDS)
+        self.tokens = TokenBucket(self.TPM, self.BURST_SECONDS)
+        self.limit = float(self.MAX_CONCURRENCY)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._counts = {"calls": 0, "throttled": 0, "retries": 0, "rejected": 0}
+
+    def call(self, send, cost=1, errors=()):
+        # send() performs one attempt and returns a response with status_code,
+        # headers and close(); exceptions in errors are retried like a 503.
+        label = current_route()
+        priority = self.priorities.get(label, self.priorities.get(label.split(":", 1)[0], 2))
+        deadline = time.monotonic() + self.DEADLINE_SECONDS
+        attempt = 0
+        while True:
+            started = self._acquire(cost, priority, deadline, label)
+            try:
+                response = send()
+            except errors:
+                self._release(started, ok=False)
+                delay = self._backoff(attempt)
+                if attempt >= self.MAX_RETRIES or time.monotonic() + delay > deadline:
+                    raise
+                reason = "error"
+            else:
+                status = response.status_code
+                retry_after = retry_after_seconds(response.headers) if status in RETRY_STATUSES else None
+                self._release(started, ok=status < 500 and status != 429,
+                              throttled=status in THROTTLE_STATUSES, retry_after=retry_after)
+                if status not in RETRY_STATUSES:
+                    return response
+                delay = max(retry_after or 0.0, self._backoff(attempt))
+                if attempt >= self.MAX_RETRIES or time.monotonic() + delay > deadline:
+                    return response
+                response.close()
+                reason = str(status)
+
+            RETRIES.inc(self.name, reason)
+            with self._cond:
+                self._counts["retries"] += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counts, limit=round(self.limit, 2), in_flight=self._in_flight, queued=len(self._queue),
+                        paused_seconds=round(max(0.0, self._paused_until - time.monotonic()), 2),
+                        rpm=self.RPM, tpm=self.TPM, max_concurrency=self.MAX_CONCURRENCY)
+
+    def _acquire(self, cost, priority, deadline, label):
+        queued = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self._queue[0] == ticket and self._in_flight < max(self.MIN_CONCURRENCY, int(self.limit)):
+                        delay = max(self._paused_until - now, self.requests.delay(1, now), self.tokens.delay(cost, now))
+                        if delay <= 0:
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0 or (delay is not None and delay > remaining):
+                        self._counts["rejected"] += 1
+                        REJECTED.inc(self.name, label)
+                        raise QueueTimeout(f"No {self.name} capacity within {self.DEADLINE_SECONDS}s")
+                    self._cond.wait(remaining if delay is None else delay)
+
+                heapq.heappop(self._queue)
+                self.requests.take(1, now)
+                self.tokens.take(cost, now)
+                self._in_flight += 1
+                self._counts["calls"] += 1
+            finally:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                # The next in line may be able to go now.
+                self._cond.notify_all()
+        WAIT_SECONDS.observe(time.monotonic() - queued, self.name, label)
+        return time.monotonic()
+
+    def _release(self, started, ok=True, throttled=False, retry_after=None):
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._counts["throttled"] += 1
+                # One cut per congestion event: calls already in flight when the
+                # limit dropped do not cut it again. Throttled again after the
+                # cut, every call holds off for Retry-After.
+                if started >= self._decreased_at:
+                    self.limit = max(self.MIN_CONCURRENCY, self.limit * self.DECREASE_FACTOR)
+                    self._decreased_at = now
+                    logger.warning(f"{self.name} throttled, concurrency limit now {self.limit:.1f}")
+                elif retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            elif ok:
+                self.limit = min(self.MAX_CONCURRENCY, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt))
+
+
+class RateLimits:
+
+    def __init__(self):
+        self.RATE_LIMIT_PROCESSES = max(1, int(os.getenv("RATE_LIMIT_PROCESSES", "1")))
+        priorities = _priorities()
+        self.governors = {
+            name: Governor(name, concurrency, self.RATE_LIMIT_PROCESSES, priorities)
+            for name, concurrency in UPSTREAMS.items()
+        } if RATE_LIMIT_ENABLED else {}
+
+    def get(self, upstream):
+        return self.governors.get(upstream)
+
+    def stats(self):
+        return {name: governor.stats() for name, governor in self.governors.items()}
+
+
+def _openai_cost(content):
+    # Azure counts prompt tokens plus max_tokens against TPM when admitting a call.
+    try:
+        body = json.loads(content or b"{}")
+    except ValueError:
+        body = {}
+    return len(content or b"") // 4 + int(body.get("max_tokens") or body.get("max_completion_tokens") or 0)
+
+
+class GovernedTransport(httpx.BaseTransport):
+    # Wraps the httpx transport used by the OpenAI clients.
+
+    def __init__(self, transport, rate_limits):
+        self.transport = transport
+        self.rate_limits = rate_limits
+
+    def handle_request(self, request):
+        path = request.url.path
+        governor = self.rate_limits.get(
+            "embeddings" if path.endswith("/embeddings") else "chat" if "/chat/" in path else None)
+        if governor is None:
+            return self.transport.handle_request(request)
+        request.read()
+        try:
+            return governor.call(lambda: self.transport.handle_request(request), _openai_cost(request.content),
+                                 errors=(httpx.TransportError,))
+        except QueueTimeout as e:
+            raise httpx.PoolTimeout(str(e), request=request)
+
+    def close(self):
+        self.transport.close()
+
+
+class GovernedAdapter(MetricsAdapter):
+    # The shared requests session's adapter; each attempt is metered separately.
+
+    def __init__(self, rate_limits, **kwargs):
+        self.rate_limits = rate_limits
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        service, _ = classify_azure_request(request.method, request.url)
+        governor = self.rate_limits.get(service)
+        if governor is None:
+            return super().send(request, **kwargs)
+        send = super().send
+        body = request.body
+        try:
+            return governor.call(lambda: send(request, **kwargs), len(body) if body else 1,
+                                 errors=(requests.ConnectionError, requests.Timeout))
+        except QueueTimeout as e:
+            raise requests.Timeout(str(e), request=request)
@@ -0,0 +1,329 @@
+import os
+import time
+import threading
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+
+    def __init__(self):
+        self.HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+        self.HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._closers = {}
+        self._instances = {}
+        self._build_locks = {}
+        self._stats = {}
+
+    def register(self, name, factory, close=None, replace=False):
+        with self._lock:
+            if name in self._factories and not replace:
+                raise KeyError(f"'{name}' is already registered")
+            old = self._instances.pop(name, None)
+            old_close = self._closers.get(name)
+            self._factories[name] = factory
+            self._closers[name] = close
+            self._build_locks.setdefault(name, threading.Lock())
+            self._stats.setdefault(name, {"built": 0, "reused": 0, "build_seconds": 0.0})
+        if old is not None and replace:
+            self._close(name, old, old_close)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            self._count(name, "reused")
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"No factory registered for '{name}'")
+
+        with self._build_locks[name]:
+            instance = self._instances.get(name)
+            if instance is not None:
+                self._count(name, "reused")
+                return instance
+
+            logger.info(f"Building shared client: {name}")
+            started = time.perf_counter()
+            instance = self._factories[name]()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._instances[name] = instance
+                self._stats[name]["built"] += 1
+                self._stats[name]["build_seconds"] += elapsed
+            return instance
+
+    def is_built(self, name):
+        return name in self._instances
+
+    def warmup(self, names=None):
+        names = list(names) if names is not None else list(self._factories)
+        failed = {}
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Warmup failed for {name}: {e}")
+                failed[name] = str(e)
+        return failed
+
+    def shutdown(self):
+        with self._lock:
+            instances = list(self._instances.items())
+            self._instances.clear()
+        for name, instance in reversed(instances):
+            self._close(name, instance, self._closers.get(name))
+        logger.info("Registry shut down.")
+
+    def reset(self):
+        # Drops built instances without closing them. Used after fork, where the
+        # parent's sockets must not be shut down from the child.
+        with self._lock:
+            self._instances.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: dict(counts, live=name in self._instances)
+                for name, counts in self._stats.items()
+            }
+
+    def _count(self, name, key):
+        with self._lock:
+            self._stats[name][key] += 1
+
+    def _close(self, name, instance, close):
+        try:
+            if close is not None:
+                close(instance)
+            elif hasattr(instance, "close"):
+                instance.close()
+        except Exception as e:
+            logger.warning(f"Failed to close {name}: {e}")
+
+
+registry = Registry()
+
+
+def _rate_limits():
+    from ratelimit import RateLimits
+    return RateLimits()
+
+
+def _http_session():
+    from ratelimit import GovernedAdapter
+    session = requests.Session()
+    adapter = GovernedAdapter(registry.get("rate_limits"), pool_connections=registry.HTTP_POOL_SIZE,
+                              pool_maxsize=registry.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _httpx_client():
+    import httpx
+    from metrics import MetricsTransport
+    from ratelimit import GovernedTransport
+    limits = httpx.Limits(
+        max_connections=registry.HTTP_POOL_SIZE,
+        max_keepalive_connections=registry.HTTP_POOL_SIZE
+    )
+    return httpx.Client(
+        transport=GovernedTransport(MetricsTransport(httpx.HTTPTransport(limits=limits)), registry.get("rate_limits")),
+        timeout=registry.HTTP_TIMEOUT
+    )
+
+
+def _azure_transport():
+    from azure.core.pipeline.transport import RequestsTransport
+    return RequestsTransport(session=registry.get("http_session"), session_owner=False)
+
+
+def _gen_llm():
+    from llm import LLM
+    return LLM().initialize_gen_llm(http_client=registry.get("httpx_client"))
+
+
+def _emb_llm():
+    from llm import LLM
+    return LLM().initialize_emb_llm(http_client=registry.get("httpx_client"))
+
+
+def _pinecone():
+    import pinecone
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY is not set.")
+    return pinecone.Pinecone(api_key=api_key, pool_threads=registry.HTTP_POOL_SIZE)
+
+
+def _vector_index(index_name=None, env=None):
+    # VECTOR_BACKEND=local serves the index from LOCAL_INDEX_DIR instead of Pinecone.
+    def factory():
+        from metrics import InstrumentedIndex
+        name = index_name or os.getenv(env)
+        if os.getenv("VECTOR_BACKEND", "pinecone") == "local":
+            from vectorstore import LocalVectorIndex
+            index = LocalVectorIndex(os.path.join(os.getenv("LOCAL_INDEX_DIR", "cache/vectors"), name))
+            return InstrumentedIndex(index, "local_index")
+        return InstrumentedIndex(registry.get("pinecone").Index(name), "pinecone")
+    return factory
+
+
+def _lexical_index(index_name=None, env=None):
+    def factory():
+        from lexical import LexicalIndex
+        return LexicalIndex(index_name or os.getenv(env))
+    return factory
+
+
+def _ingest_manifest():
+    from ingest import IngestManifest
+    return IngestManifest()
+
+
+def _semantic_cache():
+    from semantic_cache import SemanticCache
+    return SemanticCache(index_version=registry.get("ingest_manifest").version)
+
+
+def _uploads():
+    from uploads import UploadStore
+    return UploadStore(registry.get("blob_service"), os.getenv("AZURE_CONTAINER_NAME"), registry.get("upload_executor"))
+
+
+def _blob_service():
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient(
+        account_url=f"https://{os.getenv('AZURE_STORAGE_ACCOUNT_NAME')}.blob.core.windows.net",
+        credential=os.getenv("AZURE_STORAGE_ACCOUNT_KEY"),
+        transport=registry.get("azure_transport")
+    )
+
+
+def _template_blob_service():
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient.from_connection_string(
+        os.getenv("AZURE_STORAGE_CONNECTION_STRING"),
+        transport=registry.get("azure_transport")
+    )
+
+
+def _template_cache():
+    from template_cache import TemplateCache
+    return TemplateCache(registry.get("template_blob_service"), os.getenv("AZURE_CONTAINER_NAME_4"))
+
+
+def _document_store():
+    from document_store import DocumentStore
+    return DocumentStore()
+
+
+def _bulk():
+    from bulk import BulkGenerator
+    return BulkGenerator(
+        registry.get("formatter"),
+        registry.get("template_cache"),
+        registry.get("bulk_executor"),
+        registry.get("blob_service")
+    )
+
+
+def _document_analysis():
+    from azure.ai.formrecognizer import DocumentAnalysisClient
+    from azure.core.credentials import AzureKeyCredential
+    return DocumentAnalysisClient(
+        endpoint=os.getenv("AZURE_DOC_INTELLIGENCE_ENDPOINT"),
+        credential=AzureKeyCredential(os.getenv("AZURE_DOC_INTELLIGENCE_KEY")),
+        transport=registry.get("azure_transport")
+    )
+
+
+def _embedding_cache():
+    from embedding_cache import EmbeddingCache
+    return EmbeddingCache()
+
+
+def _executor(name, env, default):
+    def factory():
+        from concurrency import create_executor
+        return create_executor(int(os.getenv(env, default)), name)
+    return factory
+
+
+def _router():
+    from router import Router
+    emb_llm = registry.get("emb_llm")
+    cache = registry.get("embedding_cache")
+    return Router(embed=lambda text: cache.get_or_create(emb_llm, "text-embedding-ada-002", text))
+
+
+def _jobs():
+    from jobs import JobQueue
+    from agents import perform_action, document_generation
+    return JobQueue({"perform_action": perform_action, "document_generation": document_generation})
+
+
+def _ocr_store():
+    from ocr_store import OcrStore
+    return OcrStore()
+
+
+def _service(module_name, class_name):
+    def factory():
+        module = __import__(module_name)
+        return getattr(module, class_name)()
+    return factory
+
+
+def _noop(instance):
+    pass
+
+
+def _shutdown_executor(executor):
+    from concurrency import shutdown_executor
+    shutdown_executor(executor)
+
+
+registry.register("rate_limits", _rate_limits, close=_noop)
+registry.register("http_session", _http_session)
+registry.register("httpx_client", _httpx_client)
+registry.register("azure_transport", _azure_transport, close=_noop)
+registry.register("gen_llm", _gen_llm, close=_noop)
+registry.register("emb_llm", _emb_llm, close=_noop)
+registry.register("pinecone", _pinecone, close=_noop)
+registry.register("index:law-kb", _vector_index("law-kb"), close=_noop)
+registry.register("index:past-cases", _vector_index("past-cases"), close=_noop)
+registry.register("index:cases", _vector_index(env="PINECONE_INDEX_NAME"), close=_noop)
+registry.register("lexical:cases", _lexical_index(env="PINECONE_INDEX_NAME"))
+registry.register("blob_service", _blob_service)
+registry.register("template_blob_service", _template_blob_service)
+registry.register("template_cache", _template_cache, close=_noop)
+registry.register("document_store", _document_store, close=_noop)
+registry.register("document_analysis", _document_analysis)
+registry.register("embedding_cache", _embedding_cache)
+registry.register("ingest_manifest", _ingest_manifest)
+registry.register("semantic_cache", _semantic_cache, close=_noop)
+registry.register("ocr_store", _ocr_store)
+registry.register("uploads", _uploads)
+registry.register("background_executor", _executor("background", "BACKGROUND_MAX_WORKERS", "4"), close=_shutdown_executor)
+registry.register("router", _router, close=_noop)
+registry.register("jobs", _jobs)
+registry.register("translate_executor", _executor("translate", "TRANSLATE_MAX_WORKERS", "8"), close=_shutdown_executor)
+registry.register("summary_executor", _executor("summary", "SUMMARY_MAX_WORKERS", "4"), close=_shutdown_executor)
+registry.register("upload_executor", _executor("upload", "UPLOAD_MAX_WORKERS", "8"), close=_shutdown_executor)
+registry.register("bulk_executor", _executor("bulk", "BULK_MAX_WORKERS", "8"), close=_shutdown_executor)
+registry.register("verdict_executor", _executor("verdict", "VERDICT_MAX_WORKERS", "16"), close=_shutdown_executor)
+
+registry.register("classifier", _service("classifier", "Classifier"), close=_noop)
+registry.register("case_search", _service("casesearch", "CaseSearch"), close=_noop)
+registry.register("verdict", _service("verdict", "Verdict"), close=_noop)
+registry.register("formatter", _service("formatter", "Formatter"), close=_noop)
+registry.register("summarisation", _service("summarisation", "Summarisation"), close=_noop)
+registry.register("translate", _service("translate", "Translate"), close=_noop)
+registry.register("bulk", _bulk, close=_noop)
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import logging
+import threading
+from concurrency import submit
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ["case_search", "verdict_prediction", "document_generation", "perform_action"]
+
+RULES = [
+    ("perform_action", r"\bsummar(y|ies|ise|ize|ising|izing|isation|ization)\b", 1.0),
+    ("perform_action", r"\btranslat(e|ed|ion|ing)\b", 1.0),
+    ("perform_action", r"\b(uploaded|my) (document|pdf|file|contract|agreement)\b", 0.5),
+    ("document_generation", r"\b(draft|drafting|generate|create|prepare|draw up|write)\b.*\b(agreement|contract|nda|deed|document|letter|notice)\b", 1.0),
+    ("document_generation", r"\b(nda|non[- ]disclosure)\b", 0.75),
+    ("verdict_prediction", r"\bverdict\b", 1.0),
+    ("verdict_prediction", r"\b(predict|prediction|likely (outcome|judgment|judgement|punishment)|will (i|we|he|she|they) win)\b", 1.0),
+    ("verdict_prediction", r"\b(court (decide|rule)|be convicted|be acquitted)\b", 0.75),
+    ("case_search", r"\b(similar|precedents?|past|previous|prior|earlier)\b.*\b(cases?|judgments?|judgements?|rulings?)\b", 1.0),
+    ("case_search", r"\b(find|search|look up|list|show)\b.*\b(cases?|judgments?|judgements?|rulings?)\b", 1.0),
+    ("case_search", r"\bcase law\b", 0.75),
+]
+
+
+class Router:
+
+    def __init__(self, embed=None, examples_path=None):
+        self.ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+        self.ROUTER_USE_CENTROIDS = os.getenv("ROUTER_USE_CENTROIDS", "true").lower() == "true"
+        self.ROUTER_CENTROID_TEMPERATURE = float(os.getenv("ROUTER_CENTROID_TEMPERATURE", "0.02"))
+        # Share of locally-routed queries that are also sent to the LLM to measure agreement.
+        self.ROUTER_AUDIT_RATE = float(os.getenv("ROUTER_AUDIT_RATE", "0.05"))
+        # After a failed centroid build, route by rules alone for this long before trying again.
+        self.ROUTER_CENTROID_RETRY_SECONDS = float(os.getenv("ROUTER_CENTROID_RETRY_SECONDS", "60"))
+        self.EXAMPLES_PATH = examples_path or os.getenv("ROUTER_EXAMPLES_PATH", "router_examples.json")
+
+        self.embed = embed
+        self.rules = [(route, re.compile(pattern, re.IGNORECASE), weight) for route, pattern, weight in RULES]
+        self._centroids = None
+        self._centroids_failed_at = None
+        self._centroid_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            path: {"count": 0, "audited": 0, "agreed": 0}
+            for path in ("rules", "centroid", "llm")
+        }
+
+    def classify(self, user_input, llm_classify, executor=None):
+        route, confidence, path = self.route_locally(user_input)
+        if route and confidence >= self.ROUTER_CONFIDENCE_THRESHOLD:
+            self._count(path)
+            if self.ROUTER_AUDIT_RATE and random.random() < self.ROUTER_AUDIT_RATE:
+                self._audit(path, route, user_input, llm_classify, executor)
+            logger.info(f"Routed locally via {path}: {route} ({confidence:.2f})")
+            return route
+
+        classification = llm_classify(user_input)
+        self._count("llm")
+        if route:
+            # Low-confidence local guess, kept to measure how often it would have been right.
+            self._record_audit("llm", route == classification)
+        return classification
+
+    def route_locally(self, user_input):
+        route, confidence = self.match_rules(user_input)
+        if route and confidence >= self.ROUTER_CONFIDENCE_THRESHOLD:
+            return route, confidence, "rules"
+
+        if self.ROUTER_USE_CENTROIDS and self.embed is not None:
+            centroid_route, centroid_confidence = self.match_centroids(user_input)
+            if centroid_route and centroid_confidence >= confidence:
+                return centroid_route, centroid_confidence, "centroid"
+
+        return route, confidence, "rules"
+
+    def match_rules(self, user_input):
+        scores = {}
+        for route, pattern, weight in self.rules:
+            if pattern.search(user_input):
+                scores[route] = scores.get(route, 0.0) + weight
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_route, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        # The 0.25 prior keeps a single weak rule below the default threshold.
+        return top_route, top_score / (top_score + runner_up + 0.25)
+
+    def match_centroids(self, user_input):
+        centroids = self._load_centroids()
+        if not centroids:
+            return None, 0.0
+        try:
+            vector = _normalize(self.embed(user_input))
+        except Exception as e:
+            logger.warning(f"Router embedding failed: {e}")
+            return None, 0.0
+
+        similarities = {route: _dot(vector, centroid) for route, centroid in centroids.items()}
+        top = max(similarities.values())
+        weights = {
+            route: math.exp((similarity - top) / self.ROUTER_CENTROID_TEMPERATURE)
+            for route, similarity in similarities.items()
+        }
+        total = sum(weights.values())
+        route = max(weights, key=weights.get)
+        return route, weights[route] / total
+
+    def warm(self):
+        if self.ROUTER_USE_CENTROIDS and self.embed:
+            self._load_centroids()
+
+    def stats(self):
+        with self._lock:
+            stats = {path: dict(counts) for path, counts in self._stats.items()}
+        total = sum(counts["count"] for counts in stats.values())
+        for counts in stats.values():
+            counts["share"] = counts["count"] / total if total else 0.0
+            counts["accuracy"] = counts["agreed"] / counts["audited"] if counts["audited"] else None
+        # For the llm path, accuracy is how often the below-threshold local guess matched the LLM.
+        return stats
+
+    def _load_centroids(self):
+        if self._centroids is not None:
+            return self._centroids
+        if self._backing_off():
+            return {}
+        with self._centroid_lock:
+            if self._centroids is not None:
+                return self._centroids
+            if self._backing_off():
+                return {}
+            try:
+                with open(self.EXAMPLES_PATH, "r", encoding="utf-8") as file:
+                    examples = json.load(file)
+                centroids = {}
+                for route, queries in examples.items():
+                    vectors = [_normalize(self.embed(query)) for query in queries]
+                    centroids[route] = _normalize([sum(values) / len(vectors) for values in zip(*vectors)])
+                self._centroids = centroids
+                self._centroids_failed_at = None
+                logger.info(f"Router centroids built for {len(centroids)} routes")
+            except Exception as e:
+                logger.error(f"Failed to build router centroids, retrying in {self.ROUTER_CENTROID_RETRY_SECONDS}s: {e}")
+                self._centroids_failed_at = time.monotonic()
+                return {}
+        return self._centroids
+
+    def _backing_off(self):
+        failed_at = self._centroids_failed_at
+        return failed_at is not None and time.monotonic() - failed_at < self.ROUTER_CENTROID_RETRY_SECONDS
+
+    def _audit(self, path, route, user_input, llm_classify, executor):
+        def run():
+            try:
+                self._record_audit(path, llm_classify(user_input) == route)
+            except Exception as e:
+                logger.warning(f"Router audit failed: {e}")
+        if executor is not None:
+            submit(executor, run)
+        else:
+            run()
+
+    def _count(self, path):
+        with self._lock:
+            self._stats[path]["count"] += 1
+
+    def _record_audit(self, path, agreed):
+        with self._lock:
+            self._stats[path]["audited"] += 1
+            if agreed:
+                self._stats[path]["agreed"] += 1
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _normalize(vector):
+    norm = math.sqrt(_dot(vector, vector)) or 1.0
+    return [value / norm for value in vector]
@@ -0,0 +1,170 @@
+import os
+import re
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUOTED = re.compile(r"[\"“”']([^\"“”']{2,})[\"“”']")
+REFERENCE = re.compile(r"\b(section|sec|s(?=\.)|article|art|rule|order|clause|schedule)\.?\s*(\d+[a-z]*(?:\(\w+\))*)",
+                       re.IGNORECASE)
+REFERENCE_KINDS = {"sec": "section", "s": "section", "art": "article"}
+NUMBER = re.compile(r"\d+(?:[./-]\d+)*[a-z]?", re.IGNORECASE)
+WORD = re.compile(r"\S+")
+REFERENCE_WORDS = {"section", "sec", "article", "art", "rule", "order", "clause", "schedule"}
+
+
+def exact_terms(text):
+    # What an embedding barely sees but changes the answer: quoted names,
+    # section and article references, other numbers, and capitalised names
+    # (the first word of a sentence aside). Two queries can share a cached
+    # result only if these match exactly.
+    text = text or ""
+    terms = {("quoted", " ".join(quoted.casefold().split())) for quoted in QUOTED.findall(text)}
+    for kind, number in REFERENCE.findall(text):
+        kind = kind.casefold()
+        terms.add((REFERENCE_KINDS.get(kind, kind), number.casefold()))
+    terms.update(("number", number.casefold()) for number in NUMBER.findall(text))
+    sentence_start = True
+    for word in WORD.findall(text):
+        stripped = word.strip("\"“”'()[],;:").rstrip(".")
+        if stripped[:1].isupper() and not sentence_start and stripped.casefold() not in REFERENCE_WORDS:
+            terms.add(("name", stripped))
+        # "v." and "s." abbreviate; a longer word with a full stop ends a sentence.
+        sentence_start = word.endswith(("!", "?")) or (word.endswith(".") and len(stripped) > 3)
+    return frozenset(terms)
+
+
+class SemanticCache:
+    # Results of whole requests keyed by the query embedding. A lookup returns
+    # the closest earlier request on the same route when its cosine similarity
+    # clears the threshold, it is within the TTL, and the indexes it was built
+    # from have not been re-ingested since.
+
+    def __init__(self, index_version=None, threshold=None, max_items=None, ttl_seconds=None):
+        self.SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.SEMANTIC_CACHE_THRESHOLD = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+        self.SEMANTIC_CACHE_MAX_ITEMS = max_items or int(os.getenv("SEMANTIC_CACHE_MAX_ITEMS", "1000"))
+        self.SEMANTIC_CACHE_TTL_SECONDS = ttl_seconds or float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+        self.SEMANTIC_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("SEMANTIC_CACHE_VERSION_CHECK_SECONDS", "5"))
+
+        self.index_version = index_version or (lambda index_name: 0)
+        self._lock = threading.Lock()
+        # route -> OrderedDict(entry id -> (vector, result, created_at, versions, terms)), oldest first
+        self._entries = defaultdict(OrderedDict)
+        self._matrices = {}
+        self._next_id = 0
+        self._versions = {}
+        self._counters = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evictions": 0, "term_mismatches": 0}
+        )
+
+    def lookup(self, route, vector, indexes=(), terms=None):
+        # Returns (result, similarity) or (None, best similarity). With terms
+        # (see exact_terms), only an entry stored with the same terms can hit.
+        if not self.SEMANTIC_CACHE_ENABLED or vector is None:
+            return None, 0.0
+        query = self._normalize(vector)
+        versions = self._current_versions(indexes)
+        now = time.time()
+
+        with self._lock:
+            counters = self._counters[route]
+            entries = self._entries[route]
+            while entries:
+                entry_id, (_, _, created_at, _, _) = next(iter(entries.items()))
+                if now - created_at <= self.SEMANTIC_CACHE_TTL_SECONDS:
+                    break
+                del entries[entry_id]
+                self._matrices.pop(route, None)
+                counters["expired"] += 1
+            if not entries:
+                counters["misses"] += 1
+                return None, 0.0
+
+            ids, matrix = self._matrix(route)
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.SEMANTIC_CACHE_THRESHOLD:
+                counters["misses"] += 1
+                return None, similarity
+
+            # The closest entry whose exact terms agree; a nearer one that
+            # differs in a section number or a name does not count.
+            candidates = np.flatnonzero(similarities >= self.SEMANTIC_CACHE_THRESHOLD)
+            candidates = candidates[np.argsort(similarities[candidates])[::-1]]
+            best = next((int(i) for i in candidates if entries[ids[i]][4] == terms), None)
+            if best is None:
+                counters["term_mismatches"] += 1
+                counters["misses"] += 1
+                return None, similarity
+            similarity = float(similarities[best])
+
+            _, result, _, entry_versions, _ = entries[ids[best]]
+            if entry_versions != versions:
+                del entries[ids[best]]
+                self._matrices.pop(route, None)
+                counters["stale"] += 1
+                counters["misses"] += 1
+                return None, similarity
+
+            counters["hits"] += 1
+            return copy.deepcopy(result), similarity
+
+    def store(self, route, vector, result, indexes=(), terms=None):
+        if not self.SEMANTIC_CACHE_ENABLED or vector is None:
+            return
+        versions = self._current_versions(indexes)
+        with self._lock:
+            entries = self._entries[route]
+            entries[self._next_id] = (self._normalize(vector), copy.deepcopy(result), time.time(), versions, terms)
+            self._next_id += 1
+            while len(entries) > self.SEMANTIC_CACHE_MAX_ITEMS:
+                entries.popitem(last=False)
+                self._counters[route]["evictions"] += 1
+            self._matrices.pop(route, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self):
+        with self._lock:
+            routes = {}
+            for route, counters in self._counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                routes[route] = dict(counters, size=len(self._entries[route]),
+                                     hit_rate=counters["hits"] / lookups if lookups else 0.0)
+            return {"enabled": self.SEMANTIC_CACHE_ENABLED, "threshold": self.SEMANTIC_CACHE_THRESHOLD, "routes": routes}
+
+    def _matrix(self, route):
+        cached = self._matrices.get(route)
+        if cached is None:
+            entries = self._entries[route]
+            cached = self._matrices[route] = (list(entries), np.stack([entry[0] for entry in entries.values()]))
+        return cached
+
+    def _current_versions(self, indexes):
+        now = time.time()
+        versions = []
+        for index_name in indexes:
+            version, checked_at = self._versions.get(index_name, (None, 0.0))
+            if now - checked_at > self.SEMANTIC_CACHE_VERSION_CHECK_SECONDS:
+                try:
+                    version = self.index_version(index_name)
+                except Exception as e:
+                    logger.warning(f"Could not read version of {index_name}: {e}")
+                self._versions[index_name] = (version, now)
+            versions.append(version)
+        return tuple(versions)
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+import importlib
+import threading
+from registry import registry
+from tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Not "jobs": building the queue recovers interrupted jobs, which should
+# not run again in every worker that boots.
+DEFAULT_WARMUP = (
+    "http_session,httpx_client,azure_transport,gen_llm,emb_llm,embedding_cache,semantic_cache,router,classifier,"
+    "template_cache,formatter,case_search,verdict,summarisation,translate,uploads"
+)
+
+# Imported before the fork so workers share these pages instead of each
+# importing them on their first request.
+PRELOAD_MODULES = (
+    "numpy", "tiktoken", "openai", "langchain_openai", "azure.core.pipeline.transport", "azure.storage.blob",
+    "docx", "pypdf",
+)
+
+
+def preload():
+    # Only imports and static data: clients own sockets and threads, so they
+    # are built in each worker after the fork.
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.info(f"Not preloading {name}: {e}")
+    count_tokens("preload")
+
+
+def _compile_templates(template_cache):
+    for name in template_cache.names():
+        template_cache.compiled(template_cache.resolve(name))
+
+
+# Work beyond building the client, run once it exists.
+PRIMERS = {
+    "router": lambda router: router.warm(),
+    "template_cache": _compile_templates,
+}
+
+
+class Warmup:
+
+    def __init__(self, registry):
+        # "all" builds every registered client; "" or "none" skips warmup.
+        self.REGISTRY_WARMUP = os.getenv("REGISTRY_WARMUP", DEFAULT_WARMUP)
+        self.WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "15"))
+
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._pid = None
+        self._state = "cold"
+        self._attempts = 0
+        self._failed = {}
+        self._started_at = None
+        self._ready_at = None
+
+    def ensure_started(self):
+        # Tracked per process: a warmup begun before a fork belongs to the parent.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._state = "warming"
+            self._attempts = 0
+            self._failed = {}
+            self._started_at = time.perf_counter()
+            self._ready_at = None
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+
+    def ready(self):
+        return self._pid == os.getpid() and self._state == "ready"
+
+    def status(self):
+        with self._lock:
+            current = self._pid == os.getpid()
+            return {
+                "state": self._state if current else "cold",
+                "pid": os.getpid(),
+                "attempts": self._attempts if current else 0,
+                "failed": dict(self._failed) if current else {},
+                "warm_seconds": round(self._ready_at - self._started_at, 3) if current and self._ready_at else None,
+            }
+
+    def _targets(self):
+        if self.REGISTRY_WARMUP == "all":
+            return None
+        if self.REGISTRY_WARMUP in ("", "none"):
+            return []
+        return [name.strip() for name in self.REGISTRY_WARMUP.split(",") if name.strip()]
+
+    def _run(self):
+        names = self._targets()
+        while True:
+            with self._lock:
+                self._attempts += 1
+            failed = self.registry.warmup(names)
+            for name, prime in PRIMERS.items():
+                if (names is None or name in names) and name not in failed:
+                    try:
+                        prime(self.registry.get(name))
+                    except Exception as e:
+                        logger.error(f"Warmup failed for {name}: {e}")
+                        failed[name] = str(e)
+
+            with self._lock:
+                self._failed = failed
+                if not failed:
+                    self._state = "ready"
+                    self._ready_at = time.perf_counter()
+                    logger.info(f"Worker {self._pid} warm in {self._ready_at - self._started_at:.2f}s")
+                    return
+                self._state = "failed"
+            logger.warning(f"Warmup incomplete ({', '.join(failed)}), retrying in {self.WARMUP_RETRY_SECONDS}s")
+            time.sleep(self.WARMUP_RETRY_SECONDS)
+
+
+warmup = Warmup(registry)
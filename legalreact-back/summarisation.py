@@ -1,17 +1,63 @@
 import os
+import re
 import json
 import logging
 from datetime import datetime, timedelta
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions
 from langchain.schema import SystemMessage, HumanMessage
-from langchain_openai import AzureChatOpenAI
-from llm import LLM
+from concurrency import ordered_map
+from events import emit, invoke_llm
+from ocr_store import pages_to_text
+from registry import registry
+from tokens import count_tokens
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SUMMARY_FIELDS = ["parties", "dates", "financial_terms", "confidentiality", "termination", "governing_law"]
+
+# Keywords in any case; the last branch only matches lines in capitals.
+HEADING = re.compile(r"^((?i:article|section|clause|schedule|annexure)\b|\d+(\.\d+)*[.)]?\s+\S|[A-Z][A-Z0-9 ,&'-]{3,}$)")
+
+
+def split_into_chunks(lines, budget):
+    # Packs lines into chunks of at most `budget` tokens, preferring to break
+    # before a heading once a chunk is half full.
+    chunks, current, size = [], [], 0
+    for line in lines:
+        tokens = count_tokens(line) + 1
+        at_heading = HEADING.match(line.strip()) is not None
+        if current and (size + tokens > budget or (at_heading and size > budget // 2)):
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def merge_field_values(values):
+    merged, seen = [], set()
+    for value in values:
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if item in (None, "", [], {}):
+                continue
+            key = item.strip().casefold() if isinstance(item, str) else json.dumps(item, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    if not merged:
+        return None
+    return merged[0] if len(merged) == 1 else merged
+
+
+def merge_summaries(partials):
+    # The model can answer a chunk with valid JSON that is not an object.
+    partials = [partial for partial in partials if isinstance(partial, dict)]
+    return {field: merge_field_values([partial.get(field) for partial in partials]) for field in SUMMARY_FIELDS}
+
 class Summarisation:
 
     def __init__(self):
@@ -21,30 +67,17 @@ class Summarisation:
         self.AZURE_FORM_RECOGNIZER_ENDPOINT = os.getenv("AZURE_DOC_INTELLIGENCE_ENDPOINT")
         self.AZURE_FORM_RECOGNIZER_KEY = os.getenv("AZURE_DOC_INTELLIGENCE_KEY")
 
-        logger.info("Connecting to Azure Blob Storage...")
-        self.blob_service_client = BlobServiceClient(
-            account_url=f"https://{self.AZURE_BLOB_ACCOUNT}.blob.core.windows.net",
-            credential=self.AZURE_BLOB_KEY
-        )
-        self.container_client = self.blob_service_client.get_container_client(self.AZURE_BLOB_CONTAINER)
+        self.blob_service_client = registry.get("blob_service")
+        self.document_analysis_client = registry.get("document_analysis")
+        self.ocr_store = registry.get("ocr_store")
+        self.uploads = registry.get("uploads")
 
-        self.llm = LLM()
-        self.gen_llm = self.llm.initialize_gen_llm()
+        self.gen_llm = registry.get("gen_llm")
+        self.executor = registry.get("summary_executor")
 
-    def get_latest_contract(self):
-        try:
-            logger.info("Fetching available blobs..")
-            blobs = list(self.container_client.list_blobs())
-            if not blobs:
-                logger.warning("No blobs found in the container.")
-                return None, "No contract files found in Azure Blob Storage."
-
-            latest_blob = max(blobs, key=lambda x: x.last_modified)
-            logger.info(f"Latest blob found: {latest_blob.name}")
-            return latest_blob.name, None
-        except Exception as e:
-            logger.exception("Error fetching latest contract from Azure Blob Storage.")
-            return None, str(e)
+        self.SUMMARY_SINGLE_SHOT_TOKENS = int(os.getenv("SUMMARY_SINGLE_SHOT_TOKENS", "12000"))
+        self.SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "4000"))
+        self.SUMMARY_MAX_IN_FLIGHT = int(os.getenv("SUMMARY_MAX_IN_FLIGHT", "4"))
 
     def generate_sas_url(self, blob_name):
         try:
@@ -64,56 +97,91 @@ class Summarisation:
             logger.exception("Failed to generate SAS URL.")
             raise e
 
-    def extract_summary(self, file_path, file_name):
+    def extract_summary(self, upload):
         try:
+            file_name = upload["filename"]
             logger.info(f"Extracting summary for file: {file_name}")
-            blob_url = self.generate_sas_url(file_name)
-            
-            client = DocumentAnalysisClient(
-                self.AZURE_FORM_RECOGNIZER_ENDPOINT,
-                AzureKeyCredential(self.AZURE_FORM_RECOGNIZER_KEY)
-            )
-            poller = client.begin_analyze_document_from_url("prebuilt-layout", blob_url)
-            result = poller.result()
 
-            extracted_text = "\n".join([line.content for page in result.pages for line in page.lines])
+            def analyze():
+                blob_url = self.generate_sas_url(upload["blob_name"])
+                poller = self.document_analysis_client.begin_analyze_document_from_url("prebuilt-layout", blob_url)
+                return poller.result()
+
+            pages = self.ocr_store.analyze(lambda: self.uploads.read(upload), "prebuilt-layout", analyze, upload["sha256"])
+            extracted_text = pages_to_text(pages)
             logger.info("Document text extracted successfully.")
+            emit("document_text", {"file_name": file_name, "characters": len(extracted_text)})
+
+            tokens = count_tokens(extracted_text)
+            if tokens <= self.SUMMARY_SINGLE_SHOT_TOKENS:
+                return self.extract_fields(extracted_text, stream=True)
+            return self.map_reduce_summary([line for page in pages for line in page], tokens)
+
+        except Exception as e:
+            logger.exception("Error occurred during document summary extraction.")
+            return {"error": str(e)}
 
-            prompt = f"""
+    def build_prompt(self, contract_text, part=None):
+        scope = ""
+        if part:
+            scope = f"This is part {part[0]} of {part[1]} of a longer contract. Only report details found in this part and use null for keys with nothing relevant.\n"
+        return f"""
             Extract key legal details from the following contract text:
-            
+            {scope}
             **Contract Text:**
-            {extracted_text}
+            {contract_text}
             
             Return the result as a JSON object with keys: "parties", "dates", "financial_terms", "confidentiality", "termination", "governing_law".
             """
-            messages = [
-                SystemMessage(content="You are a legal document assistant."),
-                HumanMessage(content=prompt)
-            ]
 
-            logger.info("Sending prompt to LLM...")
-            try:
-                response = self.gen_llm.invoke(messages)
-            except Exception as e:
-                logger.exception("Error calling LLM")
-                return {"error": "LLM call failed: " + str(e)}
+    def extract_fields(self, contract_text, part=None, stream=False):
+        messages = [
+            SystemMessage(content="You are a legal document assistant."),
+            HumanMessage(content=self.build_prompt(contract_text, part))
+        ]
 
-            raw_response = response.content.strip()
+        logger.info("Sending prompt to LLM...")
+        try:
+            if stream:
+                response = invoke_llm(self.gen_llm, messages, "summary")
+            else:
+                response = self.gen_llm.invoke(messages)
+        except Exception as e:
+            logger.exception("Error calling LLM")
+            return {"error": "LLM call failed: " + str(e)}
 
-            if raw_response.startswith("```json"):
-                raw_response = raw_response[7:]
-            if raw_response.endswith("```"):
-                raw_response = raw_response[:-3]
+        raw_response = response.content.strip()
 
-            try:
-                parsed_response = json.loads(raw_response)
-                logger.info("LLM response parsed successfully.")
-                return parsed_response
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response as JSON.")
-                return {"error": "Failed to parse response from GPT."}
+        if raw_response.startswith("```json"):
+            raw_response = raw_response[7:]
+        if raw_response.endswith("```"):
+            raw_response = raw_response[:-3]
 
-        except Exception as e:
-            logger.exception("Error occurred during document summary extraction.")
-            return {"error": str(e)}
+        try:
+            parsed_response = json.loads(raw_response)
+            logger.info("LLM response parsed successfully.")
+            return parsed_response
+        except json.JSONDecodeError:
+            logger.error("Failed to parse LLM response as JSON.")
+            return {"error": "Failed to parse response from GPT."}
+
+    def map_reduce_summary(self, lines, tokens):
+        chunks = split_into_chunks(lines, self.SUMMARY_CHUNK_TOKENS)
+        logger.info(f"Document has ~{tokens} tokens; summarising {len(chunks)} chunks concurrently.")
+        emit("summary_plan", {"tokens": tokens, "chunks": len(chunks)})
+
+        partials = []
+        parts = [(text, (index + 1, len(chunks))) for index, text in enumerate(chunks)]
+        results = ordered_map(self.executor, lambda item: self.extract_fields(*item), parts, self.SUMMARY_MAX_IN_FLIGHT)
+        for index, partial in enumerate(results):
+            if not isinstance(partial, dict):
+                partial = {"error": f"Expected a JSON object, got {type(partial).__name__}"}
+            emit("summary_chunk", {"index": index, "ok": "error" not in partial})
+            if "error" in partial:
+                logger.warning(f"Chunk {index + 1}/{len(chunks)} failed: {partial['error']}")
+                continue
+            partials.append(partial)
+
+        if not partials:
+            return {"error": "Failed to summarise any part of the document."}
+        return merge_summaries(partials)
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from difflib import get_close_matches
+from docx_template import compile_template
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache:
+
+    def __init__(self, blob_service_client, container_name, cache_dir=None, revalidate_seconds=None):
+        self.TEMPLATE_CACHE_DIR = cache_dir or os.getenv("TEMPLATE_CACHE_DIR", "templates")
+        self.TEMPLATE_REVALIDATE_SECONDS = revalidate_seconds or float(os.getenv("TEMPLATE_REVALIDATE_SECONDS", "3600"))
+        self.MANIFEST_PATH = os.path.join(self.TEMPLATE_CACHE_DIR, ".template_cache.json")
+        # Document types are free text from the model; only the most recent are remembered.
+        self.TEMPLATE_MATCH_CACHE_SIZE = int(os.getenv("TEMPLATE_MATCH_CACHE_SIZE", "1024"))
+
+        self.blob_service_client = blob_service_client
+        self.container_name = container_name
+        self._lock = threading.RLock()
+        # Held for a whole refresh, which talks to Blob Storage; _lock only
+        # guards the in-memory state so readers never wait on the network.
+        self._refresh_lock = threading.Lock()
+        self._templates = {}
+        self._matches = OrderedDict()
+        self._compiled = {}
+        self._validated_at = 0.0
+        self._counters = {"revalidations": 0, "downloads": 0, "blob_calls": 0}
+        self._load_manifest()
+
+    def names(self):
+        self._ensure_fresh()
+        with self._lock:
+            return sorted(self._templates)
+
+    def resolve(self, document_type):
+        self._ensure_fresh()
+        with self._lock:
+            if document_type in self._matches:
+                self._matches.move_to_end(document_type)
+            else:
+                best = get_close_matches(document_type, list(self._templates), n=1, cutoff=0.5)
+                self._matches[document_type] = best[0] if best else None
+                while len(self._matches) > self.TEMPLATE_MATCH_CACHE_SIZE:
+                    self._matches.popitem(last=False)
+            name = self._matches[document_type]
+            return self._templates[name]["path"] if name else None
+
+    def placeholders(self, template_path):
+        with self._lock:
+            for entry in self._templates.values():
+                if entry["path"] == template_path:
+                    return list(entry["placeholders"])
+        return self.compiled(template_path).placeholders
+
+    def compiled(self, template_path):
+        with self._lock:
+            compiled = self._compiled.get(template_path)
+            if compiled is None:
+                compiled = self._compiled[template_path] = compile_template(template_path)
+            return compiled
+
+    def refresh(self):
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        container_client = self.blob_service_client.get_container_client(self.container_name)
+        with self._lock:
+            current = dict(self._templates)
+            self._counters["revalidations"] += 1
+            self._counters["blob_calls"] += 1
+        listing = {
+            os.path.splitext(os.path.basename(blob.name))[0]: blob
+            for blob in container_client.list_blobs() if blob.name.endswith(".docx")
+        }
+
+        templates = {}
+        for name, blob in listing.items():
+            cached = current.get(name)
+            # The listing carries the current ETag, so an unchanged blob needs no request at all.
+            if cached and cached["etag"] == blob.etag and os.path.exists(cached["path"]):
+                templates[name] = cached
+                continue
+            templates[name] = self._download(container_client, name, blob)
+
+        with self._lock:
+            if set(templates) != set(self._templates):
+                self._matches.clear()
+            self._templates = templates
+            self._validated_at = time.time()
+            self._save_manifest()
+        logger.info(f"Template cache revalidated: {len(templates)} templates")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, templates=len(self._templates), validated_at=self._validated_at)
+
+    def _ensure_fresh(self):
+        if self._templates and time.time() - self._validated_at < self.TEMPLATE_REVALIDATE_SECONDS:
+            return
+        # With templates on hand, callers do not queue behind a refresh already under way.
+        if not self._refresh_lock.acquire(blocking=not self._templates):
+            return
+        try:
+            if self._templates and time.time() - self._validated_at < self.TEMPLATE_REVALIDATE_SECONDS:
+                return
+            self._refresh()
+        except Exception as e:
+            if not self._templates:
+                raise
+            # Serve the last known templates rather than fail the request.
+            logger.warning(f"Template revalidation failed, serving cached templates: {e}")
+            self._validated_at = time.time()
+        finally:
+            self._refresh_lock.release()
+
+    def _download(self, container_client, name, blob):
+        blob_client = container_client.get_blob_client(blob.name)
+        local_path = os.path.join(self.TEMPLATE_CACHE_DIR, f"{name}.docx")
+        content = blob_client.download_blob().readall()
+
+        # Workers share the directory; each writes its own temp file.
+        os.makedirs(self.TEMPLATE_CACHE_DIR, exist_ok=True)
+        temp_path = f"{local_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, local_path)
+        with self._lock:
+            self._compiled.pop(local_path, None)
+            self._counters["blob_calls"] += 1
+            self._counters["downloads"] += 1
+        logger.info(f"Template downloaded: {name}.docx")
+
+        return {
+            "path": local_path,
+            "etag": blob.etag,
+            "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+            "placeholders": self.compiled(local_path).placeholders,
+        }
+
+    def _load_manifest(self):
+        try:
+            with open(self.MANIFEST_PATH, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable template cache manifest: {e}")
+            return
+        self._templates = {
+            name: entry for name, entry in manifest.get("templates", {}).items()
+            if os.path.exists(entry.get("path", ""))
+        }
+        self._validated_at = manifest.get("validated_at", 0.0)
+
+    def _save_manifest(self):
+        os.makedirs(self.TEMPLATE_CACHE_DIR, exist_ok=True)
+        temp_path = f"{self.MANIFEST_PATH}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"validated_at": self._validated_at, "templates": self._templates}, file, indent=2)
+        os.replace(temp_path, self.MANIFEST_PATH)
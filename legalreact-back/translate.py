@@ -1,16 +1,77 @@
 import os
-import json
+import re
 import logging
-import requests
 from datetime import datetime, timedelta
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from concurrency import ordered_map
+from events import emit, is_streaming
+from glossary import load_glossaries
+from language_id import LanguageIdentifier, sample_text
+from ocr_store import pages_from_result, pages_to_text
+from registry import registry
 
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:।])(\s+)")
+PARAGRAPH_END = re.compile(r"[.!?;:।][\"')\]]*$")
+
+
+class TranslationError(Exception):
+    pass
+
+
+def split_paragraphs(text):
+    # OCR gives one line per printed line. Lines are joined back into
+    # paragraphs, which end at a blank line or a line ending a sentence, so
+    # the Translator sees whole sentences. Yields (paragraph, separator)
+    # pairs; blank lines come through as empty paragraphs.
+    lines = text.split("\n")
+    current = []
+    for index, line in enumerate(lines):
+        last = index == len(lines) - 1
+        separator = "" if last else "\n"
+        stripped = line.strip()
+        if not stripped:
+            yield line, separator
+            continue
+        current.append(stripped)
+        if last or PARAGRAPH_END.search(stripped) or not lines[index + 1].strip():
+            yield " ".join(current), separator
+            current = []
+
+
+def split_segments(text, budget):
+    # Yields (segment, separator) pairs, one per paragraph; a paragraph over
+    # the budget is split at sentence boundaries, then at spaces.
+    for paragraph, separator in split_paragraphs(text):
+        if len(paragraph) <= budget:
+            yield paragraph, separator
+            continue
+        parts = SENTENCE_BOUNDARY.split(paragraph)
+        sentences = [(parts[i], parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+        sentences[-1] = (sentences[-1][0], sentences[-1][1] + separator)
+        for sentence, gap in sentences:
+            while len(sentence) > budget:
+                cut = sentence.rfind(" ", 0, budget)
+                cut = cut if cut > 0 else budget
+                yield sentence[:cut], ""
+                sentence = sentence[cut:]
+            yield sentence, gap
+
+
+def batch_segments(segments, budget, max_elements):
+    batch, size = [], 0
+    for segment, separator in segments:
+        if batch and (size + len(segment) > budget or len(batch) >= max_elements):
+            yield batch
+            batch, size = [], 0
+        batch.append((segment, separator))
+        size += len(segment)
+    if batch:
+        yield batch
+
 class Translate:
     def __init__(self):
         self.AZURE_BLOB_ACCOUNT = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
@@ -20,41 +81,35 @@ class Translate:
         self.AZURE_FORM_RECOGNIZER_KEY = os.getenv("AZURE_DOC_INTELLIGENCE_KEY")
         self.AZURE_TRANSLATOR_REGION = os.getenv("AZURE_TRANSLATOR_REGION")
         self.AZURE_TRANSLATOR_KEY = os.getenv("AZURE_TRANSLATOR_KEY")
+        # The Translator accepts up to 50,000 characters and 1,000 elements per request.
+        self.TRANSLATE_BATCH_CHARS = int(os.getenv("TRANSLATE_BATCH_CHARS", "10000"))
+        self.TRANSLATE_BATCH_ELEMENTS = int(os.getenv("TRANSLATE_BATCH_ELEMENTS", "1000"))
+        self.TRANSLATE_MAX_IN_FLIGHT = int(os.getenv("TRANSLATE_MAX_IN_FLIGHT", "8"))
+        self.LANGID_CONFIDENCE_THRESHOLD = float(os.getenv("LANGID_CONFIDENCE_THRESHOLD", "0.15"))
+        self.LANGID_REMOTE_SAMPLE_CHARS = int(os.getenv("LANGID_REMOTE_SAMPLE_CHARS", "2000"))
 
-        self.blob_service_client = BlobServiceClient(
-            account_url=f"https://{self.AZURE_BLOB_ACCOUNT}.blob.core.windows.net",
-            credential=self.AZURE_BLOB_KEY
-        )
-        self.document_analysis_client = DocumentAnalysisClient(
-            endpoint=self.AZURE_FORM_RECOGNIZER_ENDPOINT,
-            credential=AzureKeyCredential(self.AZURE_FORM_RECOGNIZER_KEY)
-        )
+        self.blob_service_client = registry.get("blob_service")
+        self.document_analysis_client = registry.get("document_analysis")
+        self.session = registry.get("http_session")
+        self.ocr_store = registry.get("ocr_store")
+        self.uploads = registry.get("uploads")
+        self.document_store = registry.get("document_store")
+        self.executor = registry.get("translate_executor")
 
-        self.GLOSSARY = self.load_glossary()
+        self.GLOSSARY_PATH = os.getenv("GLOSSARY_PATH", "glossary.json")
+        self.glossaries = self.load_glossary(self.GLOSSARY_PATH)
+        self.language_identifier = LanguageIdentifier()
 
     def load_glossary(self, file_path="glossary.json"):
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                glossary = json.load(file)
-                logging.info("Glossary loaded successfully.")
-                return glossary
+            glossaries = load_glossaries(file_path)
+            logging.info(f"Glossary loaded successfully: {', '.join(f'{lang} ({len(m)} terms)' for lang, m in glossaries.items())}")
+            return glossaries
         except Exception as e:
             logging.error(f"Failed to load glossary: {e}")
             return {}
 
 
-    def upload_document_to_blob(self, local_path):
-        try:
-            blob_name = os.path.basename(local_path)
-            blob_client = self.blob_service_client.get_blob_client(container=self.AZURE_BLOB_CONTAINER, blob=blob_name)
-            with open(local_path, "rb") as data:
-                blob_client.upload_blob(data, overwrite=True)
-            logging.info(f"Uploaded document to blob storage: {blob_name}")
-            return blob_name
-        except Exception as e:
-            logging.error(f"Upload failed: {e}")
-            return None
-
     def generate_sas_url(self, blob_name):
         try:
             sas_token = generate_blob_sas(
@@ -72,14 +127,17 @@ class Translate:
             logging.error(f"SAS URL generation failed: {e}")
             return None
 
-    def extract_text_from_document(self, blob_name):
+    def extract_text_from_document(self, blob_name, digest=None):
         sas_url = self.generate_sas_url(blob_name)
         if not sas_url:
             return None
         try:
             poller = self.document_analysis_client.begin_analyze_document_from_url("prebuilt-read", sas_url)
             result = poller.result()
-            extracted = "\n".join([line.content for page in result.pages for line in page.lines])
+            pages = pages_from_result(result)
+            if digest:
+                self.ocr_store.put(digest, "prebuilt-read", pages)
+            extracted = pages_to_text(pages)
             logging.info(f"Text extracted from document: {blob_name}")
             return extracted or None
         except Exception as e:
@@ -87,6 +145,14 @@ class Translate:
             return None
 
     def detect_language(self, text):
+        lang, confidence = self.language_identifier.detect(text)
+        if lang and confidence >= self.LANGID_CONFIDENCE_THRESHOLD:
+            logging.info(f"Detected language locally: {lang} ({confidence:.2f})")
+            return lang
+        logging.info(f"Local language detection not confident ({lang}, {confidence:.2f}); asking the Translator")
+        return self.detect_language_remote(text)
+
+    def detect_language_remote(self, text):
         try:
             url = "https://api.cognitive.microsofttranslator.com/detect?api-version=3.0"
             headers = {
@@ -94,7 +160,8 @@ class Translate:
                 "Ocp-Apim-Subscription-Region": self.AZURE_TRANSLATOR_REGION,
                 "Content-Type": "application/json"
             }
-            response = requests.post(url, headers=headers, json=[{"text": text}])
+            sample = sample_text(text, self.LANGID_REMOTE_SAMPLE_CHARS)
+            response = self.session.post(url, headers=headers, json=[{"text": sample}])
             if response.status_code == 200:
                 lang = response.json()[0].get("language")
                 logging.info(f"Detected language: {lang}")
@@ -105,48 +172,95 @@ class Translate:
             logging.error(f"Language detection failed: {e}")
             return None
 
-    def apply_glossary_replacements(self, translated_text):
-        for eng_term, hindi_term in self.GLOSSARY.items():
-            translated_text = translated_text.replace(eng_term, hindi_term)
-        return translated_text
+    def apply_glossary_replacements(self, translated_text, target_language="hi"):
+        matcher = self.glossaries.get(target_language)
+        return matcher.replace(translated_text) if matcher else translated_text
+
+    def translate_batch(self, batch, target_language):
+        url = "https://api.cognitive.microsofttranslator.com/translate?api-version=3.0"
+        headers = {
+            "Ocp-Apim-Subscription-Key": self.AZURE_TRANSLATOR_KEY,
+            "Ocp-Apim-Subscription-Region": self.AZURE_TRANSLATOR_REGION,
+            "Content-Type": "application/json"
+        }
+        # Blank lines are kept as-is rather than sent to the API.
+        texts = [segment for segment, _ in batch if segment.strip()]
+        translated = iter([])
+        if texts:
+            response = self.session.post(url, headers=headers, json=[{"text": t} for t in texts], params={"to": target_language})
+            if response.status_code != 200:
+                raise TranslationError(f"Translation API error: {response.text}")
+            translated = iter([item["translations"][0]["text"] for item in response.json()])
+
+        parts = []
+        for segment, separator in batch:
+            text = self.apply_glossary_replacements(next(translated), target_language) if segment.strip() else segment
+            parts.append(text + separator)
+        return "".join(parts)
+
+    def iter_translate(self, text, target_language):
+        batches = batch_segments(
+            split_segments(text, self.TRANSLATE_BATCH_CHARS),
+            self.TRANSLATE_BATCH_CHARS,
+            self.TRANSLATE_BATCH_ELEMENTS
+        )
+        yield from ordered_map(
+            self.executor,
+            lambda batch: self.translate_batch(batch, target_language),
+            batches,
+            self.TRANSLATE_MAX_IN_FLIGHT
+        )
 
     def translate_text(self, text, target_language):
+        # Writes batches to the document store as they complete, so only the
+        # batches in flight are held. Returns (translation id, characters).
+        written = {"batches": 0, "characters": 0}
+
+        def parts():
+            for index, part in enumerate(self.iter_translate(text, target_language)):
+                if is_streaming():
+                    emit("translation_chunk", {"index": index, "text": part})
+                written["batches"] += 1
+                written["characters"] += len(part)
+                yield part
+
         try:
-            url = "https://api.cognitive.microsofttranslator.com/translate?api-version=3.0"
-            headers = {
-                "Ocp-Apim-Subscription-Key": self.AZURE_TRANSLATOR_KEY,
-                "Ocp-Apim-Subscription-Region": self.AZURE_TRANSLATOR_REGION,
-                "Content-Type": "application/json"
-            }
-            response = requests.post(url, headers=headers, json=[{"text": text}], params={"to": target_language})
-            if response.status_code == 200:
-                translated = response.json()[0]["translations"][0]["text"]
-                translated = self.apply_glossary_replacements(translated)
-                logging.info("Translation successful.")
-                return translated
-            logging.error(f"Translation API error: {response.text}")
-            return None
+            translation_id = self.document_store.write(parts(), "txt")
         except Exception as e:
             logging.error(f"Translation failed: {e}")
-            return None
+            return None, 0
+        logging.info(f"Translation successful ({written['batches']} batches).")
+        return translation_id, written["characters"]
+
+    def translation_result(self, translation_id, characters, **fields):
+        return dict(fields, translation_id=translation_id, translation_url=f"/translations/{translation_id}",
+                    characters=characters)
+
+    def process_uploaded_document(self, upload, target_language):
+        logging.info(f"Starting document translation: {upload['filename']} -> {target_language}")
+        digest = upload["sha256"]
 
-    def process_uploaded_document(self, local_path, target_language):
-        logging.info(f"Starting document translation: {local_path} -> {target_language}")
-        blob_name = self.upload_document_to_blob(local_path)
-        if not blob_name:
-            return {"error": "Failed to upload document."}
+        pages = self.ocr_store.lookup(lambda: self.uploads.read(upload), "prebuilt-read", digest)
+        if pages is not None:
+            extracted_text = pages_to_text(pages) or None
+        else:
+            extracted_text = self.extract_text_from_document(upload["blob_name"], digest)
 
-        extracted_text = self.extract_text_from_document(blob_name)
         if not extracted_text:
             return {"error": "Failed to extract text from document."}
 
         detected_lang = self.detect_language(extracted_text)
         if not detected_lang:
             return {"error": "Failed to detect source language."}
+        emit("source_language", {"source_language": detected_lang, "target_language": target_language})
 
         if detected_lang == target_language:
             logging.info("Document already in target language.")
-            return {"message": "Document is already in the target language.", "translated_text": extracted_text}
+            translation_id = self.document_store.save(extracted_text.encode("utf-8"), "txt")
+            return self.translation_result(translation_id, len(extracted_text),
+                                           message="Document is already in the target language.")
 
-        translated_text = self.translate_text(extracted_text, target_language)
-        return {"source_language": detected_lang, "translated_text": translated_text} if translated_text else {"error": "Translation failed."}
+        translation_id, characters = self.translate_text(extracted_text, target_language)
+        if translation_id is None:
+            return {"error": "Translation failed."}
+        return self.translation_result(translation_id, characters, source_language=detected_lang)
@@ -0,0 +1,257 @@
+import os
+import re
+import time
+import uuid
+import base64
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrency import submit
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+DOCUMENT_ID = re.compile(r"^[0-9a-f]{32}$")
+FIELDS = ("document_id", "sha256", "blob_name", "filename", "size", "content_type", "created_at")
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+def safe_filename(filename):
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    return re.sub(r"[^\w.\- ]+", "_", name).strip(" .") or "upload.pdf"
+
+
+def read_request_file(request, field="file"):
+    # Returns (filename, chunk iterator) for the upload without buffering it.
+    # Multipart bodies are decoded incrementally from request.stream; any
+    # other content type is taken as the raw file, named by ?filename=.
+    if request.mimetype != "multipart/form-data":
+        filename = request.args.get("filename") or request.headers.get("X-Filename")
+        if not filename:
+            raise UploadError("filename is required for raw uploads")
+        return filename, iter(lambda: request.stream.read(READ_CHUNK), b"")
+
+    from werkzeug.sansio.multipart import MultipartDecoder, File, Data, Epilogue, NeedData
+
+    boundary = request.mimetype_params.get("boundary")
+    if not boundary:
+        raise UploadError("Missing multipart boundary")
+    decoder = MultipartDecoder(boundary.encode("latin-1"), max_form_memory_size=4 * READ_CHUNK)
+    stream = request.stream
+    state = {"filename": None, "in_file": False, "done": False}
+    pending = deque()
+
+    def pump():
+        # Feed the decoder until it yields file data or the body ends.
+        while not pending and not state["done"]:
+            chunk = stream.read(READ_CHUNK)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    state["in_file"] = event.name == field and state["filename"] is None
+                    if state["in_file"]:
+                        state["filename"] = event.filename
+                elif isinstance(event, Data) and state["in_file"]:
+                    if event.data:
+                        pending.append(event.data)
+                    if not event.more_data:
+                        state["in_file"] = False
+                event = decoder.next_event()
+            if isinstance(event, Epilogue) or not chunk:
+                state["done"] = True
+
+    pump()
+    if state["filename"] is None:
+        raise UploadError("No file part in the request")
+
+    def chunks():
+        while True:
+            if not pending:
+                pump()
+                if not pending:
+                    return
+            yield pending.popleft()
+
+    return state["filename"], chunks()
+
+
+class UploadStore:
+    # Streams uploads into staged blocks, hashes them on the way, and keeps a
+    # local SHA-256 -> blob index so identical content is stored once.
+
+    def __init__(self, blob_service_client, container_name, executor, path=None):
+        self.UPLOAD_INDEX_PATH = path or os.getenv("UPLOAD_INDEX_PATH", "cache/uploads.sqlite3")
+        self.MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+        self.UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(4 * 1024 * 1024)))
+        self.UPLOAD_MAX_IN_FLIGHT = int(os.getenv("UPLOAD_MAX_IN_FLIGHT", "4"))
+        self.UPLOAD_CACHE_DIR = os.getenv("UPLOAD_CACHE_DIR", "cache/uploads")
+        self.UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+        self.blob_service_client = blob_service_client
+        self.container_name = container_name
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._counters = {"uploads": 0, "deduplicated": 0, "bytes": 0, "rejected": 0, "downloads": 0, "cache_hits": 0}
+        if self.UPLOAD_INDEX_PATH != ":memory:":
+            os.makedirs(os.path.dirname(self.UPLOAD_INDEX_PATH) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.UPLOAD_INDEX_PATH, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "document_id TEXT PRIMARY KEY, sha256 TEXT NOT NULL UNIQUE, blob_name TEXT NOT NULL, "
+            "filename TEXT NOT NULL, size INTEGER NOT NULL, content_type TEXT, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS uploads_created ON uploads (created_at)")
+
+    def find(self, sha256):
+        return self._fetch_one("WHERE sha256 = ?", ((sha256 or "").lower(),))
+
+    def upload(self, filename, chunks, content_type="application/pdf"):
+        document_id = uuid.uuid4().hex
+        blob_name = f"{document_id}-{safe_filename(filename)}"
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+        digest = hashlib.sha256()
+        size = 0
+        block_ids = []
+        in_flight = deque()
+        buffer = bytearray()
+
+        def stage(data):
+            block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+            block_ids.append(block_id)
+            if len(in_flight) >= self.UPLOAD_MAX_IN_FLIGHT:
+                in_flight.popleft().result()
+            in_flight.append(submit(self.executor, blob_client.stage_block, block_id, data, length=len(data)))
+
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > self.MAX_UPLOAD_BYTES:
+                    self._count("rejected")
+                    raise UploadTooLarge(f"Upload exceeds {self.MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                buffer += chunk
+                while len(buffer) >= self.UPLOAD_BLOCK_SIZE:
+                    stage(bytes(buffer[:self.UPLOAD_BLOCK_SIZE]))
+                    del buffer[:self.UPLOAD_BLOCK_SIZE]
+            if size == 0:
+                raise UploadError("Empty upload")
+            while in_flight:
+                in_flight.popleft().result()
+        finally:
+            # Staged but uncommitted blocks are discarded by the service.
+            for future in in_flight:
+                future.cancel()
+
+        sha256 = digest.hexdigest()
+        existing = self.find(sha256)
+        if existing:
+            self._count("deduplicated")
+            logger.info(f"Upload of {filename} matches {existing['blob_name']}; not committing")
+            return dict(existing, deduplicated=True)
+
+        from azure.storage.blob import BlobBlock, ContentSettings
+        content_settings = ContentSettings(content_type=content_type)
+        metadata = {"sha256": sha256}
+        if not block_ids:
+            # Fits in one block: a single Put Blob instead of Put Block + Put Block List.
+            blob_client.upload_blob(bytes(buffer), overwrite=True, content_settings=content_settings, metadata=metadata)
+        else:
+            if buffer:
+                stage(bytes(buffer))
+                in_flight.popleft().result()
+            blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids],
+                                          content_settings=content_settings, metadata=metadata)
+
+        record = {"document_id": document_id, "sha256": sha256, "blob_name": blob_name,
+                  "filename": filename, "size": size, "content_type": content_type, "created_at": time.time()}
+        with self._lock:
+            cursor = self._db.execute(
+                f"INSERT OR IGNORE INTO uploads ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                tuple(record[field] for field in FIELDS)
+            )
+        if cursor.rowcount == 0:
+            # Lost a race with an identical concurrent upload; keep the first copy.
+            self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name).delete_blob()
+            self._count("deduplicated")
+            return dict(self.find(sha256), deduplicated=True)
+
+        self._count("uploads")
+        self._count("bytes", size)
+        return dict(record, deduplicated=False)
+
+    def get(self, document_id):
+        if not DOCUMENT_ID.match(document_id or ""):
+            return None
+        return self._fetch_one("WHERE document_id = ?", (document_id,))
+
+    def read(self, upload):
+        # The document's bytes, from the local copy when there is one.
+        path = os.path.join(self.UPLOAD_CACHE_DIR, upload["sha256"])
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            self._count("cache_hits")
+            return data
+        except FileNotFoundError:
+            pass
+
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=upload["blob_name"])
+        data = blob_client.download_blob(max_concurrency=self.UPLOAD_MAX_IN_FLIGHT).readall()
+        self._count("downloads")
+        if hashlib.sha256(data).hexdigest() != upload["sha256"]:
+            logger.warning(f"Blob {upload['blob_name']} no longer matches its recorded hash; not caching it")
+            return data
+
+        os.makedirs(self.UPLOAD_CACHE_DIR, exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._prune_cache()
+        return data
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def _fetch_one(self, clause, params):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(FIELDS)} FROM uploads {clause}", params).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def _prune_cache(self):
+        # Least recently read copies go first; reads touch the file's mtime.
+        entries = []
+        for entry in os.scandir(self.UPLOAD_CACHE_DIR):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.UPLOAD_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
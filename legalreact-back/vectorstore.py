@@ -0,0 +1,444 @@
+import os
+import json
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Record(dict):
+    # Query results read both ways, like Pinecone's: result.matches and result["matches"].
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def kmeans(vectors, clusters, iterations=10, seed=0):
+    # Spherical k-means: centroids stay unit length so a dot product ranks them.
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(vectors[order], np.cumsum(counts)[filled] - counts[filled])
+        empty = ~filled
+        sums[empty] = vectors[rng.integers(len(vectors), size=int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def matches_filter(metadata, filter):
+    # Pinecone's equality filters: {"field": value}, {"field": {"$eq": value}}
+    # and {"field": {"$in": [values]}}. A list-valued field matches on any element.
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        values = value if isinstance(value, list) else [value]
+        conditions = condition.items() if isinstance(condition, dict) else [("$eq", condition)]
+        for operator, operand in conditions:
+            if operator == "$eq" and operand not in values:
+                return False
+            if operator == "$in" and not any(v in operand for v in values):
+                return False
+    return True
+
+
+def check_filter(filter):
+    for field, condition in filter.items():
+        if field.startswith("$"):
+            raise ValueError(f"Unsupported filter operator {field}; the local index supports $eq and $in")
+        for operator in condition if isinstance(condition, dict) else ():
+            if operator not in ("$eq", "$in"):
+                raise ValueError(f"Unsupported filter operator {operator}; the local index supports $eq and $in")
+            if operator == "$in" and not isinstance(condition[operator], list):
+                raise ValueError(f"$in on {field} needs a list")
+
+
+
+
+class LocalVectorIndex:
+    # Cosine-similarity index over a memory-mapped matrix. The metadata sidecar
+    # is an append-only log of upserts and deletes, replayed on open and
+    # compacted once it is mostly dead entries. The generation file names the
+    # current matrix and log, so a compaction switches to new files in one
+    # rename. One process writes at a time; the others pick up its changes on
+    # their next query.
+
+    def __init__(self, path, dtype=None):
+        self.LOCAL_INDEX_DTYPE = np.dtype(dtype or os.getenv("LOCAL_INDEX_DTYPE", "float32"))
+        self.LOCAL_INDEX_IVF_THRESHOLD = int(os.getenv("LOCAL_INDEX_IVF_THRESHOLD", "50000"))
+        self.LOCAL_INDEX_IVF_NPROBE = int(os.getenv("LOCAL_INDEX_IVF_NPROBE", "8"))
+
+        self.path = path
+        self.generation_path = os.path.join(path, "generation")
+        self.lock_path = os.path.join(path, ".lock")
+        self._lock = threading.RLock()
+        self._file_lock_depth = 0
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._rows)
+
+    def query(self, vector=None, top_k=10, include_metadata=False, include_values=False, filter=None, **kwargs):
+        if filter:
+            check_filter(filter)
+        with self._lock:
+            self._sync()
+            if not self._rows:
+                return Record(matches=[], namespace="")
+            query = normalize(np.asarray(vector, dtype=np.float32))
+            if filter:
+                rows = np.fromiter((row for row in self._rows.values() if matches_filter(self._metadata[row], filter)),
+                                   dtype=np.int64)
+                rows, scores = self._search_rows(np.sort(rows), query, top_k)
+            else:
+                rows, scores = self._search(query, top_k)
+            matches = []
+            for row, score in zip(rows, scores):
+                match = Record(id=self._ids[row], score=float(score))
+                if include_metadata:
+                    match["metadata"] = dict(self._metadata[row])
+                if include_values:
+                    match["values"] = self._vectors[row].astype(np.float32).tolist()
+                matches.append(match)
+            return Record(matches=matches, namespace="")
+
+    def upsert(self, vectors, **kwargs):
+        # Accepts Pinecone's dict form and (id, values, metadata) tuples.
+        items = []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                items.append((str(vector["id"]), vector["values"], vector.get("metadata") or {}))
+            else:
+                items.append((str(vector[0]), vector[1], vector[2] if len(vector) > 2 else {}))
+        if not items:
+            return Record(upserted_count=0)
+
+        with self._lock, self._file_lock():
+            self._sync()
+            matrix = normalize(np.asarray([values for _, values, _ in items], dtype=np.float32))
+            self._ensure_capacity(matrix.shape[1], self._count + len(items))
+            log = []
+            for (vector_id, _, metadata), values in zip(items, matrix):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(vector_id)
+                    self._metadata.append(metadata)
+                    self._rows[vector_id] = row
+                else:
+                    self._metadata[row] = metadata
+                self._vectors[row] = values
+                self._alive[row] = True
+                if self._ivf is not None:
+                    self._ivf_assign(row, values)
+                log.append({"id": vector_id, "row": row, "metadata": metadata})
+            self._vectors.flush()
+            self._append_log(log)
+            return Record(upserted_count=len(items))
+
+    def delete(self, ids=None, delete_all=False, **kwargs):
+        with self._lock, self._file_lock():
+            self._sync()
+            if delete_all:
+                ids = list(self._rows)
+            log = []
+            for vector_id in ids or []:
+                row = self._rows.pop(str(vector_id), None)
+                if row is not None:
+                    self._alive[row] = False
+                    log.append({"id": str(vector_id), "row": row, "deleted": True})
+            self._append_log(log)
+            if self._count and len(self._rows) < self._count // 2:
+                self._compact()
+            return Record()
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            self._sync()
+            dimension = self._vectors.shape[1] if self._vectors is not None else 0
+            return Record(dimension=dimension, total_vector_count=len(self._rows),
+                          ivf=self._ivf is not None, dtype=str(self.LOCAL_INDEX_DTYPE))
+
+    def records(self):
+        with self._lock:
+            self._sync()
+            return [(vector_id, self._metadata[row]) for vector_id, row in self._rows.items()]
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._sync()
+            self._compact()
+
+    def _compact(self):
+        # Live rows are written to a new generation's files. Readers keep using
+        # the old ones until they see the generation file change.
+        live = sorted(self._rows.values())
+        generation = uuid.uuid4().hex
+        vectors_path, log_path = self._paths(generation)
+        if live:
+            dimension = self._vectors.shape[1]
+            temp_path = f"{vectors_path}.{uuid.uuid4().hex}.tmp"
+            matrix = np.lib.format.open_memmap(temp_path, mode="w+", dtype=self.LOCAL_INDEX_DTYPE,
+                                               shape=(max(1024, len(live)), dimension))
+            for start in range(0, len(live), 8192):
+                rows = live[start:start + 8192]
+                matrix[start:start + len(rows)] = self._vectors[rows]
+            matrix.flush()
+            del matrix
+            os.replace(temp_path, vectors_path)
+            self._write_atomic(log_path, "".join(
+                json.dumps({"id": self._ids[row], "row": new_row, "metadata": self._metadata[row]}) + "\n"
+                for new_row, row in enumerate(live)
+            ))
+        stale = [path for path in (self.vectors_path, self.log_path) if os.path.exists(path)]
+        self._write_atomic(self.generation_path, generation)
+        for path in stale:
+            os.remove(path)
+        logger.info(f"Compacted {self.path}: {len(live)} live of {self._count} rows")
+        self._load()
+
+    def _search(self, query, top_k):
+        if self._ivf is None and len(self._rows) >= self.LOCAL_INDEX_IVF_THRESHOLD:
+            self._ivf_build()
+        if self._ivf is not None:
+            centroids, lists, _ = self._ivf
+            probes = np.argsort(centroids @ query)[::-1][:self.LOCAL_INDEX_IVF_NPROBE]
+            # A re-upserted row can sit in two lists; unique() drops the repeat.
+            candidates = np.unique(np.concatenate([np.asarray(lists[probe], dtype=np.int64) for probe in probes]))
+            candidates = candidates[self._alive[candidates]]
+            scores = self._vectors[candidates] @ query.astype(self.LOCAL_INDEX_DTYPE)
+            return self._top(candidates, scores.astype(np.float32), top_k)
+
+        scores = (self._vectors[:self._count] @ query.astype(self.LOCAL_INDEX_DTYPE)).astype(np.float32)
+        scores[~self._alive[:self._count]] = -np.inf
+        rows = np.arange(self._count)
+        rows, scores = self._top(rows, scores, min(top_k, len(self._rows)))
+        return rows, scores
+
+    def _search_rows(self, rows, query, top_k):
+        # Exact search over a filtered subset; IVF lists could hold too few of its rows.
+        if not len(rows):
+            return [], []
+        scores = (self._vectors[rows] @ query.astype(self.LOCAL_INDEX_DTYPE)).astype(np.float32)
+        return self._top(rows, scores, min(top_k, len(rows)))
+
+    def _top(self, rows, scores, top_k):
+        if len(scores) > top_k:
+            best = np.argpartition(scores, -top_k)[-top_k:]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(scores)[::-1]
+        return rows[order].tolist(), scores[order].tolist()
+
+    def _ivf_build(self):
+        live = np.flatnonzero(self._alive[:self._count])
+        clusters = max(1, int(2 * np.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= 32 * clusters else rng.choice(live, 32 * clusters, replace=False)
+        centroids = kmeans(np.asarray(self._vectors[sample], dtype=np.float32), clusters)
+        lists = [[] for _ in range(clusters)]
+        for start in range(0, len(live), 8192):
+            rows = live[start:start + 8192]
+            assignment = np.argmax(np.asarray(self._vectors[rows], dtype=np.float32) @ centroids.T, axis=1)
+            for row, cluster in zip(rows.tolist(), assignment.tolist()):
+                lists[cluster].append(row)
+        self._ivf = (centroids, lists, len(live))
+        logger.info(f"Built IVF index over {len(live)} vectors with {clusters} lists")
+
+    def _ivf_assign(self, row, values):
+        centroids, lists, trained_size = self._ivf
+        lists[int(np.argmax(centroids @ values))].append(row)
+        # Retrain once the index has doubled since the centroids were fitted.
+        if len(self._rows) > 2 * trained_size:
+            self._ivf = None
+
+    def _ensure_capacity(self, dimension, needed):
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dimension:
+                raise ValueError(f"Vector dimension {dimension} does not match index dimension {self._vectors.shape[1]}")
+            if needed <= self._vectors.shape[0]:
+                return
+        capacity = max(1024, needed, 2 * (self._vectors.shape[0] if self._vectors is not None else 0))
+        temp_path = f"{self.vectors_path}.{uuid.uuid4().hex}.tmp"
+        grown = np.lib.format.open_memmap(temp_path, mode="w+", dtype=self.LOCAL_INDEX_DTYPE, shape=(capacity, dimension))
+        if self._vectors is not None:
+            grown[:self._count] = self._vectors[:self._count]
+        grown.flush()
+        del grown
+        os.replace(temp_path, self.vectors_path)
+        self._open_vectors()
+
+    def _append_log(self, entries):
+        if not entries:
+            return
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        with open(self.log_path, "ab") as file:
+            file.write(data)
+        self._log_entries += len(entries)
+        self._log_offset += len(data)
+
+    @contextmanager
+    def _file_lock(self):
+        # Serialises writers across processes; without fcntl only threads are.
+        # Taken with _lock held, so the depth needs no lock of its own.
+        if fcntl is None or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        with open(self.lock_path, "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _write_atomic(self, path, text):
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    def _paths(self, generation):
+        # Indexes written before generations existed use the unsuffixed names.
+        suffix = f".{generation}" if generation else ""
+        return os.path.join(self.path, f"vectors{suffix}.npy"), os.path.join(self.path, f"metadata{suffix}.jsonl")
+
+    def _read_generation(self):
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return ""
+
+    def _sync(self):
+        # Cheap stat checks for changes made by another process: a compaction,
+        # a grown matrix, or new log entries.
+        if self._read_generation() != self._generation:
+            self._load()
+            return
+        try:
+            stat = os.stat(self.vectors_path)
+        except FileNotFoundError:
+            return
+        if self._vectors is None:
+            self._load()
+            return
+        if (stat.st_ino, stat.st_size) != self._vectors_stamp:
+            self._open_vectors()
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._log_offset:
+            self._load()
+        elif size > self._log_offset:
+            upserted = self._replay()
+            if self._ivf is not None:
+                for row in upserted:
+                    self._ivf_assign(row, np.asarray(self._vectors[row], dtype=np.float32))
+
+    def _open_vectors(self):
+        # Stat first: if the file is replaced in between, the next sync reopens it.
+        stat = os.stat(self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        self._vectors_stamp = (stat.st_ino, stat.st_size)
+        if self._vectors.dtype != self.LOCAL_INDEX_DTYPE:
+            logger.warning(f"{self.path} stores {self._vectors.dtype}; ignoring LOCAL_INDEX_DTYPE={self.LOCAL_INDEX_DTYPE}")
+            self.LOCAL_INDEX_DTYPE = self._vectors.dtype
+        self._grow_alive(self._vectors.shape[0])
+
+    def _grow_alive(self, size):
+        if size > len(self._alive):
+            alive = np.zeros(size, dtype=bool)
+            alive[:len(self._alive)] = self._alive
+            self._alive = alive
+
+    def _replay(self):
+        # Applies log entries past the last offset read; a partly written last
+        # line is left for the next sync. Returns the rows upserted.
+        try:
+            with open(self.log_path, "rb") as file:
+                file.seek(self._log_offset)
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        data = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(data)
+        upserted = []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            self._log_entries += 1
+            row = entry["row"]
+            while len(self._ids) <= row:
+                self._ids.append(None)
+                self._metadata.append({})
+            self._grow_alive(row + 1)
+            if entry.get("deleted"):
+                if self._rows.get(entry["id"]) == row:
+                    del self._rows[entry["id"]]
+                self._alive[row] = False
+            else:
+                self._ids[row] = entry["id"]
+                self._metadata[row] = entry["metadata"]
+                self._rows[entry["id"]] = row
+                self._alive[row] = True
+                upserted.append(row)
+        self._count = len(self._ids)
+        if self._vectors is not None and self._count > self._vectors.shape[0]:
+            self._open_vectors()
+        return upserted
+
+    def _load(self):
+        self._generation = self._read_generation()
+        self.vectors_path, self.log_path = self._paths(self._generation)
+        self._vectors = None
+        self._vectors_stamp = None
+        self._ids = []
+        self._metadata = []
+        self._rows = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._count = 0
+        self._log_entries = 0
+        self._log_offset = 0
+        self._ivf = None
+        if not os.path.exists(self.vectors_path):
+            return
+        self._open_vectors()
+        self._replay()
+        if self._log_entries > 2 * max(1, len(self._rows)) + 1024:
+            with self._file_lock():
+                # Another process may have compacted while this one was reading.
+                if self._read_generation() == self._generation:
+                    self._compact()
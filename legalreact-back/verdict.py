@@ -2,25 +2,48 @@ import os
 import json
 import logging
 import re
-import pinecone
-from langchain_openai import AzureChatOpenAI
-from llm import LLM
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrency import submit
+from context import ContextBuilder
+from events import emit, invoke_llm
+from registry import registry
+from semantic_cache import exact_terms
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CACHE_INDEXES = ("law-kb", "past-cases")
+
+
 class Verdict:
 
     def __init__(self):
-        self.PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+        # "concurrent" overlaps independent stages; "sequential" is the original order.
+        self.VERDICT_EXECUTION_MODE = os.getenv("VERDICT_EXECUTION_MODE", "concurrent")
+        # "input" embeds the raw case text while extraction runs; "description"
+        # waits for the extracted case description, as the sequential mode does.
+        self.VERDICT_EMBED_SOURCE = os.getenv("VERDICT_EMBED_SOURCE", "input")
+        self.STAGE_TIMEOUTS = {
+            "extract": float(os.getenv("VERDICT_EXTRACT_TIMEOUT", "60")),
+            "embed": float(os.getenv("VERDICT_EMBED_TIMEOUT", "20")),
+            "key": float(os.getenv("VERDICT_EMBED_TIMEOUT", "20")),
+            "laws": float(os.getenv("VERDICT_SEARCH_TIMEOUT", "10")),
+            "cases": float(os.getenv("VERDICT_SEARCH_TIMEOUT", "10")),
+            "verdict": float(os.getenv("VERDICT_GENERATION_TIMEOUT", "120")),
+        }
+        # Off sends every law title and full case chunk, as before.
+        self.VERDICT_CONTEXT_ENABLED = os.getenv("VERDICT_CONTEXT_ENABLED", "true").lower() == "true"
+        self.context = ContextBuilder()
+        self.executor = registry.get("verdict_executor")
 
-        self.pc = pinecone.Pinecone(api_key=self.PINECONE_API_KEY)
-        self.knowledge_index = self.pc.Index("law-kb")
-        self.cases_index = self.pc.Index("past-cases")
+        self.knowledge_index = registry.get("index:law-kb")
+        self.cases_index = registry.get("index:past-cases")
+        self.semantic_cache = registry.get("semantic_cache")
 
-        self.llm = LLM()
-        self.gen_llm = self.llm.initialize_gen_llm()
-        self.emb_llm = self.llm.initialize_emb_llm()
+        self.gen_llm = registry.get("gen_llm")
+        self.emb_llm = registry.get("emb_llm")
+        self.embedding_cache = registry.get("embedding_cache")
 
 
     def extract_case_details(self, case_input):
@@ -59,8 +82,7 @@ class Verdict:
 
     def generate_embeddings(self, text):
         try:
-            response = self.emb_llm.embeddings.create(model="text-embedding-ada-002", input=text)
-            return response.data[0].embedding
+            return self.embedding_cache.get_or_create(self.emb_llm, "text-embedding-ada-002", text)
         except Exception as e:
             logging.error(f"Failed to generate embeddings: {e}")
             return None
@@ -85,13 +107,60 @@ class Verdict:
         Based on the above, predict the most likely verdict and explain why.
         """
         try:
-            response = self.gen_llm.invoke(prompt)
+            response = invoke_llm(self.gen_llm, prompt, "verdict")
             return response.content
         except Exception as e:
             logging.error(f"Verdict generation failed: {e}")
             return None
 
+    def format_laws(self, relevant_laws):
+        return "\n".join([f"Title: {law['metadata'].get('title', 'No Title')}" for law in relevant_laws])
+
+    def format_cases(self, similar_cases):
+        return "\n".join([f"Title: {case['metadata'].get('title', 'No Title')}\nSummary: {case['metadata'].get('summary_chunk', 'No Summary')}" for case in similar_cases])
+
+    def build_context(self, case_description, relevant_laws, similar_cases):
+        if not self.VERDICT_CONTEXT_ENABLED:
+            return self.format_laws(relevant_laws), self.format_cases(similar_cases)
+        return self.context.build(case_description, relevant_laws, similar_cases)
+
+    def build_result(self, case_details, verdict, laws_text, cases_text):
+        return {
+            "case_description": case_details.get("case_description", "No description available"),
+            "involved_parties": case_details.get("involved_parties", "Unknown parties"),
+            "jurisdiction": case_details.get("jurisdiction", "Unknown jurisdiction"),
+            "alleged_violations": case_details.get("alleged_violations", "Unknown violations"),
+            "verdict": verdict,
+            "relevant_laws": laws_text,
+            "similar_cases": cases_text
+        }
+
+    def lookup_cached(self, input_embedding, terms):
+        cached, similarity = self.semantic_cache.lookup("verdict_prediction", input_embedding, CACHE_INDEXES, terms)
+        if cached is None:
+            return None
+        logging.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        emit("semantic_cache", {"route": "verdict_prediction", "similarity": similarity})
+        return dict(cached, cached=True)
+
     def process_case(self, case_input):
+        # Near-duplicate submissions reuse an earlier verdict, keyed by the
+        # input embedding and its exact terms. The concurrent mode looks it up
+        # once the input is embedded, while extraction is already running.
+        terms = exact_terms(case_input)
+        if self.VERDICT_EXECUTION_MODE == "concurrent":
+            result = self.process_case_concurrent(case_input, terms)
+        else:
+            input_embedding = self.generate_embeddings(case_input) if self.semantic_cache.SEMANTIC_CACHE_ENABLED else None
+            result = self.lookup_cached(input_embedding, terms) or self.process_case_sequential(case_input)
+
+        if "error" not in result and not result.get("cached") and self.semantic_cache.SEMANTIC_CACHE_ENABLED:
+            # Already in the embedding cache from the lookup.
+            self.semantic_cache.store("verdict_prediction", self.generate_embeddings(case_input), result,
+                                      CACHE_INDEXES, terms)
+        return result
+
+    def process_case_sequential(self, case_input):
         logging.info(f"Received case input")
 
         case_details = self.extract_case_details(case_input)
@@ -101,6 +170,7 @@ class Verdict:
 
         case_description = case_details.get("case_description", "No description available")
         logging.info(f"Case Description: {case_description}")
+        emit("case_details", case_details)
 
         case_embedding = self.generate_embeddings(case_description)
         if case_embedding is None:
@@ -118,22 +188,120 @@ class Verdict:
         if not similar_cases:
             return {"error": "No similar cases found"}
 
-        laws_text = "\n".join([f"Title: {law['metadata'].get('title', 'No Title')}" for law in relevant_laws])
-        cases_text = "\n".join([f"Title: {case['metadata'].get('title', 'No Title')}\nSummary: {case['metadata'].get('summary_chunk', 'No Summary')}" for case in similar_cases])
+        laws_text, cases_text = self.build_context(case_description, relevant_laws, similar_cases)
+        emit("relevant_laws", {"count": len(relevant_laws), "relevant_laws": laws_text})
+        emit("similar_cases", {"count": len(similar_cases), "similar_cases": cases_text})
 
         verdict = self.get_verdict(case_description, laws_text, cases_text)
         if verdict is None:
             return {"error": "Verdict generation failed"}
 
-        result = {
-            "case_description": case_description,
-            "involved_parties": case_details.get("involved_parties", "Unknown parties"),
-            "jurisdiction": case_details.get("jurisdiction", "Unknown jurisdiction"),
-            "alleged_violations": case_details.get("alleged_violations", "Unknown violations"),
-            "verdict": verdict,
-            "relevant_laws": laws_text,
-            "similar_cases": cases_text
-        }
+        result = self.build_result(case_details, verdict, laws_text, cases_text)
+
+        logging.info("Case processed successfully")
+        return result
+
+    def process_case_concurrent(self, case_input, terms=None):
+        logging.info(f"Received case input")
+
+        running = {}
+        deadlines = {}
+        results = {}
+
+        def start(stage, fn, *args):
+            future = submit(self.executor, fn, *args)
+            running[future] = stage
+            deadlines[future] = time.monotonic() + self.STAGE_TIMEOUTS[stage]
+
+        def on_done(stage, value):
+            # Returns the final result when the case is settled early: an error or a cache hit.
+            results[stage] = value
+
+            if stage == "key":
+                return self.lookup_cached(value, terms) if value is not None else None
+
+            if stage == "extract":
+                if not value or "error" in value:
+                    logging.error("Failed to extract case details")
+                    return {"error": "Failed to extract case details"}
+                logging.info(f"Case Description: {value.get('case_description', 'No description available')}")
+                emit("case_details", value)
+                if self.VERDICT_EMBED_SOURCE != "input":
+                    start("embed", self.generate_embeddings, value.get("case_description", "No description available"))
+
+            elif stage == "embed":
+                if value is None:
+                    return {"error": "Failed to generate embeddings"}
+                if self.VERDICT_EMBED_SOURCE == "input" and self.semantic_cache.SEMANTIC_CACHE_ENABLED:
+                    cached = self.lookup_cached(value, terms)
+                    if cached:
+                        return cached
+                start("laws", self.search_pinecone, self.knowledge_index, value)
+                start("cases", self.search_pinecone, self.cases_index, value)
+
+            elif stage == "laws":
+                logging.info(f"Found {len(value)} relevant laws")
+                if not value:
+                    # Nothing to ground the verdict on; stop without waiting for the rest.
+                    return {"error": "No relevant laws found"}
+                emit("relevant_laws", {"count": len(value), "relevant_laws": self.format_laws(value)})
+
+            elif stage == "cases":
+                logging.info(f"Found {len(value)} similar cases")
+                if value:
+                    emit("similar_cases", {"count": len(value), "similar_cases": self.format_cases(value)})
+
+            if "verdict" not in results and all(s in results for s in ("extract", "laws", "cases")):
+                if not results["cases"]:
+                    return {"error": "No similar cases found"}
+                case_description = results["extract"].get("case_description", "No description available")
+                results["laws_text"], results["cases_text"] = self.build_context(
+                    case_description, results["laws"], results["cases"])
+                results["verdict"] = None
+                start("verdict", self.get_verdict, case_description, results["laws_text"], results["cases_text"])
+            return None
+
+        start("extract", self.extract_case_details, case_input)
+        if self.VERDICT_EMBED_SOURCE == "input":
+            start("embed", self.generate_embeddings, case_input)
+        elif self.semantic_cache.SEMANTIC_CACHE_ENABLED:
+            # The embed stage waits for extraction; the cache key does not.
+            start("key", self.generate_embeddings, case_input)
+
+        try:
+            while running:
+                timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    expired = min(deadlines, key=deadlines.get)
+                    stage = running[expired]
+                    if stage == "key":
+                        # Without a cache key the case is simply worked out.
+                        running.pop(expired)
+                        deadlines.pop(expired)
+                        continue
+                    logging.error(f"Verdict stage '{stage}' timed out after {self.STAGE_TIMEOUTS[stage]}s")
+                    return {"error": f"Verdict stage '{stage}' timed out"}
+
+                for future in done:
+                    stage = running.pop(future)
+                    deadlines.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception:
+                        logging.exception(f"Verdict stage '{stage}' failed")
+                        return {"error": f"Verdict stage '{stage}' failed"}
+                    final = on_done(stage, value)
+                    if final:
+                        return final
+        finally:
+            for future in running:
+                future.cancel()
+
+        if results.get("verdict") is None:
+            return {"error": "Verdict generation failed"}
+
+        result = self.build_result(results["extract"], results["verdict"], results["laws_text"], results["cases_text"])
 
         logging.info("Case processed successfully")
         return result
@@ -1,16 +1,18 @@
 from langgraph.graph import Graph
-from classifier import Classifier
+from registry import registry
 from agents import case_search_agent, verdict_agent, document_generation, perform_action
+from metrics import traced_node
 
-classifier = Classifier()
+def classify_query(data):
+    return registry.get("classifier").classify_query(data)
 
 workflow = Graph()
 
-workflow.add_node("classifier", classifier.classify_query)
-workflow.add_node("case_search_agent", case_search_agent)
-workflow.add_node("verdict_agent", verdict_agent)
-workflow.add_node("document_generation", document_generation)
-workflow.add_node("perform_action", perform_action)
+workflow.add_node("classifier", traced_node("classifier", classify_query))
+workflow.add_node("case_search_agent", traced_node("case_search_agent", case_search_agent))
+workflow.add_node("verdict_agent", traced_node("verdict_agent", verdict_agent))
+workflow.add_node("document_generation", traced_node("document_generation", document_generation))
+workflow.add_node("perform_action", traced_node("perform_action", perform_action))
 
 def route_decision(inputs):
     classification, data = inputs
@@ -0,0 +1,4 @@
+import serving
+from main import app
+
+serving.preload()
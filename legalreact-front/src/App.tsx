@@ -10,6 +10,7 @@ function App() {
   const [response, setResponse] = useState<any>("");
   const [documentReady, setDocumentReady] = useState(false);
   const [uploadedFileName, setUploadedFileName] = useState<string | null>(null); // Store the uploaded file name
+  const [documentId, setDocumentId] = useState<string | null>(null); // Id returned by /upload-pdf
 
   return (
     <div className="flex flex-col items-center justify-center min-h-screen p-6">
@@ -22,11 +23,12 @@ function App() {
       </div>
       <TitleArea />
       {/* Text input area */}
-      <TextInput setResponse={setResponse} />
+      <TextInput setResponse={setResponse} documentId={documentId} />
       {/* Upload section for PDF summarize/translate */}
       <PdfUpload
         setResponse={setResponse}
         setUploadedFileName={setUploadedFileName} // Pass function to handle uploaded file name
+        setDocumentId={setDocumentId}
         setDocumentReady={setDocumentReady}
       />
       {/* Display response */}
@@ -9,12 +9,14 @@ import { FaFilePdf } from "react-icons/fa";
 interface PdfUploadProps {
   setResponse: (data: any) => void;
   setUploadedFileName: (fileName: string) => void;
+  setDocumentId: (documentId: string) => void;
   setDocumentReady: (ready: boolean) => void;
 }
 
 function PdfUpload({
   setResponse,
   setUploadedFileName,
+  setDocumentId,
   setDocumentReady,
 }: PdfUploadProps) {
   const [isUploading, setIsUploading] = useState(false);
@@ -39,14 +41,16 @@ function PdfUpload({
       );
 
       const filename = uploadRes.data.filename;
+      const documentId = uploadRes.data.document_id;
       setUploadedFileName(filename);
+      setDocumentId(documentId);
       setLocalFileName(filename);
       setDocumentReady(true);
 
       alert("File uploaded successfully!");
 
       // After upload, trigger invoke
-      await sendQuery(`#UPLOAD_PDF\nFilename: ${filename}`);
+      await sendQuery(`#UPLOAD_PDF\nFilename: ${filename}`, documentId);
     } catch (error) {
       console.error("Upload failed:", error);
       alert("Upload failed. Check console for details.");
@@ -55,10 +59,11 @@ function PdfUpload({
     }
   };
 
-  const sendQuery = async (user_input: string) => {
+  const sendQuery = async (user_input: string, document_id: string) => {
     try {
       const res = await axios.post("http://127.0.0.1:5000/invoke", {
         user_input,
+        document_id,
       });
       setResponse(res.data);
     } catch (error) {
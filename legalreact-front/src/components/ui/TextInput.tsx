@@ -7,9 +7,10 @@ import { Input } from "@/components/ui/input";
 
 interface TextInputProps {
   setResponse: (data: any) => void;
+  documentId?: string | null;
 }
 
-function TextInput({ setResponse }: TextInputProps) {
+function TextInput({ setResponse, documentId }: TextInputProps) {
   const [query, setQuery] = useState("");
   const [stage, setStage] = useState<
     "default" | "jurisdiction" | "violation" | "facts" | "complete"
@@ -36,6 +37,7 @@ function TextInput({ setResponse }: TextInputProps) {
     try {
       const res = await axios.post("http://127.0.0.1:5000/invoke", {
         user_input,
+        ...(documentId ? { document_id: documentId } : {}),
       });
       setResponse(res.data);
     } catch (error) {